@@ -0,0 +1,112 @@
+"""
+Benchmark de subidas concurrentes: despliegue WSGI contra ASGI.
+
+Levanta el storage falso (justificaciones/fake_storage.py) con una latencia
+por request que simula el viaje a Supabase y sirve la aplicación de dos
+formas: un servidor WSGI con un pool de N hilos (como gunicorn --threads N)
+y uvicorn con un solo proceso. En ambos casos C clientes concurrentes suben
+justificaciones con un PDF por ``justificacion_create``. Bajo WSGI cada
+subida ocupa un hilo durante la espera al storage; bajo ASGI la vista async
+la espera en el event loop.
+
+    python -m benchmarks.bench_asgi --subidas 200 --clientes 32 --hilos 8 --latencia 0.05
+
+Requiere uvicorn (pip install uvicorn) para la parte ASGI.
+"""
+from __future__ import annotations
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+from benchmarks import comun  # noqa: E402
+
+
+def _preparar(clientes: int) -> list[str]:
+    """Migra una base nueva y devuelve una cookie de sesión por cliente."""
+    comun.preparar_base()
+    from django.contrib.auth import get_user_model
+
+    Usuario = get_user_model()
+    return comun.sesiones(
+        Usuario.objects.create_user(username=f"alumno{i}", rol="ESTUDIANTE") for i in range(clientes)
+    )
+
+
+def _cliente(base: str, sesion: str, subidas: int, tamano: int) -> tuple[list[float], int]:
+    import requests
+    from django.conf import settings
+
+    http = requests.Session()
+    http.cookies.set(settings.SESSION_COOKIE_NAME, sesion)
+    url = f"{base}/justificaciones/nueva/"
+    formulario = http.get(url, timeout=60).text
+    token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', formulario).group(1)
+    latencias, errores = [], 0
+    for _ in range(subidas):
+        inicio = time.perf_counter()
+        resp = http.post(
+            url,
+            data={"csrfmiddlewaretoken": token, "fecha_inicio": "2025-01-10", "motivo": "Licencia médica"},
+            files={"archivo": ("licencia.pdf", b"%PDF-1.4 " + os.urandom(tamano), "application/pdf")},
+            headers={"Referer": url},
+            allow_redirects=False,
+            timeout=120,
+        )
+        latencias.append(time.perf_counter() - inicio)
+        if resp.status_code != 302:
+            errores += 1
+    return latencias, errores
+
+
+def _medir(base: str, sesiones: list[str], subidas: int, tamano: int) -> tuple[float, list[float], int]:
+    por_cliente = max(1, subidas // len(sesiones))
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(sesiones)) as pool:
+        resultados = list(pool.map(lambda s: _cliente(base, s, por_cliente, tamano), sesiones))
+    segundos = time.perf_counter() - inicio
+    latencias = [l for lat, _ in resultados for l in lat]
+    return segundos, latencias, sum(e for _, e in resultados)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subidas", type=int, default=200, help="Subidas por despliegue.")
+    parser.add_argument("--clientes", type=int, default=32, help="Clientes concurrentes.")
+    parser.add_argument("--hilos", type=int, default=8, help="Hilos del servidor WSGI.")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Segundos por request al storage falso.")
+    parser.add_argument("--tamano", type=int, default=256 * 1024, help="Bytes por documento.")
+    args = parser.parse_args()
+
+    from justificaciones.fake_storage import FakeSupabaseStorage
+
+    with FakeSupabaseStorage() as storage:
+        storage.latency = args.latencia
+        os.environ["BENCH_SUPABASE_URL"] = storage.url
+        sesiones = _preparar(args.clientes)
+
+        despliegues = [(f"WSGI ({args.hilos} hilos)", lambda: comun.servir_wsgi(args.hilos))]
+        try:
+            import uvicorn  # noqa: F401
+            despliegues.append(("ASGI (uvicorn)", comun.servir_asgi))
+        except ImportError:
+            print("uvicorn no está instalado: se mide solo WSGI.")
+
+        print(f"{'despliegue':<18} {'subidas':>8} {'subidas/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errores':>8}")
+        for nombre, servir in despliegues:
+            base, detener = servir()
+            segundos, latencias, errores = _medir(base, sesiones, args.subidas, args.tamano)
+            detener()
+            print(
+                f"{nombre:<18} {len(latencias):>8} {len(latencias) / segundos:>10.1f} "
+                f"{comun.percentil(latencias, 50):>9.1f} {comun.percentil(latencias, 99):>9.1f} {errores:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark del analizador de legibilidad (justificaciones/legibilidad.py).
+
+Analiza un corpus de documentos con N procesos y reporta documentos por
+segundo en total y por núcleo. Sin --corpus genera uno sintético.
+
+    python -m benchmarks.bench_legibilidad --procesos 4 --repeticiones 3
+    python -m benchmarks.bench_legibilidad --corpus /ruta/a/documentos
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "justifacil.settings")
+
+
+def _iniciar() -> None:
+    import django
+    django.setup()
+
+
+def _analizar(ruta: str) -> tuple[bool, float]:
+    from django.core.files import File
+    from justificaciones.legibilidad import analizar
+
+    inicio = time.process_time()
+    with open(ruta, "rb") as f:
+        resultado = analizar(File(f))
+    return resultado.legible, time.process_time() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directorio con PDF/PNG. Por defecto se genera uno sintético.")
+    parser.add_argument("--cantidad", type=int, default=60, help="Documentos del corpus sintético.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    _iniciar()
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            rutas = [
+                os.path.join(args.corpus, n) for n in sorted(os.listdir(args.corpus))
+                if n.lower().endswith((".pdf", ".png"))
+            ]
+        else:
+            from justificaciones.muestras import generar_corpus
+            rutas = generar_corpus(tmp, args.cantidad)
+        rutas = rutas * args.repeticiones
+        megabytes = sum(os.path.getsize(r) for r in rutas) / 1024 / 1024
+
+        with ProcessPoolExecutor(max_workers=args.procesos, initializer=_iniciar) as pool:
+            list(pool.map(_analizar, rutas[: args.procesos]))  # calentamiento
+            inicio = time.perf_counter()
+            resultados = list(pool.map(_analizar, rutas, chunksize=4))
+            total = time.perf_counter() - inicio
+
+    legibles = sum(1 for legible, _ in resultados if legible)
+    cpu = sum(t for _, t in resultados)
+    print(f"Documentos analizados: {len(resultados)} ({megabytes:.1f} MB), legibles: {legibles}")
+    print(f"Procesos: {args.procesos}")
+    print(f"Tiempo total: {total:.2f} s")
+    print(f"Documentos/s: {len(resultados) / total:.1f}")
+    print(f"Documentos/s por núcleo: {len(resultados) / total / args.procesos:.1f}")
+    print(f"CPU por documento: {cpu / len(resultados) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de la ingesta de WhatsApp.
+
+Levanta la aplicación en un servidor WSGI local sobre una base SQLite nueva
+(benchmarks/settings.py) y simula al proveedor: envía los mensajes uno por
+POST o en lotes, y reenvía una fracción para medir también los reintentos.
+Mide por separado el webhook (latencia p50/p99 hasta el 202, que no depende
+de la base) y el consumidor de la bandeja (mensajes por segundo ingeridos).
+
+    python -m benchmarks.bench_whatsapp --mensajes 2000 --lotes 1 50 200
+"""
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+from benchmarks import comun  # noqa: E402
+
+
+def _preparar(estudiantes: int) -> list[str]:
+    comun.preparar_base()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+
+    shutil.rmtree(settings.WHATSAPP_BANDEJA_DIR, ignore_errors=True)
+    Usuario = get_user_model()
+    Usuario.objects.bulk_create([Usuario(username=f"alumno{i}", rol="ESTUDIANTE") for i in range(estudiantes)])
+    return [f"alumno{i}" for i in range(estudiantes)]
+
+
+def _mensajes(usernames: list[str], cantidad: int) -> list[dict]:
+    return [
+        {
+            "id": f"wamid.{uuid.uuid4().hex}",
+            "username": usernames[i % len(usernames)],
+            "motivo": "Inasistencia por enfermedad",
+            "descripcion": "Adjunto certificado en la app",
+            "fecha": "2025-06-10",
+        }
+        for i in range(cantidad)
+    ]
+
+
+def _enviar(url: str, mensajes: list[dict], lote: int) -> tuple[float, list[float], int]:
+    import requests
+
+    from django.conf import settings
+
+    sesion = requests.Session()
+    sesion.headers["Authorization"] = f"Bearer {settings.WHATSAPP_WEBHOOK_TOKEN}"
+    latencias, errores = [], 0
+    inicio = time.perf_counter()
+    for i in range(0, len(mensajes), lote):
+        grupo = mensajes[i: i + lote]
+        cuerpo = grupo[0] if lote == 1 else {"mensajes": grupo}
+        t0 = time.perf_counter()
+        resp = sesion.post(url, json=cuerpo, timeout=60)
+        latencias.append(time.perf_counter() - t0)
+        if resp.status_code != 202:
+            errores += len(grupo)
+    return time.perf_counter() - inicio, latencias, errores
+
+
+def _consumir() -> float:
+    from justificaciones import bandeja
+
+    inicio = time.perf_counter()
+    while bandeja.procesar(20):
+        pass
+    return time.perf_counter() - inicio
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mensajes", type=int, default=1000, help="Mensajes por modo.")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 50, 200], help="Tamaños de lote a medir.")
+    parser.add_argument("--estudiantes", type=int, default=300)
+    parser.add_argument("--reintentos", type=float, default=0.1, help="Fracción de mensajes reenviados.")
+    args = parser.parse_args()
+
+    usernames = _preparar(args.estudiantes)
+    from justificaciones.models import Justificacion
+
+    base, detener = comun.servir_wsgi(hilos=1)
+    url = f"{base}/justificaciones/whatsapp/recepcion/"
+
+    print(f"{'lote':>6} {'mensajes':>9} {'webhook msg/s':>14} {'p50 ms':>8} {'p99 ms':>8} {'consumidor msg/s':>17} {'errores':>8}")
+    for lote in args.lotes:
+        mensajes = _mensajes(usernames, args.mensajes)
+        repetidos = mensajes[: int(len(mensajes) * args.reintentos)] or mensajes[:1]
+        antes = Justificacion.objects.count()
+        segundos, latencias, errores = _enviar(url, mensajes, lote)
+        segundos_rep, latencias_rep, errores_rep = _enviar(url, repetidos, lote)
+        segundos_consumo = _consumir()
+        creadas = Justificacion.objects.count() - antes
+        assert creadas == len(mensajes) - errores, f"se crearon {creadas} justificaciones para {len(mensajes)} mensajes"
+        latencias += latencias_rep
+        print(
+            f"{lote:>6} {len(mensajes):>9} {len(mensajes) / segundos:>14.0f} {comun.percentil(latencias, 50):>8.2f} "
+            f"{comun.percentil(latencias, 99):>8.2f} {(len(mensajes) + len(repetidos)) / segundos_consumo:>17.0f} "
+            f"{errores + errores_rep:>8}"
+        )
+    detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Utilidades compartidas por los benchmarks: servidores locales de la
+aplicación (WSGI con pool de hilos o uvicorn), base nueva con sesiones
+iniciadas y percentiles.
+
+Todo corre en la máquina local: la base es la de benchmarks/settings.py
+(SQLite o el Postgres de BENCH_POSTGRES) y el storage, si se usa, el servidor
+falso de justificaciones/fake_storage.py.
+"""
+from __future__ import annotations
+import os
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from typing import Callable
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+class SinLog(WSGIRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+class WSGIConHilos(ThreadingMixIn, WSGIServer):
+    """Servidor WSGI con un pool fijo de hilos, como un worker gthread de gunicorn."""
+
+    hilos = 8
+
+    def server_activate(self) -> None:
+        super().server_activate()
+        self.pool = ThreadPoolExecutor(max_workers=self.hilos)
+
+    def process_request(self, request, client_address) -> None:
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def preparar_base() -> None:
+    """django.setup() y migraciones sobre una base vacía."""
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.core.management import call_command
+
+    base = settings.DATABASES["default"]
+    if "sqlite" in base["ENGINE"]:
+        if os.path.exists(base["NAME"]):
+            os.remove(base["NAME"])
+    else:
+        call_command("flush", interactive=False, verbosity=0)
+    call_command("migrate", verbosity=0)
+
+
+def sesiones(usuarios) -> list[str]:
+    """Una cookie de sesión iniciada por usuario."""
+    from django.conf import settings
+    from django.test import Client
+
+    cookies = []
+    for usuario in usuarios:
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookies.append(cliente.cookies[settings.SESSION_COOKIE_NAME].value)
+    return cookies
+
+
+def servir_wsgi(hilos: int) -> tuple[str, Callable[[], None]]:
+    """Levanta la aplicación en un hilo. Devuelve la URL base y la función para detenerla."""
+    from django.core.wsgi import get_wsgi_application
+
+    WSGIConHilos.hilos = hilos
+    servidor = make_server("127.0.0.1", 0, get_wsgi_application(), server_class=WSGIConHilos, handler_class=SinLog)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}", servidor.shutdown
+
+
+def servir_asgi() -> tuple[str, Callable[[], None]]:
+    """Igual que servir_wsgi con uvicorn (pip install uvicorn)."""
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+
+    puerto = puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(
+        get_asgi_application(), host="127.0.0.1", port=puerto, log_level="error", lifespan="off"
+    ))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    def detener() -> None:
+        servidor.should_exit = True
+
+    return f"http://127.0.0.1:{puerto}", detener
+
+
+def percentil(valores: list[float], q: int) -> float:
+    """Percentil q (1-99) en milisegundos."""
+    if len(valores) < 2:
+        return valores[0] * 1000 if valores else 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[q - 1] * 1000
@@ -0,0 +1,13 @@
+"""
+SQLite para los benchmarks: las transacciones empiezan con BEGIN IMMEDIATE.
+
+Con el BEGIN diferido de Django 5.0, dos transacciones que leen y después
+escriben a la vez fallan al instante con "database is locked" en lugar de
+esperar el timeout, y eso se mediría como errores de la aplicación.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
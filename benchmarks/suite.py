@@ -0,0 +1,362 @@
+"""
+Suite de benchmarks reproducible, sin red y no interactiva.
+
+Levanta la aplicación en un servidor local (WSGI con pool de hilos o
+uvicorn) sobre una base nueva (SQLite o el Postgres de BENCH_POSTGRES, ver
+benchmarks/settings.py) y el storage falso de justificaciones/fake_storage.py
+con una latencia por request que simula a Supabase. Siembra datos con una
+semilla fija y mide cada escenario a cada nivel de concurrencia:
+
+    subidas       POST de justificacion_create con un PDF (estudiantes)
+    dashboard     GET del dashboard del coordinador
+    detalle       GET del detalle de justificaciones
+    aprobaciones  POST de coordinador_aprobar sobre pendientes distintas
+    whatsapp      POST de lotes al webhook y consumo de la bandeja
+
+Reporta latencia p50/p95/p99, pedidos por segundo y consultas SQL por
+request (cabecera X-Consultas-DB), y puede escribirlos en JSON. Con
+--baseline compara contra una corrida guardada y sale con código 1 si algún
+escenario empeora más que --tolerancia en p95 o throughput, hace más
+consultas por request o tiene errores.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --escenarios dashboard detalle --concurrencia 1 4 16 --pedidos 300
+    python -m benchmarks.suite --json benchmarks/baseline.json           # guarda la línea base
+    python -m benchmarks.suite --baseline benchmarks/baseline.json       # compara contra ella
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Callable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+from benchmarks import comun  # noqa: E402
+
+
+@dataclass
+class Contexto:
+    base: str
+    semilla: int
+    tamano_documento: int
+    lote_whatsapp: int
+    sesiones: dict[str, list[str]] = field(default_factory=dict)
+    estudiantes: list[str] = field(default_factory=list)
+    justificaciones: list[int] = field(default_factory=list)
+    pendientes: list[int] = field(default_factory=list)
+    corrida: int = 0  # distingue los ids de WhatsApp entre mediciones; repetidos se descartarían
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    rol: str | None  # sesiones con las que se hacen los pedidos; None: sin sesión
+    pedido: Callable[["requests.Session", Contexto, int], "requests.Response"]  # noqa: F821
+    esperado: int = 200
+    # Recibe cuántos pedidos se harán, para crear los datos que cada uno consume
+    preparar: Callable[[Contexto, int], None] | None = None
+    # Métricas extra al terminar (p. ej. el consumo de la bandeja)
+    finalizar: Callable[[Contexto, int], dict] | None = None
+
+
+# -- Datos ---------------------------------------------------------------------
+
+def sembrar(ctx: Contexto, estudiantes: int, justificaciones: int) -> None:
+    from django.contrib.auth import get_user_model
+    from justificaciones import estadisticas
+    from justificaciones.busqueda import texto_busqueda
+    from justificaciones.models import Documento, Justificacion
+
+    rng = random.Random(ctx.semilla)
+    Usuario = get_user_model()
+    alumnos = Usuario.objects.bulk_create([
+        Usuario(username=f"alumno{i}", first_name=f"Alumno{i}", last_name="Benchmark", rol="ESTUDIANTE")
+        for i in range(estudiantes)
+    ])
+    coordinadores = [Usuario.objects.create_user(username=f"coord{i}", rol="COORDINADOR") for i in range(4)]
+    ctx.estudiantes = [u.username for u in alumnos]
+
+    filas = []
+    for i in range(justificaciones):
+        justi = Justificacion(
+            estudiante=alumnos[rng.randrange(len(alumnos))],
+            fecha_inicio=date(2025, 1, 1).fromordinal(date(2025, 1, 1).toordinal() + rng.randrange(180)),
+            motivo=rng.choice(["Enfermedad", "Trámite", "Duelo", "Control médico"]),
+            descripcion=f"Justificación sembrada {i}",
+            estado=rng.choice(["PENDIENTE", "APROBADA", "RECHAZADA"]),
+            fuente=rng.choice(["app", "app", "whatsapp"]),
+        )
+        justi.texto_busqueda = texto_busqueda(justi)
+        filas.append(justi)
+    Justificacion.objects.bulk_create(filas, batch_size=500)
+    # Los documentos solo se enlazan: el detalle no lee el archivo
+    Documento.objects.bulk_create([
+        Documento(justificacion=j, archivo=f"documentos/{j.pk:02x}/sembrado-{j.pk}.pdf", sha256=f"{j.pk:064x}")
+        for j in filas
+    ], batch_size=500)
+    estadisticas.reconstruir()
+    ctx.justificaciones = [j.pk for j in filas]
+    ctx.sesiones = {"estudiante": comun.sesiones(alumnos[:32]), "coordinador": comun.sesiones(coordinadores)}
+
+
+def _preparar_pendientes(ctx: Contexto, cantidad: int) -> None:
+    from django.contrib.auth import get_user_model
+    from justificaciones.models import Justificacion
+
+    estudiante = get_user_model().objects.get(username=ctx.estudiantes[0])
+    nuevas = Justificacion.objects.bulk_create([
+        Justificacion(estudiante=estudiante, fecha_inicio=date(2025, 6, 1), motivo="Por aprobar") for _ in range(cantidad)
+    ])
+    ctx.pendientes = [j.pk for j in nuevas]
+
+
+def _preparar_bandeja(ctx: Contexto, cantidad: int) -> None:
+    from django.conf import settings
+
+    shutil.rmtree(settings.WHATSAPP_BANDEJA_DIR, ignore_errors=True)
+    ctx.corrida += 1
+
+
+# -- Pedidos -------------------------------------------------------------------
+
+def _subida(http, ctx: Contexto, i: int):
+    contenido = b"%PDF-1.4 " + random.Random(ctx.semilla + i).randbytes(ctx.tamano_documento)
+    return http.post(
+        f"{ctx.base}/justificaciones/nueva/",
+        data={"fecha_inicio": "2025-01-10", "motivo": "Licencia médica"},
+        files={"archivo": (f"licencia-{i}.pdf", contenido, "application/pdf")},
+        allow_redirects=False,
+        timeout=120,
+    )
+
+
+def _dashboard(http, ctx: Contexto, i: int):
+    return http.get(f"{ctx.base}/justificaciones/coordinador/", timeout=120)
+
+
+def _detalle(http, ctx: Contexto, i: int):
+    pk = ctx.justificaciones[(i * 7919) % len(ctx.justificaciones)]  # recorrido fijo y disperso
+    return http.get(f"{ctx.base}/justificaciones/detalle/{pk}/", timeout=120)
+
+
+def _aprobacion(http, ctx: Contexto, i: int):
+    return http.post(
+        f"{ctx.base}/justificaciones/coordinador/revisar/{ctx.pendientes[i]}/aprobar/",
+        data={"comentarios_coordinador": "Aprobada en benchmark"},
+        allow_redirects=False,
+        timeout=120,
+    )
+
+
+def _whatsapp(http, ctx: Contexto, i: int):
+    mensajes = [
+        {
+            "id": f"bench.{ctx.semilla}.{ctx.corrida}.{i}.{j}",
+            "username": ctx.estudiantes[(i + j) % len(ctx.estudiantes)],
+            "fecha": "2025-06-10",
+            "motivo": "Inasistencia",
+        }
+        for j in range(ctx.lote_whatsapp)
+    ]
+    from django.conf import settings
+
+    return http.post(
+        f"{ctx.base}/justificaciones/whatsapp/recepcion/",
+        json={"mensajes": mensajes},
+        headers={"Authorization": f"Bearer {settings.WHATSAPP_WEBHOOK_TOKEN}"},
+        timeout=120,
+    )
+
+
+def _consumir_bandeja(ctx: Contexto, pedidos: int) -> dict:
+    from justificaciones import bandeja
+
+    inicio = time.perf_counter()
+    while bandeja.procesar(20):
+        pass
+    return {"consumo_msg_s": round(pedidos * ctx.lote_whatsapp / (time.perf_counter() - inicio), 1)}
+
+
+ESCENARIOS = {
+    e.nombre: e
+    for e in [
+        Escenario("subidas", "estudiante", _subida, esperado=302),
+        Escenario("dashboard", "coordinador", _dashboard),
+        Escenario("detalle", "coordinador", _detalle),
+        Escenario("aprobaciones", "coordinador", _aprobacion, esperado=302, preparar=_preparar_pendientes),
+        Escenario("whatsapp", None, _whatsapp, esperado=202, preparar=_preparar_bandeja, finalizar=_consumir_bandeja),
+    ]
+}
+
+
+# -- Ejecución -----------------------------------------------------------------
+
+def _http(cookie: str | None):
+    import requests
+    from django.conf import settings
+
+    http = requests.Session()
+    if cookie:
+        http.cookies.set(settings.SESSION_COOKIE_NAME, cookie)
+    # Token CSRF propio: cookie y cabecera iguales, sin tener que pedir un formulario antes
+    token = "".join(random.choices(string.ascii_letters + string.digits, k=32))
+    http.cookies.set(settings.CSRF_COOKIE_NAME, token)
+    http.headers["X-CSRFToken"] = token
+    return http
+
+
+def medir(escenario: Escenario, ctx: Contexto, concurrencia: int, pedidos: int, calentamiento: int) -> dict:
+    if escenario.preparar:
+        escenario.preparar(ctx, calentamiento + pedidos)
+    cookies = ctx.sesiones.get(escenario.rol, []) if escenario.rol else [None]
+    clientes = [_http(cookies[i % len(cookies)]) for i in range(concurrencia)]
+    for i in range(calentamiento):
+        escenario.pedido(clientes[0], ctx, i)
+
+    siguiente = itertools.count(calentamiento)
+    fin = calentamiento + pedidos
+
+    def trabajador(http) -> list[tuple[float, bool, int]]:
+        muestras = []
+        while (i := next(siguiente)) < fin:
+            inicio = time.perf_counter()
+            resp = escenario.pedido(http, ctx, i)
+            muestras.append((
+                time.perf_counter() - inicio,
+                resp.status_code == escenario.esperado,
+                int(resp.headers.get("X-Consultas-DB", 0)),
+            ))
+        return muestras
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        muestras = [m for parte in pool.map(trabajador, clientes) for m in parte]
+    segundos = time.perf_counter() - inicio
+    latencias = [m[0] for m in muestras]
+    resultado = {
+        "escenario": escenario.nombre,
+        "concurrencia": concurrencia,
+        "pedidos": len(muestras),
+        "errores": sum(1 for m in muestras if not m[1]),
+        "segundos": round(segundos, 3),
+        "pedidos_s": round(len(muestras) / segundos, 1),
+        "p50_ms": round(comun.percentil(latencias, 50), 2),
+        "p95_ms": round(comun.percentil(latencias, 95), 2),
+        "p99_ms": round(comun.percentil(latencias, 99), 2),
+        "consultas": statistics.median(m[2] for m in muestras),
+    }
+    if escenario.finalizar:
+        resultado.update(escenario.finalizar(ctx, pedidos))
+    return resultado
+
+
+def comparar(resultados: list[dict], base: dict, tolerancia: float) -> list[str]:
+    """Regresiones respecto de la línea base, una línea por problema."""
+    previos = {(r["escenario"], r["concurrencia"]): r for r in base["resultados"]}
+    regresiones = []
+    for r in resultados:
+        clave = f"{r['escenario']} x{r['concurrencia']}"
+        if r["errores"]:
+            regresiones.append(f"{clave}: {r['errores']} pedidos con error")
+        previo = previos.get((r["escenario"], r["concurrencia"]))
+        if previo is None:
+            continue
+        if r["p95_ms"] > previo["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{clave}: p95 {r['p95_ms']} ms, línea base {previo['p95_ms']} ms")
+        if r["pedidos_s"] < previo["pedidos_s"] * (1 - tolerancia):
+            regresiones.append(f"{clave}: {r['pedidos_s']} pedidos/s, línea base {previo['pedidos_s']}")
+        if r["consultas"] > previo["consultas"]:
+            regresiones.append(f"{clave}: {r['consultas']} consultas por pedido, línea base {previo['consultas']}")
+    return regresiones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--concurrencia", type=int, nargs="+", default=[1, 8], help="Clientes concurrentes a medir.")
+    parser.add_argument("--pedidos", type=int, default=200, help="Pedidos medidos por escenario y concurrencia.")
+    parser.add_argument("--calentamiento", type=int, default=5, help="Pedidos previos que no se miden.")
+    parser.add_argument("--servidor", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--hilos", type=int, default=8, help="Hilos del servidor WSGI.")
+    parser.add_argument("--latencia-storage", type=float, default=0.02, help="Segundos por request al storage falso.")
+    parser.add_argument("--estudiantes", type=int, default=200)
+    parser.add_argument("--justificaciones", type=int, default=2000, help="Justificaciones sembradas.")
+    parser.add_argument("--tamano-documento", type=int, default=128 * 1024, help="Bytes por PDF subido.")
+    parser.add_argument("--lote-whatsapp", type=int, default=20, help="Mensajes por POST al webhook.")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--json", help="Archivo donde escribir los resultados.")
+    parser.add_argument("--baseline", help="Resultados previos (JSON) contra los que comparar.")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Empeoramiento relativo admitido.")
+    args = parser.parse_args()
+
+    from justificaciones.fake_storage import FakeSupabaseStorage
+
+    with FakeSupabaseStorage() as storage:
+        storage.latency = args.latencia_storage
+        os.environ["BENCH_SUPABASE_URL"] = storage.url
+        comun.preparar_base()
+        import django
+        from django.db import connection
+
+        base, detener = comun.servir_asgi() if args.servidor == "asgi" else comun.servir_wsgi(args.hilos)
+        ctx = Contexto(base, args.semilla, args.tamano_documento, args.lote_whatsapp)
+        sembrar(ctx, args.estudiantes, args.justificaciones)
+
+        resultados = []
+        print(f"{'escenario':<13} {'conc':>5} {'pedidos/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'consultas':>10} {'errores':>8}")
+        for nombre in args.escenarios:
+            for concurrencia in args.concurrencia:
+                r = medir(ESCENARIOS[nombre], ctx, concurrencia, args.pedidos, args.calentamiento)
+                resultados.append(r)
+                extra = "".join(f"  {k}={v}" for k, v in r.items() if k not in _COLUMNAS)
+                print(f"{r['escenario']:<13} {r['concurrencia']:>5} {r['pedidos_s']:>10} {r['p50_ms']:>9} "
+                      f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['consultas']:>10} {r['errores']:>8}{extra}")
+        detener()
+
+    salida = {
+        "meta": {
+            "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "base_de_datos": connection.vendor,
+            "servidor": args.servidor,
+            "hilos": args.hilos,
+            "latencia_storage": args.latencia_storage,
+            "semilla": args.semilla,
+            "justificaciones": args.justificaciones,
+        },
+        "resultados": resultados,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        if regresiones:
+            print("\nRegresiones respecto de la línea base:")
+            print("\n".join(f"  - {r}" for r in regresiones))
+            sys.exit(1)
+        print("\nSin regresiones respecto de la línea base.")
+
+
+_COLUMNAS = {"escenario", "concurrencia", "pedidos", "errores", "segundos", "pedidos_s", "p50_ms", "p95_ms", "p99_ms",
+             "consultas"}
+
+
+if __name__ == "__main__":
+    main()
@@ -14,12 +14,15 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # lookups de trigramas para la búsqueda
     # Apps del proyecto
     "accounts",
     "justificaciones",
 ]
 
 MIDDLEWARE = [
+    # Primero, para contar también las consultas de sesión y autenticación
+    "justificaciones.presupuesto.PresupuestoConsultasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,14 +87,123 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Calculan el SHA-256 de cada archivo mientras se recibe (deduplicación de Documento)
+FILE_UPLOAD_HANDLERS = [
+    "justificaciones.uploadhandlers.HashingMemoryFileUploadHandler",
+    "justificaciones.uploadhandlers.HashingTemporaryFileUploadHandler",
+]
+
 # Supabase Storage Configuration
 SUPABASE_URL = "https://brpecxrwoasnqcaamath.supabase.co"
 SUPABASE_KEY = "sb_publishable_9O5JUmFK3e3bfRRekAeg2g_sMWOuLWy"
 SUPABASE_BUCKET = "Documentos"
 
-# Use Supabase Storage as default file storage (REST API version)
-DEFAULT_FILE_STORAGE = "justificaciones.storage_rest.SupabaseStorageREST"
-
+# Pool HTTP keep-alive compartido por proceso (justificaciones/storage_http.py)
+SUPABASE_STORAGE_POOL_CONNECTIONS = 4
+SUPABASE_STORAGE_POOL_MAXSIZE = 10
+SUPABASE_STORAGE_RETRIES = 3  # reintentos ante 429/5xx (solo GET/HEAD/DELETE)
+SUPABASE_STORAGE_BACKOFF = 0.3  # segundos, crece exponencialmente
+SUPABASE_STORAGE_TIMEOUTS = {  # (conexión, lectura) en segundos por operación
+    "upload": (5, 60),
+    "download": (5, 60),
+    "metadata": (5, 10),
+    "delete": (5, 10),
+}
+# Subidas mayores a este tamaño usan el protocolo reanudable (TUS) de Supabase
+SUPABASE_STORAGE_RESUMABLE_THRESHOLD = 6 * 1024 * 1024
+SUPABASE_STORAGE_RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024  # Supabase exige bloques de 6 MB
+# Caché de metadatos (tamaño, etag, tipo, fecha) de los objetos almacenados.
+# Para compartirla entre procesos usar "justificaciones.storage_cache.DjangoMetadataCache"
+# con OPTIONS {"alias": "<alias de CACHES>", "timeout": 300}.
+SUPABASE_STORAGE_METADATA_CACHE = {
+    "BACKEND": "justificaciones.storage_cache.LocMemMetadataCache",
+    "OPTIONS": {"timeout": 300, "max_entries": 10000},
+}
+# Nombres de objeto: "uuid" (único sin consultar a Supabase) o "legacy"
+SUPABASE_STORAGE_NAMING = "uuid"
+
+# Caché en disco local delante de Supabase (justificaciones/storage_tiered.py), desactivada por defecto
+SUPABASE_STORAGE_DISK_CACHE = False  # True: DEFAULT_FILE_STORAGE pasa a ser TieredStorage
+SUPABASE_STORAGE_DISK_CACHE_BACKEND = "justificaciones.storage_rest.SupabaseStorageREST"  # o storage.SupabaseStorage
+SUPABASE_STORAGE_DISK_CACHE_DIR = MEDIA_ROOT / "storage_cache"  # compartido por los procesos del mismo host
+SUPABASE_STORAGE_DISK_CACHE_MAX_BYTES = 1024 ** 3  # sobre este tamaño se expulsan las copias menos leídas
+SUPABASE_STORAGE_DISK_CACHE_MAX_AGE = 7 * 24 * 3600  # segundos sin lecturas tras los que se expulsa una copia
+
+# Use Supabase Storage as default file storage (REST API version), behind the local disk cache if enabled
+DEFAULT_FILE_STORAGE = (
+    "justificaciones.storage_tiered.TieredStorage"
+    if SUPABASE_STORAGE_DISK_CACHE
+    else "justificaciones.storage_rest.SupabaseStorageREST"
+)
+
+# Cola de tareas en segundo plano (justificaciones/tareas.py)
+TAREAS_EJECUTAR_AL_ENCOLAR = False  # True: ejecuta al confirmar, sin worker (solo desarrollo)
+TAREAS_BACKOFF_SEGUNDOS = 5  # espera base entre reintentos, se duplica en cada intento
+TAREAS_PLAZO_SEGUNDOS = 300  # tras este plazo una tarea EN_CURSO se considera abandonada
+# Máximo de mensajes por POST al webhook de WhatsApp (justificaciones/whatsapp.py)
+WHATSAPP_MAX_LOTE = 500
+# Autenticación del webhook de WhatsApp: secreto de la app para verificar X-Hub-Signature-256,
+# o un token compartido (Authorization: Bearer) para proveedores que no firman. Sin ninguno, responde 403
+WHATSAPP_APP_SECRET = os.environ.get("WHATSAPP_APP_SECRET", "")
+WHATSAPP_WEBHOOK_TOKEN = os.environ.get("WHATSAPP_WEBHOOK_TOKEN", "")
+# Bandeja durable del webhook de WhatsApp (justificaciones/bandeja.py), la consume consumir_whatsapp
+WHATSAPP_BANDEJA_DIR = BASE_DIR / "bandeja_whatsapp"
+WHATSAPP_BANDEJA_FSYNC = True  # False solo si el disco ya garantiza durabilidad (o en desarrollo)
+WHATSAPP_BANDEJA_MAX_INTENTOS = 5  # luego el archivo pasa a fallidos/
+WHATSAPP_BANDEJA_BACKOFF_SEGUNDOS = 5  # espera base entre reintentos, se duplica en cada intento
+WHATSAPP_BANDEJA_PLAZO_SEGUNDOS = 300  # tras este plazo un archivo en procesando/ se considera abandonado
+# Importación masiva de documentos (justificaciones/importacion.py, manage.py importar_documentos)
+IMPORTACION_HILOS = 8  # subidas simultáneas al storage; no más que SUPABASE_STORAGE_POOL_MAXSIZE
+IMPORTACION_LOTE = 100  # archivos por transacción de bulk_create
+# Descarga de documentos (justificaciones/descargas.py): "proxy", "x-accel" (nginx) o "firmada" (URL del storage)
+JUSTIFICACIONES_DESCARGAS = "proxy"
+JUSTIFICACIONES_DESCARGAS_X_ACCEL = "/_documentos/"  # location internal de nginx que apunta al bucket
+JUSTIFICACIONES_DESCARGAS_FIRMA_SEGUNDOS = 60  # vigencia de las URLs firmadas
+# Subida directa de documentos del navegador al storage (justificaciones/subidas.py)
+SUBIDA_DIRECTA = True  # False: los archivos siempre pasan por Django
+SUBIDA_DIRECTA_SEGUNDOS = 900  # plazo entre firmar la subida y enviar el formulario
+SUBIDA_DIRECTA_MAX_BYTES = 25 * 1024 * 1024  # tamaño declarado máximo; igual a LEGIBILIDAD_MAX_BYTES
+SUBIDA_DIRECTA_LIMPIEZA_SEGUNDOS = 2 * 3600 + 300  # vigencia de la URL firmada (2 h) y margen; luego se borra lo no adjuntado
+# Miniaturas y vistas previas de documentos (justificaciones/miniaturas.py)
+MINIATURAS_CACHE = "default"  # alias de CACHES para el candado de generación; compartido si hay varios procesos
+MINIATURAS_ESPERA_SEGUNDOS = 10  # espera máxima a que otro proceso termine de generar las mismas miniaturas
+MINIATURAS_CACHE_SEGUNDOS = 3600  # max-age en el navegador; la clave deriva del contenido
+# Filas por página en los listados de justificaciones (paginación por cursor)
+JUSTIFICACIONES_PAGE_SIZE = 25
+# Presupuesto de consultas por vista (justificaciones/presupuesto.py)
+JUSTIFICACIONES_PRESUPUESTO_ACTIVO = DEBUG  # cuenta consultas y agrega X-Consultas-DB
+JUSTIFICACIONES_PRESUPUESTO_ESTRICTO = False  # True: error en vez de warning al excederlo
+# Caché de fragmentos de template por usuario y sello de versión (justificaciones/fragmentos.py)
+JUSTIFICACIONES_FRAGMENTOS_CACHE = "fragmentos"
+JUSTIFICACIONES_FRAGMENTOS_TIMEOUT = 600  # segundos; al invalidar, los fragmentos viejos expiran solos
+# Motor de búsqueda (justificaciones/busqueda.py): "auto", "postgres" o "simple"
+JUSTIFICACIONES_BUSQUEDA = "auto"
+# Outbox de notificaciones (justificaciones/notificaciones.py)
+NOTIFICACIONES_CANALES = ["email", "app"]  # canales registrados por cada cambio de estado
+NOTIFICACIONES_MAX_INTENTOS = 5  # luego la notificación queda FALLIDA
+NOTIFICACIONES_BACKOFF_SEGUNDOS = 30  # espera base entre reintentos, se duplica en cada intento
+NOTIFICACIONES_PLAZO_SEGUNDOS = 300  # reserva de un lote mientras se envía; si el worker muere, se reintenta al vencer
+# Análisis de legibilidad de documentos (justificaciones/legibilidad.py)
+LEGIBILIDAD_MAX_BYTES = 25 * 1024 * 1024  # lectura máxima por documento
+LEGIBILIDAD_MAX_DESCOMPRIMIDO = 64 * 1024 * 1024  # streams PDF descomprimidos por documento
+LEGIBILIDAD_MAX_SEGUNDOS = 5.0  # tiempo de CPU por documento
+LEGIBILIDAD_MAX_PAGINAS = 200
+LEGIBILIDAD_MAX_PIXELES = 20_000_000
+LEGIBILIDAD_MIN_DPI = 100  # resolución efectiva mínima de un escaneo
+LEGIBILIDAD_MIN_LADO_PX = 500  # lado menor mínimo de una imagen PNG
+LEGIBILIDAD_MIN_ENTROPIA = 1.0  # por debajo la imagen se considera en blanco
+
+# Con varios procesos el alias "fragmentos" debe ser compartido, p. ej.
+#   {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/var/tmp/justifacil"}
+#   {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://127.0.0.1:6379"}
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "fragmentos": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "justifacil-fragmentos",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Justificacion, Documento, Notificacion
+from django.template.defaultfilters import filesizeformat
+from .busqueda import buscar
+from .models import Justificacion, Documento, Notificacion, Tarea
 
 
 @admin.register(Justificacion)
@@ -7,13 +9,35 @@ class JustificacionAdmin(admin.ModelAdmin):
     list_display = ("id", "estudiante", "fecha_inicio", "fecha_fin", "estado", "fuente", "created_at")
     list_filter = ("estado", "fuente", "created_at")
     search_fields = ("estudiante__username", "motivo", "descripcion")
+    # El orden de justi_fuente_creada_idx: con "-id" (el default) el filtro por fuente recorre la tabla
+    ordering = ("-created_at", "-id")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Mismo motor que el dashboard del profesor en lugar de icontains por campo
+        if not search_term:
+            return queryset, False
+        return buscar(queryset, search_term), False
 
 
 @admin.register(Documento)
 class DocumentoAdmin(admin.ModelAdmin):
-    list_display = ("id", "justificacion", "legible", "validado_en")
+    list_display = ("id", "justificacion", "tamano", "legible", "paginas", "dpi", "observaciones_legibilidad", "validado_en")
+    list_filter = ("legible",)
+
+    @admin.display(description="Tamaño")
+    def tamano(self, obj: Documento) -> str:
+        # Resuelto por la caché de metadatos del storage, sin descargar el archivo
+        return filesizeformat(obj.archivo.size) if obj.archivo else "-"
 
 
 @admin.register(Notificacion)
 class NotificacionAdmin(admin.ModelAdmin):
-    list_display = ("id", "destinatario", "canal", "created_at")
+    list_display = ("id", "destinatario", "canal", "estado", "intentos", "proximo_intento", "enviada_en")
+    list_filter = ("estado", "canal")
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "estado", "intentos", "disponible_en", "updated_at")
+    list_filter = ("estado", "tipo")
+    search_fields = ("clave",)
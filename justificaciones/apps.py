@@ -6,5 +6,5 @@ class JustificacionesConfig(AppConfig):
     name = "justificaciones"
 
     def ready(self):
-        # Lugar para señales futuras
+        from . import notificaciones, signals  # noqa: F401
         return super().ready()
@@ -0,0 +1,206 @@
+"""
+Bandeja de entrada durable para el webhook de WhatsApp, al estilo maildir.
+
+El webhook solo escribe el cuerpo recibido en ``tmp/``, lo sincroniza a disco
+y lo mueve con ``rename`` (atómico) a ``nuevos/``; no toca la base, así que
+su latencia no depende de la de Supabase. El consumidor
+(``python manage.py consumir_whatsapp``) reclama archivos moviéndolos a
+``procesando/`` (solo un worker gana el rename), ingiere los mensajes con
+``whatsapp.ingerir`` y borra el archivo. Ante un error de la base el archivo
+vuelve a ``nuevos/`` con el intento en el nombre y el mtime en el momento del
+próximo reintento (backoff exponencial), y lo mismo ante cualquier error
+inesperado con un archivo; al agotar los intentos, o si el payload es
+inválido, pasa a ``fallidos/`` junto a un ``.error``.
+
+Los mensajes rechazados de un lote (usuario desconocido, fecha inválida) se
+guardan en ``fallidos/`` como un lote nuevo, reingresable con
+``consumir_whatsapp --reintentar-fallidos``.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from django.conf import settings
+
+from . import whatsapp
+
+logger = logging.getLogger(__name__)
+
+TMP, NUEVOS, PROCESANDO, FALLIDOS = "tmp", "nuevos", "procesando", "fallidos"
+
+
+def directorio() -> Path:
+    return Path(getattr(settings, "WHATSAPP_BANDEJA_DIR", Path(settings.BASE_DIR) / "bandeja_whatsapp"))
+
+
+def _preparar() -> Path:
+    raiz = directorio()
+    for sub in (TMP, NUEVOS, PROCESANDO, FALLIDOS):
+        (raiz / sub).mkdir(parents=True, exist_ok=True)
+    return raiz
+
+
+def _escribir(raiz: Path, destino: str, nombre: str, cuerpo: bytes) -> Path:
+    """Escribe en tmp/ y publica con rename: los lectores nunca ven un archivo a medias."""
+    temporal = raiz / TMP / nombre
+    with open(temporal, "wb") as f:
+        f.write(cuerpo)
+        if getattr(settings, "WHATSAPP_BANDEJA_FSYNC", True):
+            f.flush()
+            os.fsync(f.fileno())
+    final = raiz / destino / nombre
+    os.rename(temporal, final)
+    return final
+
+
+def depositar(cuerpo: bytes) -> str:
+    """Guarda un payload recibido y devuelve su identificador en la bandeja."""
+    raiz = _preparar()
+    # time_ns al inicio: el orden alfabético de nuevos/ es el de llegada
+    nombre = f"{time.time_ns()}.{os.getpid()}.{uuid.uuid4().hex}.0"
+    _escribir(raiz, NUEVOS, nombre, cuerpo)
+    return nombre.rsplit(".", 1)[0]
+
+
+@dataclass
+class Entrada:
+    ruta: Path
+
+    @property
+    def base(self) -> str:
+        return self.ruta.name.rsplit(".", 1)[0]
+
+    @property
+    def intentos(self) -> int:
+        return int(self.ruta.name.rsplit(".", 1)[1])
+
+
+def reclamar(limite: int = 10) -> list[Entrada]:
+    """Toma hasta ``limite`` archivos disponibles moviéndolos a procesando/."""
+    raiz = _preparar()
+    ahora = time.time()
+    plazo = getattr(settings, "WHATSAPP_BANDEJA_PLAZO_SEGUNDOS", 300)
+    # Archivos de un consumidor que murió a mitad de camino vuelven a la bandeja
+    for ruta in (raiz / PROCESANDO).iterdir():
+        try:
+            if ruta.stat().st_mtime < ahora - plazo:
+                os.rename(ruta, raiz / NUEVOS / ruta.name)
+        except FileNotFoundError:
+            pass
+
+    entradas = []
+    for nombre in sorted(os.listdir(raiz / NUEVOS)):
+        if len(entradas) >= limite:
+            break
+        origen = raiz / NUEVOS / nombre
+        destino = raiz / PROCESANDO / nombre
+        try:
+            if origen.stat().st_mtime > ahora:
+                continue  # en espera de reintento
+            os.rename(origen, destino)
+            os.utime(destino)  # el plazo de abandono corre desde que se reclama
+        except FileNotFoundError:
+            continue  # otro worker lo tomó primero
+        entradas.append(Entrada(destino))
+    return entradas
+
+
+def _a_fallidos(entrada: Entrada, error: str) -> None:
+    raiz = directorio()
+    os.rename(entrada.ruta, raiz / FALLIDOS / entrada.base)
+    (raiz / FALLIDOS / f"{entrada.base}.error").write_text(error, encoding="utf-8")
+    logger.error("Mensaje de WhatsApp %s enviado a fallidos: %s", entrada.base, error)
+
+
+def _reintentar(entrada: Entrada, error: str) -> None:
+    intentos = entrada.intentos + 1
+    if intentos >= getattr(settings, "WHATSAPP_BANDEJA_MAX_INTENTOS", 5):
+        _a_fallidos(entrada, error)
+        return
+    espera = getattr(settings, "WHATSAPP_BANDEJA_BACKOFF_SEGUNDOS", 5) * 2 ** (intentos - 1)
+    destino = directorio() / NUEVOS / f"{entrada.base}.{intentos}"
+    os.rename(entrada.ruta, destino)
+    proximo = time.time() + espera
+    os.utime(destino, (proximo, proximo))
+    logger.warning("Mensaje de WhatsApp %s reintentará en %ss: %s", entrada.base, espera, error)
+
+
+def procesar(limite: int = 10) -> int:
+    """
+    Ingiere un lote de archivos de la bandeja con un solo ``ingerir``.
+    Devuelve cuántos archivos se tomaron.
+    """
+    entradas = reclamar(limite)
+    por_archivo: list[tuple[Entrada, list[whatsapp.Mensaje]]] = []
+    for entrada in entradas:
+        try:
+            datos = json.loads(entrada.ruta.read_bytes().decode("utf-8"))
+            mensajes, _ = whatsapp.leer_payload(datos)
+        except (ValueError, whatsapp.LoteInvalido) as e:
+            _a_fallidos(entrada, f"payload inválido: {e}")  # no mejora reintentando
+            continue
+        except Exception as e:
+            # Un error inesperado no debe dejar el lote en procesando/: cuenta como intento
+            logger.exception("Falló la lectura del mensaje de WhatsApp %s", entrada.base)
+            _reintentar(entrada, f"{type(e).__name__}: {e}")
+            continue
+        por_archivo.append((entrada, mensajes))
+    if not por_archivo:
+        return len(entradas)
+
+    try:
+        resultados = whatsapp.ingerir([m for _, mensajes in por_archivo for m in mensajes])
+    except Exception as e:
+        logger.exception("Falló la ingesta de %s archivos de WhatsApp", len(por_archivo))
+        for entrada, _ in por_archivo:
+            _reintentar(entrada, f"{type(e).__name__}: {e}")
+        return len(entradas)
+
+    resultados = iter(resultados)
+    for entrada, mensajes in por_archivo:
+        rechazados = [(m, r["error"]) for m, r in zip(mensajes, resultados) if not r["ok"]]
+        if rechazados:
+            try:
+                _guardar_rechazados(entrada, rechazados)
+            except Exception as e:
+                # Reingerir es idempotente: lo ya creado figura como duplicado en el próximo intento
+                logger.exception("No se pudieron guardar los rechazados de %s", entrada.base)
+                _reintentar(entrada, f"{type(e).__name__}: {e}")
+                continue
+        entrada.ruta.unlink(missing_ok=True)  # pudo haberse reclamado de nuevo por plazo vencido
+    return len(entradas)
+
+
+def _guardar_rechazados(entrada: Entrada, rechazados: list[tuple[whatsapp.Mensaje, str]]) -> None:
+    lote = {"mensajes": [m.payload for m, _ in rechazados]}
+    nombre = f"{entrada.base}.rechazados"
+    _escribir(directorio(), FALLIDOS, nombre, json.dumps(lote, ensure_ascii=False).encode("utf-8"))
+    errores = "\n".join(f"{m.clave}: {error}" for m, error in rechazados)
+    (directorio() / FALLIDOS / f"{nombre}.error").write_text(errores, encoding="utf-8")
+
+
+def reintentar_fallidos() -> int:
+    """Devuelve los archivos de fallidos/ a la bandeja con los intentos en cero."""
+    raiz = _preparar()
+    movidos = 0
+    for ruta in sorted((raiz / FALLIDOS).iterdir()):
+        if ruta.suffix == ".error":
+            continue
+        os.rename(ruta, raiz / NUEVOS / f"{ruta.name}.0")
+        (raiz / FALLIDOS / f"{ruta.name}.error").unlink(missing_ok=True)
+        movidos += 1
+    return movidos
+
+
+def pendientes() -> dict[str, int]:
+    """Cantidad de archivos por carpeta (para monitoreo)."""
+    raiz = _preparar()
+    return {
+        NUEVOS: len(os.listdir(raiz / NUEVOS)),
+        PROCESANDO: len(os.listdir(raiz / PROCESANDO)),
+        FALLIDOS: sum(1 for n in os.listdir(raiz / FALLIDOS) if not n.endswith(".error")),
+    }
@@ -0,0 +1,107 @@
+"""
+Búsqueda de justificaciones por estudiante (usuario, nombre, apellido),
+motivo y descripción.
+
+Cada Justificacion guarda en ``texto_busqueda`` esos campos normalizados
+(minúsculas, sin tildes), así la búsqueda no necesita joins ni unaccent en
+la base. Hay dos motores, elegidos con JUSTIFICACIONES_BUSQUEDA:
+
+    "postgres"  LIKE + similitud de trigramas (pg_trgm) sobre un índice GIN,
+                ordenado por relevancia. Tolera errores de tipeo.
+    "simple"    LIKE por término, para SQLite y tests.
+    "auto"      (por defecto) según el motor de la base de datos.
+"""
+from __future__ import annotations
+import unicodedata
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, QuerySet, Value, When
+from django.db.models.functions import Cast
+from django.utils.module_loading import import_string
+
+CAMPOS_USUARIO = ("username", "first_name", "last_name")
+CAMPOS_JUSTIFICACION = ("motivo", "descripcion")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios simples: "  Ñandú  Pérez" -> "nandu perez"."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.lower().split())
+
+
+def texto_busqueda(justificacion) -> str:
+    estudiante = justificacion.estudiante
+    partes = [getattr(estudiante, c, "") for c in CAMPOS_USUARIO]
+    partes += [getattr(justificacion, c, "") for c in CAMPOS_JUSTIFICACION]
+    return normalizar(" ".join(p for p in partes if p))
+
+
+class MotorBusqueda:
+    """
+    ``buscar`` filtra y anota ``rango`` (mayor es más relevante); ``orden`` es
+    el orden total que usa paginacion.paginar para los resultados.
+    """
+
+    orden = ("-rango", "-created_at", "-id")
+
+    def terminos(self, q: str) -> list[str]:
+        return normalizar(q).split()[:10]
+
+    def buscar(self, queryset: QuerySet, q: str) -> QuerySet:
+        raise NotImplementedError
+
+
+class MotorSimple(MotorBusqueda):
+    def buscar(self, queryset: QuerySet, q: str) -> QuerySet:
+        terminos = self.terminos(q)
+        if not terminos:
+            return queryset.annotate(rango=Value(0.0, output_field=FloatField()))
+        for termino in terminos:
+            queryset = queryset.filter(texto_busqueda__contains=termino)
+        # Más relevante si el término coincide con el inicio (usuario del estudiante)
+        rango = Value(0.0, output_field=FloatField())
+        for termino in terminos:
+            rango = rango + Case(
+                When(texto_busqueda__startswith=termino, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        return queryset.annotate(rango=rango)
+
+
+class MotorPostgres(MotorBusqueda):
+    def buscar(self, queryset: QuerySet, q: str) -> QuerySet:
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        terminos = self.terminos(q)
+        if not terminos:
+            return queryset.annotate(rango=Value(0.0, output_field=FloatField()))
+        # Cada término debe aparecer tal cual o parecerse a una palabra (errores de tipeo);
+        # ambos operadores usan el índice GIN justi_busqueda_trgm_idx
+        for termino in terminos:
+            queryset = queryset.filter(
+                Q(texto_busqueda__contains=termino) | Q(texto_busqueda__trigram_word_similar=termino)
+            )
+        return queryset.annotate(
+            rango=Cast(TrigramWordSimilarity(Value(" ".join(terminos)), F("texto_busqueda")), FloatField())
+        )
+
+
+MOTORES = {
+    "simple": MotorSimple,
+    "postgres": MotorPostgres,
+}
+
+
+def get_motor() -> MotorBusqueda:
+    nombre = getattr(settings, "JUSTIFICACIONES_BUSQUEDA", "auto")
+    if nombre == "auto":
+        nombre = "postgres" if connection.vendor == "postgresql" else "simple"
+    if nombre in MOTORES:
+        return MOTORES[nombre]()
+    return import_string(nombre)()
+
+
+def buscar(queryset: QuerySet, q: str) -> QuerySet:
+    return get_motor().buscar(queryset, q)
@@ -0,0 +1,65 @@
+"""
+GET condicional (ETag) para dashboards y detalle.
+
+El ETag combina el usuario, su rol, la URL completa y el sello de versión de
+fragmentos.py del ámbito visible (un estudiante o el global), que cambia con
+cualquier escritura, incluidas las de Documento y los borrados. Si el cliente
+ya tiene la versión vigente se responde 304 sin ejecutar la vista ni
+renderizar.
+
+No se envía Last-Modified: un MAX(updated_at) no cambia al escribir un
+Documento ni al borrar filas, y un cliente que solo manda If-Modified-Since
+recibiría 304 con una página vieja. El acceso se decide antes de evaluar las
+cabeceras condicionales; sin acceso la vista responde como siempre.
+"""
+from __future__ import annotations
+import hashlib
+from functools import wraps
+from typing import Callable
+from django.contrib import messages
+from django.http import HttpRequest
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import fragmentos
+
+# (request, *args, **kwargs) -> ámbito del sello (id de estudiante o fragmentos.GLOBAL),
+# o None si el usuario no puede ver la página
+Estado = Callable[..., object]
+
+
+def pagina_condicional(estado: Estado):
+    """
+    Decorador para vistas GET. ``estado`` devuelve el ámbito del sello, o
+    None si el usuario no tiene acceso; se evalúa una vez por request.
+    """
+    def decorator(view_func):
+        def etag(request: HttpRequest, *args, **kwargs) -> str | None:
+            if request.method != "GET":
+                return None
+            partes = [
+                str(request.user.pk),
+                getattr(request.user, "rol", ""),
+                request.get_full_path(),
+                fragmentos.sello(request._ambito_condicional),
+                # Un mensaje pendiente se muestra en la página: no debe responderse 304
+                str(len(messages.get_messages(request))),
+            ]
+            return hashlib.sha256("|".join(partes).encode()).hexdigest()[:32]
+
+        condicional = condition(etag_func=etag)(view_func)
+
+        @wraps(view_func)
+        def _wrapped(request: HttpRequest, *args, **kwargs):
+            request._ambito_condicional = estado(request, *args, **kwargs) if request.method == "GET" else None
+            if request._ambito_condicional is None:
+                # Sin acceso (o no es un GET): la vista decide, sin 304 posible
+                response = view_func(request, *args, **kwargs)
+            else:
+                response = condicional(request, *args, **kwargs)
+            # Contenido por usuario: nunca en cachés compartidas y siempre revalidado
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return _wrapped
+    return decorator
@@ -0,0 +1,186 @@
+"""
+Entrega de los archivos de Documento, después de validar permisos en la vista.
+
+JUSTIFICACIONES_DESCARGAS elige cómo llegan los bytes al navegador:
+
+    "proxy"    (por defecto) Django lee el objeto del storage por partes y lo
+               reenvía en streaming, con soporte de Range e If-None-Match.
+    "x-accel"  responde vacío con X-Accel-Redirect y nginx pide el objeto al
+               storage desde una location ``internal`` (ver README).
+    "firmada"  redirige a una URL firmada de corta duración del storage. Si
+               el backend no firma URLs se usa "proxy".
+
+El ETag es el SHA-256 del contenido que ya guarda Documento, así que un
+If-None-Match que coincide se responde con 304 sin tocar el storage.
+
+Los archivos se sirven inline desde el origen de la app, así que el
+Content-Type sale de la extensión validada (.pdf o .png) y nunca del que
+declaró el cliente al subirlo: un "image/svg+xml" con un <script> adentro no
+debe ejecutarse. Además toda respuesta lleva nosniff y una CSP sandbox.
+
+Las miniaturas y vistas previas (miniaturas.py) pesan pocos KB y siempre
+pasan por Django; como su clave deriva del contenido, el navegador puede
+reutilizarlas durante MINIATURAS_CACHE_SEGUNDOS sin volver a pedirlas.
+"""
+from __future__ import annotations
+import os
+from urllib.parse import quote
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header
+
+from . import miniaturas, storage_async
+from .models import Documento
+from .subidas import TIPOS
+
+
+class RangoInsatisfacible(Exception):
+    pass
+
+
+def rango_solicitado(cabecera: str, tamano: int) -> tuple[int, int] | None:
+    """
+    Interpreta un Range de bytes ("bytes=a-b", "bytes=a-" o "bytes=-n") y
+    devuelve (inicio, fin) inclusivo. None si no corresponde aplicar un rango
+    (sin cabecera, varios rangos o sintaxis inválida): se entrega el archivo
+    completo, como permite la RFC 9110.
+    """
+    unidad, _, especificacion = cabecera.partition("=")
+    if unidad.strip().lower() != "bytes" or "," in especificacion:
+        return None
+    inicio, guion, fin = especificacion.strip().partition("-")
+    if not guion:
+        return None
+    try:
+        if inicio == "":
+            # Sufijo: los últimos n bytes
+            ultimos = int(fin)
+            if ultimos <= 0 or tamano == 0:
+                raise RangoInsatisfacible
+            return max(0, tamano - ultimos), tamano - 1
+        primero = int(inicio)
+        ultimo = int(fin) if fin else tamano - 1
+    except ValueError:
+        return None
+    if primero < 0 or (fin and ultimo < primero):
+        return None
+    if primero >= tamano:
+        raise RangoInsatisfacible
+    return primero, min(ultimo, tamano - 1)
+
+
+def etag(documento: Documento) -> str | None:
+    return f'"{documento.sha256}"' if documento.sha256 else None
+
+
+def _coincide(cabecera: str, etiqueta: str) -> bool:
+    # Comparación débil, como exige If-None-Match
+    etiquetas = {e.strip().removeprefix("W/") for e in cabecera.split(",")}
+    return "*" in etiquetas or etiqueta in etiquetas
+
+
+def _tipo(nombre: str) -> str | None:
+    """Content-Type de un documento según su extensión; None si no es de las admitidas."""
+    return TIPOS.get(os.path.splitext(nombre)[1].lower())
+
+
+def _disposicion(nombre: str) -> str:
+    # inline solo para los tipos admitidos: el navegador muestra el PDF o la imagen a medida que llega
+    return content_disposition_header(_tipo(nombre) is None, nombre)
+
+
+def _respuesta(response: HttpResponse, etiqueta: str | None) -> HttpResponse:
+    if etiqueta:
+        response["ETag"] = etiqueta
+    # El contenido lo subió un usuario: sin adivinar el tipo ni ejecutar scripts en el origen de la app
+    response["X-Content-Type-Options"] = "nosniff"
+    response["Content-Security-Policy"] = "sandbox"
+    # Privado: el permiso se revalida en cada pedido, aunque el contenido no cambie
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+async def responder(request: HttpRequest, documento: Documento) -> HttpResponse:
+    """Respuesta de descarga para ``documento``; el permiso ya debe estar validado."""
+    archivo = documento.archivo
+    nombre = os.path.basename(archivo.name)
+    etiqueta = etag(documento)
+    if etiqueta and _coincide(request.headers.get("If-None-Match", ""), etiqueta):
+        return _respuesta(HttpResponse(status=304), etiqueta)
+
+    modo = getattr(settings, "JUSTIFICACIONES_DESCARGAS", "proxy")
+    if modo == "firmada":
+        url = await storage_async.asigned_url(
+            archivo.storage, archivo.name, getattr(settings, "JUSTIFICACIONES_DESCARGAS_FIRMA_SEGUNDOS", 60)
+        )
+        if url is not None:
+            response = HttpResponseRedirect(url)
+            response["Cache-Control"] = "private, no-store"  # la URL caduca: no se reutiliza la redirección
+            return response
+    elif modo == "x-accel":
+        prefijo = getattr(settings, "JUSTIFICACIONES_DESCARGAS_X_ACCEL", "/_documentos/")
+        response = HttpResponse(content_type=_tipo(nombre) or "application/octet-stream")
+        response["X-Accel-Redirect"] = prefijo + quote(archivo.name)
+        response["Content-Disposition"] = _disposicion(nombre)
+        return _respuesta(response, etiqueta)
+
+    rango = None
+    cabecera = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if cabecera and (if_range is None or if_range == etiqueta):
+        metadata = await storage_async.ametadata(archivo.storage, archivo.name)
+        if metadata is None:
+            raise Http404("Archivo no encontrado en el storage")
+        try:
+            rango = rango_solicitado(cabecera, metadata.size)
+        except RangoInsatisfacible:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{metadata.size}"
+            return _respuesta(response, etiqueta)
+
+    try:
+        metadata, cuerpo = await storage_async.astream(
+            # Bajo WSGI (sin scope ASGI) el cuerpo debe ser un iterador sync para no acumularse en memoria
+            archivo.storage, archivo.name, rango, sync_body=not hasattr(request, "scope")
+        )
+    except FileNotFoundError:
+        raise Http404("Archivo no encontrado en el storage")
+    response = StreamingHttpResponse(
+        cuerpo,
+        status=206 if rango else 200,
+        content_type=_tipo(nombre) or "application/octet-stream",
+    )
+    response["Content-Disposition"] = _disposicion(nombre)
+    response["Accept-Ranges"] = "bytes"
+    if rango:
+        response["Content-Length"] = str(rango[1] - rango[0] + 1)
+        response["Content-Range"] = f"bytes {rango[0]}-{rango[1]}/{metadata.size}"
+    else:
+        response["Content-Length"] = str(metadata.size)
+    return _respuesta(response, etiqueta)
+
+
+async def responder_variante(request: HttpRequest, documento: Documento, variante: str) -> HttpResponse:
+    """Miniatura o vista previa de ``documento``, generada si hace falta; el permiso ya debe estar validado."""
+    etiqueta = miniaturas.etag(documento, variante)
+    if _coincide(request.headers.get("If-None-Match", ""), etiqueta):
+        response = _respuesta(HttpResponse(status=304), etiqueta)
+    else:
+        # Puede generar la variante (Pillow, CPU): en un hilo para no frenar el event loop
+        nombre = await sync_to_async(miniaturas.obtener, thread_sensitive=False)(documento, variante)
+        if nombre is None:
+            raise Http404("El documento no tiene vista previa")
+        try:
+            metadata, cuerpo = await storage_async.astream(
+                documento.archivo.storage, nombre, sync_body=not hasattr(request, "scope")
+            )
+        except FileNotFoundError:
+            raise Http404("Vista previa no encontrada en el storage")
+        response = StreamingHttpResponse(cuerpo, content_type=miniaturas.formato()[2])
+        response["Content-Length"] = str(metadata.size)
+        response = _respuesta(response, etiqueta)
+    response["Cache-Control"] = f"private, max-age={getattr(settings, 'MINIATURAS_CACHE_SEGUNDOS', 3600)}"
+    return response
@@ -0,0 +1,110 @@
+"""
+Contadores precalculados de justificaciones (JustificacionStats).
+
+Cada Justificacion suma 1 en la fila (estudiante, estado, fuente, día del
+último cambio de estado). Los signals de signals.py mueven ese 1 al crear,
+cambiar de estado o borrar; las actualizaciones masivas (queryset.update,
+bulk_create) deben llamar a ``mover``/``registrar`` explícitamente. Los
+dashboards leen los totales de aquí en vez de contar la tabla principal.
+"""
+from __future__ import annotations
+from collections import Counter
+from datetime import timedelta
+from typing import Iterable
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Justificacion, JustificacionStats
+
+
+def registrar(deltas: Counter) -> None:
+    """
+    Aplica deltas {(estudiante_id, estado, fuente, dia): n} en una sola
+    consulta: un INSERT ... ON CONFLICT DO UPDATE que suma cada delta a su
+    fila o la crea (PostgreSQL y SQLite). Es atómico frente a otros procesos
+    que muevan las mismas filas, así que no hace falta leerlas antes.
+    """
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    q = connection.ops.quote_name
+    tabla = q(JustificacionStats._meta.db_table)
+    columnas = ", ".join(q(c) for c in ("estudiante_id", "estado", "fuente", "dia"))
+    filas = sorted(deltas.items())  # orden fijo: dos lotes concurrentes no se bloquean en cruz
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} ({columnas}, {q('total')}) VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(filas))} "
+            f"ON CONFLICT ({columnas}) DO UPDATE SET {q('total')} = {tabla}.{q('total')} + excluded.{q('total')}",
+            [valor for clave, delta in filas for valor in (*clave, delta)],
+        )
+
+
+def mover(justificaciones: Iterable[Justificacion]) -> None:
+    """
+    Registra el cambio de clave de cada justificación desde la que tenía al
+    cargarse hasta la actual. Para cambios hechos con queryset.update().
+    """
+    deltas: Counter = Counter()
+    for justi in justificaciones:
+        original = getattr(justi, "_clave_stats_original", None)
+        actual = justi.clave_stats()
+        if original == actual:
+            continue
+        if original is not None:
+            deltas[original] -= 1
+        deltas[actual] += 1
+        justi._clave_stats_original = actual
+    registrar(deltas)
+
+
+def contadores() -> dict[str, int]:
+    """Totales para los dashboards, en una sola consulta sobre JustificacionStats."""
+    hoy = timezone.localdate()
+    inicio_semana = hoy - timedelta(days=hoy.weekday())
+    totales = JustificacionStats.objects.aggregate(
+        pendientes=Sum("total", filter=Q(estado=Justificacion.Estado.PENDIENTE)),
+        aprobadas_semana=Sum("total", filter=Q(estado=Justificacion.Estado.APROBADA, dia__gte=inicio_semana)),
+        rechazadas_semana=Sum("total", filter=Q(estado=Justificacion.Estado.RECHAZADA, dia__gte=inicio_semana)),
+        pendientes_whatsapp=Sum("total", filter=Q(estado=Justificacion.Estado.PENDIENTE, fuente="whatsapp")),
+    )
+    return {nombre: valor or 0 for nombre, valor in totales.items()}
+
+
+def _esperado() -> Counter:
+    filas = (
+        Justificacion.objects.annotate(dia=TruncDate("estado_actualizado_en"))
+        .values("estudiante_id", "estado", "fuente", "dia")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    return Counter({(f["estudiante_id"], f["estado"], f["fuente"], f["dia"]): f["total"] for f in filas})
+
+
+def _actual() -> Counter:
+    filas = JustificacionStats.objects.exclude(total=0).values_list("estudiante_id", "estado", "fuente", "dia", "total")
+    return Counter({tuple(f[:4]): f[4] for f in filas})
+
+
+def diferencias() -> dict[tuple, tuple[int, int]]:
+    """{clave: (esperado, registrado)} para cada fila que no coincide con la tabla principal."""
+    esperado, actual = _esperado(), _actual()
+    return {
+        clave: (esperado.get(clave, 0), actual.get(clave, 0))
+        for clave in esperado.keys() | actual.keys()
+        if esperado.get(clave, 0) != actual.get(clave, 0)
+    }
+
+
+def reconstruir() -> int:
+    """Recalcula JustificacionStats desde cero. Devuelve la cantidad de filas."""
+    # Un cambio de estado concurrente puede quedar fuera; --verificar lo detecta
+    with transaction.atomic():
+        JustificacionStats.objects.all().delete()
+        filas = [
+            JustificacionStats(estudiante_id=e, estado=estado, fuente=fuente, dia=dia, total=total)
+            for (e, estado, fuente, dia), total in _esperado().items()
+        ]
+        JustificacionStats.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
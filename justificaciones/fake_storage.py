@@ -0,0 +1,293 @@
+"""
+Local stand-in for the Supabase Storage REST API.
+Runs a threaded HTTP server on 127.0.0.1 that keeps objects in memory, so
+tests and benchmarks can exercise the storage backends without network access.
+"""
+from __future__ import annotations
+import base64
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+UPLOAD_SIGN_PREFIX = "/storage/v1/object/upload/sign/"
+# Lifetime of signed upload URLs; fixed in Supabase
+UPLOAD_URL_SECONDS = 2 * 3600
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+
+@dataclass
+class StoredObject:
+    data: bytes
+    content_type: str
+    last_modified: str = field(default_factory=lambda: formatdate(usegmt=True))
+
+    @property
+    def etag(self) -> str:
+        return f'"{hashlib.md5(self.data).hexdigest()}"'
+
+
+@dataclass
+class ResumableUpload:
+    bucket: str
+    name: str
+    content_type: str
+    length: int
+    data: bytearray = field(default_factory=bytearray)
+
+
+class FakeStorageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeSupabaseStorage"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    # -- helpers -----------------------------------------------------------
+
+    def _record(self) -> None:
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None) -> None:
+        self.send_response(status)
+        headers = headers or {}
+        headers.setdefault("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        self._send(status, json.dumps(payload).encode(), {"Content-Type": "application/json", **(headers or {})})
+
+    def _object_key(self) -> tuple[str, str] | None:
+        path = self.path.split("?", 1)[0]
+        for prefix in ("/storage/v1/object/public/", "/storage/v1/object/"):
+            if path.startswith(prefix):
+                bucket, _, name = path[len(prefix):].partition("/")
+                return bucket, name
+        return None
+
+    def _object_headers(self, obj: StoredObject) -> dict:
+        return {
+            "Content-Type": obj.content_type,
+            "Content-Length": str(len(obj.data)),
+            "ETag": obj.etag,
+            "Last-Modified": obj.last_modified,
+        }
+
+    # -- verbs ---------------------------------------------------------------
+
+    def do_POST(self) -> None:
+        self._record()
+        if self.path.rstrip("/") == "/storage/v1/upload/resumable":
+            return self._create_resumable()
+        if self.path.startswith("/storage/v1/object/sign/"):
+            bucket, _, name = self.path[len("/storage/v1/object/sign/"):].partition("/")
+            return self._create_signed_url(bucket, name)
+        if self.path.startswith(UPLOAD_SIGN_PREFIX):
+            bucket, _, name = self.path[len(UPLOAD_SIGN_PREFIX):].partition("/")
+            return self._create_signed_upload_url(bucket, name)
+        key = self._object_key()
+        body = self._read_body()
+        if key is None:
+            return self._send_json(404, {"error": "not_found"})
+        if key in self.server.objects and self.headers.get("x-upsert") != "true":
+            return self._send_json(400, {"statusCode": "409", "error": "Duplicate"})
+        content_type = self.headers.get("Content-Type", "application/octet-stream")
+        self.server.objects[key] = StoredObject(body, content_type)
+        self._send_json(200, {"Key": "/".join(key), "Id": str(uuid.uuid4())})
+
+    def do_GET(self) -> None:
+        self._record()
+        if self.path.startswith("/storage/v1/object/sign/"):
+            key = self._signed_key()
+            if key is None:
+                return self._send_json(400, {"error": "InvalidJWT"})
+        else:
+            key = self._object_key()
+        obj = self.server.objects.get(key) if key else None
+        if obj is None:
+            return self._send_json(404, {"error": "not_found"})
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(obj.data) - 1), len(obj.data) - 1)
+            if start > end:
+                return self._send(416, headers={"Content-Range": f"bytes */{len(obj.data)}"})
+            headers = {
+                **self._object_headers(obj),
+                "Content-Length": str(end - start + 1),
+                "Content-Range": f"bytes {start}-{end}/{len(obj.data)}",
+            }
+            return self._send(206, obj.data[start:end + 1], headers)
+        self._send(200, obj.data, self._object_headers(obj))
+
+    def _sign(self, bucket: str, name: str, expires: int, purpose: str = "download") -> str:
+        message = f"{purpose}:{bucket}/{name}:{expires}"
+        return hmac.new(self.server.signing_key, message.encode(), "sha256").hexdigest()
+
+    def _create_signed_url(self, bucket: str, name: str) -> None:
+        if (bucket, name) not in self.server.objects:
+            return self._send_json(404, {"error": "not_found"})
+        expires = int(time.time()) + int(json.loads(self._read_body() or b"{}").get("expiresIn", 60))
+        token = f"{expires}.{self._sign(bucket, name, expires)}"
+        self._send_json(200, {"signedURL": f"/object/sign/{bucket}/{name}?token={token}"})
+
+    def _signed_key(self, prefix: str = "/storage/v1/object/sign/", purpose: str = "download") -> tuple[str, str] | None:
+        path, _, query = self.path.partition("?")
+        bucket, _, name = path[len(prefix):].partition("/")
+        expires, _, signature = parse_qs(query).get("token", [""])[0].partition(".")
+        if not expires.isdigit() or int(expires) < time.time():
+            return None
+        if not hmac.compare_digest(signature, self._sign(bucket, name, int(expires), purpose)):
+            return None
+        return bucket, name
+
+    def _create_signed_upload_url(self, bucket: str, name: str) -> None:
+        self._read_body()
+        expires = int(time.time()) + UPLOAD_URL_SECONDS
+        token = f"{expires}.{self._sign(bucket, name, expires, 'upload')}"
+        self._send_json(200, {"url": f"/object/upload/sign/{bucket}/{name}?token={token}", "token": token})
+
+    def do_PUT(self) -> None:
+        """Upload to a signed upload URL, as the browser does."""
+        self._record()
+        body = self._read_body()
+        key = self._signed_key(UPLOAD_SIGN_PREFIX, "upload") if self.path.startswith(UPLOAD_SIGN_PREFIX) else None
+        if key is None:
+            return self._send_json(400, {"error": "InvalidJWT"}, CORS_HEADERS)
+        if key in self.server.objects and self.headers.get("x-upsert") != "true":
+            return self._send_json(400, {"statusCode": "409", "error": "Duplicate"}, CORS_HEADERS)
+        content_type = self.headers.get("Content-Type", "application/octet-stream")
+        self.server.objects[key] = StoredObject(body, content_type)
+        self._send_json(200, {"Key": "/".join(key)}, CORS_HEADERS)
+
+    def do_OPTIONS(self) -> None:
+        # CORS preflight of the browser's PUT, for trying direct uploads against the fake in development
+        self._send(204, headers={
+            **CORS_HEADERS,
+            "Access-Control-Allow-Methods": "PUT",
+            "Access-Control-Allow-Headers": "content-type, x-upsert",
+        })
+
+    def do_HEAD(self) -> None:
+        self._record()
+        if self.path.startswith("/storage/v1/upload/resumable/"):
+            upload = self.server.uploads.get(self.path.rsplit("/", 1)[-1])
+            if upload is None:
+                return self._send(404)
+            return self._send(200, headers={
+                "Upload-Offset": str(len(upload.data)),
+                "Upload-Length": str(upload.length),
+                "Content-Length": "0",
+            })
+        key = self._object_key()
+        obj = self.server.objects.get(key) if key else None
+        if obj is None:
+            return self._send(404)
+        self._send(200, headers=self._object_headers(obj))
+
+    def do_DELETE(self) -> None:
+        self._record()
+        key = self._object_key()
+        if key is None or self.server.objects.pop(key, None) is None:
+            return self._send_json(404, {"error": "not_found"})
+        self._send_json(200, {"message": "Successfully deleted"})
+
+    def do_PATCH(self) -> None:
+        self._record()
+        upload = self.server.uploads.get(self.path.rsplit("/", 1)[-1])
+        body = self._read_body()
+        if upload is None:
+            return self._send(404)
+        if self.server.fail_next_patch:
+            # Simulate a connection that dropped after part of the chunk arrived
+            self.server.fail_next_patch = False
+            upload.data += body[: len(body) // 2]
+            return self._send(503)
+        if int(self.headers["Upload-Offset"]) != len(upload.data):
+            return self._send(409)
+        upload.data += body
+        if len(upload.data) == upload.length:
+            self.server.objects[(upload.bucket, upload.name)] = StoredObject(bytes(upload.data), upload.content_type)
+        self._send(204, headers={"Upload-Offset": str(len(upload.data)), "Tus-Resumable": "1.0.0"})
+
+    def _create_resumable(self) -> None:
+        metadata = {}
+        for item in self.headers.get("Upload-Metadata", "").split(","):
+            key, _, value = item.strip().partition(" ")
+            metadata[key] = base64.b64decode(value).decode()
+        upload_id = uuid.uuid4().hex
+        self.server.uploads[upload_id] = ResumableUpload(
+            bucket=metadata["bucketName"],
+            name=metadata["objectName"],
+            content_type=metadata.get("contentType", "application/octet-stream"),
+            length=int(self.headers["Upload-Length"]),
+        )
+        self._send(201, headers={"Location": f"/storage/v1/upload/resumable/{upload_id}", "Tus-Resumable": "1.0.0"})
+
+
+class FakeSupabaseStorage(ThreadingHTTPServer):
+    """
+    In-memory Supabase Storage server.
+
+    Usage:
+        with FakeSupabaseStorage() as fake:
+            settings.SUPABASE_URL = fake.url
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), FakeStorageHandler)
+        self.objects: dict[tuple[str, str], StoredObject] = {}
+        self.uploads: dict[str, ResumableUpload] = {}
+        self.requests: list[tuple[str, str, dict]] = []
+        self.fail_next_patch = False
+        # Seconds added to every request, to simulate the round trip to Supabase in benchmarks
+        self.latency = 0.0
+        self.signing_key = uuid.uuid4().bytes
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeSupabaseStorage":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeSupabaseStorage":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
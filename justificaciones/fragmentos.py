@@ -0,0 +1,81 @@
+"""
+Caché de fragmentos de template con sellos de versión.
+
+Cada estudiante tiene un sello (y hay uno global para las vistas de
+coordinador y profesor) que cambia con cualquier escritura de sus
+Justificacion/Documento. Las claves de los fragmentos incluyen el sello, de
+modo que invalidar es cambiar el sello: los fragmentos viejos quedan
+inalcanzables y expiran solos. El backend es el alias
+JUSTIFICACIONES_FRAGMENTOS_CACHE de CACHES (locmem, archivo o Redis).
+"""
+from __future__ import annotations
+import hashlib
+import threading
+import uuid
+from collections import Counter
+from typing import Iterable
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+PREFIJO = "justi:frag"
+GLOBAL = "global"
+
+_metricas: dict[str, Counter] = {}
+_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, "JUSTIFICACIONES_FRAGMENTOS_CACHE", "default")]
+
+
+def _clave_sello(ambito) -> str:
+    return f"{PREFIJO}:sello:{ambito}"
+
+
+def sello(ambito=GLOBAL) -> str:
+    """Sello vigente del ámbito (id de estudiante o GLOBAL); se crea si no existe."""
+    cache = get_cache()
+    clave = _clave_sello(ambito)
+    valor = cache.get(clave)
+    if valor is None:
+        # add(): si dos requests crean el sello a la vez, ambos usan el mismo
+        cache.add(clave, uuid.uuid4().hex, timeout=None)
+        valor = cache.get(clave)
+    return valor
+
+
+def invalidar(estudiante_ids: Iterable[int]) -> None:
+    """
+    Renueva los sellos de los estudiantes y el global: ahora y de nuevo al
+    confirmar la transacción, porque entretanto otro request puede haber
+    cacheado los datos anteriores con el sello recién renovado.
+    """
+    claves = [_clave_sello(e) for e in set(estudiante_ids)] + [_clave_sello(GLOBAL)]
+
+    def _renovar() -> None:
+        get_cache().set_many({clave: uuid.uuid4().hex for clave in claves}, timeout=None)
+
+    _renovar()
+    transaction.on_commit(_renovar)
+
+
+def clave_fragmento(nombre: str, usuario_id, ambito, variante: str = "") -> str:
+    variante = hashlib.md5(variante.encode()).hexdigest()
+    return f"{PREFIJO}:{nombre}:{usuario_id}:{ambito}:{sello(ambito)}:{variante}"
+
+
+def registrar(nombre: str, acierto: bool) -> None:
+    with _lock:
+        _metricas.setdefault(nombre, Counter())["hits" if acierto else "misses"] += 1
+
+
+def metricas() -> dict[str, dict[str, int]]:
+    """Aciertos y fallos por fragmento en este proceso, p. ej. {"tabla": {"hits": 9, "misses": 1}}."""
+    with _lock:
+        return {nombre: {"hits": c["hits"], "misses": c["misses"]} for nombre, c in _metricas.items()}
+
+
+def reiniciar_metricas() -> None:
+    with _lock:
+        _metricas.clear()
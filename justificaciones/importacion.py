@@ -0,0 +1,379 @@
+"""
+Importación masiva de documentos escaneados (``python manage.py importar_documentos``).
+
+El origen es un directorio con una carpeta por estudiante
+(``<origen>/<username>/<archivo>.pdf``: una justificación nueva por archivo)
+o un manifiesto CSV con la columna ``archivo`` (ruta relativa a la carpeta
+del CSV) y ``username`` o ``justificacion`` (id existente al que se adjunta
+el documento); ``fecha_inicio``, ``motivo`` y ``descripcion`` son opcionales.
+
+Los archivos se procesan por lotes. En cada lote un pool acotado de hilos
+calcula los SHA-256 y sube al storage solo el contenido que no está ya
+almacenado (la misma deduplicación que Documento.save()). Después las
+Justificacion y Documento del lote se crean con bulk_create en una
+transacción y se encola su validación de legibilidad.
+
+Cada archivo terminado se anota en un diario (JSON por línea) que permite
+retomar una importación interrumpida sin volver a leer lo ya importado. Si
+el corte ocurre entre el commit y la escritura del diario, la clave de
+idempotencia de la justificación (o el hash del documento en una existente)
+evita duplicarlo al retomar.
+"""
+from __future__ import annotations
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+
+from . import estadisticas, fragmentos
+from .busqueda import texto_busqueda
+from .models import Documento, Justificacion, bloquear_contenido
+from .subidas import _descartar
+from .tareas import encolar_validaciones
+
+FUENTE = "importacion"
+MOTIVO_POR_DEFECTO = "Certificado importado"
+EXTENSIONES = {".pdf", ".png"}  # las que admite Documento.archivo
+
+
+@dataclass
+class Item:
+    """Un archivo a importar y su destino."""
+
+    ruta: Path
+    clave: str  # identifica el archivo en el diario
+    username: str = ""
+    justificacion_id: int | None = None
+    fecha_inicio: date | None = None
+    motivo: str = MOTIVO_POR_DEFECTO
+    descripcion: str = ""
+    error: str = ""
+    # Completados durante la importación
+    tamano: int = 0
+    sha256: str = ""
+    archivo: str = ""
+    estudiante: object = None  # solo para justificaciones nuevas
+    estudiante_id: int | None = None
+
+    @property
+    def clave_idempotencia(self) -> str:
+        # El mismo certificado importado dos veces para el mismo estudiante es la misma justificación
+        return "importacion:" + hashlib.sha256(f"{self.username}:{self.sha256}".encode()).hexdigest()
+
+
+@dataclass
+class Resultado:
+    total: int = 0
+    importados: int = 0
+    bytes: int = 0  # de los archivos importados
+    subidos: int = 0  # el resto reutilizó un objeto ya almacenado
+    omitidos: int = 0  # ya importados (diario o base)
+    errores: list[tuple[str, str]] = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def archivos_s(self) -> float:
+        return self.importados / self.segundos if self.segundos else 0.0
+
+    @property
+    def mb_s(self) -> float:
+        return self.bytes / (1024 * 1024) / self.segundos if self.segundos else 0.0
+
+
+def leer_directorio(origen: str | os.PathLike, fecha: date, motivo: str = MOTIVO_POR_DEFECTO) -> list[Item]:
+    """Items de ``<origen>/<username>/<archivo>``, en orden estable."""
+    origen = Path(origen)
+    items = []
+    for ruta in sorted(p for p in origen.glob("*/*") if p.is_file()):
+        relativa = ruta.relative_to(origen).as_posix()
+        items.append(Item(ruta=ruta, clave=relativa, username=ruta.parent.name, fecha_inicio=fecha, motivo=motivo))
+    return items
+
+
+def leer_manifiesto(manifiesto: str | os.PathLike, fecha: date, motivo: str = MOTIVO_POR_DEFECTO) -> list[Item]:
+    """Items de un CSV; las filas inválidas llegan con ``error`` para informarlas."""
+    manifiesto = Path(manifiesto)
+    items = []
+    with open(manifiesto, newline="", encoding="utf-8-sig") as f:
+        for linea, fila in enumerate(csv.DictReader(f), start=2):
+            fila = {k.strip().lower(): (v or "").strip() for k, v in fila.items() if k}
+            archivo = fila.get("archivo", "")
+            destino = fila.get("justificacion") or fila.get("username", "")
+            item = Item(
+                ruta=manifiesto.parent / archivo,
+                clave=f"{archivo}|{destino}",
+                username=fila.get("username", ""),
+                fecha_inicio=fecha,
+                motivo=(fila.get("motivo") or motivo)[:255],
+                descripcion=fila.get("descripcion", ""),
+            )
+            if not archivo or not destino:
+                item.error = f"línea {linea}: faltan archivo y username o justificacion"
+            elif fila.get("justificacion"):
+                if fila["justificacion"].isdigit():
+                    item.justificacion_id = int(fila["justificacion"])
+                else:
+                    item.error = f"línea {linea}: justificacion debe ser un id"
+            if fila.get("fecha_inicio"):
+                try:
+                    item.fecha_inicio = date.fromisoformat(fila["fecha_inicio"])
+                except ValueError:
+                    item.error = f"línea {linea}: fecha_inicio inválida (se espera AAAA-MM-DD)"
+            items.append(item)
+    return items
+
+
+def leer_diario(diario: str | os.PathLike | None) -> set[str]:
+    """Claves ya importadas. Una última línea cortada (interrupción al escribir) se ignora."""
+    if diario is None or not os.path.exists(diario):
+        return set()
+    hechas = set()
+    with open(diario, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                hechas.add(json.loads(linea)["clave"])
+            except (ValueError, KeyError):
+                continue
+    return hechas
+
+
+def importar(
+    items: Iterable[Item],
+    diario: str | os.PathLike | None = None,
+    hilos: int | None = None,
+    lote: int | None = None,
+    progreso: Callable[[Resultado], None] | None = None,
+) -> Resultado:
+    """Importa los items por lotes y devuelve el resumen; ``progreso`` se llama tras cada lote."""
+    hilos = hilos or getattr(settings, "IMPORTACION_HILOS", 8)
+    lote = lote or getattr(settings, "IMPORTACION_LOTE", 100)
+    items = list(items)
+    resultado = Resultado(total=len(items))
+    hechas = leer_diario(diario)
+    pendientes = []
+    for item in items:
+        if item.clave in hechas:
+            resultado.omitidos += 1
+        elif item.error:
+            resultado.errores.append((item.clave, item.error))
+        else:
+            pendientes.append(item)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool, _abrir_diario(diario) as anotar:
+        for desde in range(0, len(pendientes), lote):
+            _importar_lote(pendientes[desde:desde + lote], pool, anotar, resultado)
+            resultado.segundos = time.perf_counter() - inicio
+            if progreso:
+                progreso(resultado)
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+@contextmanager
+def _abrir_diario(diario: str | os.PathLike | None) -> Iterator[Callable[[list[tuple[str, int | None]]], None]]:
+    """Devuelve una función que anota (clave, documento_id) terminados y los sincroniza a disco."""
+    if diario is None:
+        yield lambda terminadas: None
+        return
+    with open(diario, "a", encoding="utf-8") as archivo:
+        def anotar(terminadas: list[tuple[str, int | None]]) -> None:
+            if not terminadas:
+                return
+            archivo.writelines(
+                json.dumps({"clave": clave, "documento": pk}, ensure_ascii=False) + "\n" for clave, pk in terminadas
+            )
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+        yield anotar
+
+
+def _importar_lote(items: list[Item], pool: ThreadPoolExecutor, anotar, resultado: Resultado) -> None:
+    for item in pool.map(_hashear, items):
+        if item.error:
+            resultado.errores.append((item.clave, item.error))
+    items = _resolver_destinos([i for i in items if not i.error], resultado)
+    ya_importados = _ya_importados(items)
+    if ya_importados:
+        resultado.omitidos += len(ya_importados)
+        anotar([(i.clave, None) for i in ya_importados])
+        items = [i for i in items if i not in ya_importados]
+    if not items:
+        return
+
+    # Un objeto por contenido: se reutilizan los ya almacenados y se sube una vez cada hash nuevo
+    almacenados = dict(
+        Documento.objects.filter(sha256__in={i.sha256 for i in items}).exclude(archivo="").values_list("sha256", "archivo")
+    )
+    a_subir = {}
+    for item in items:
+        if item.sha256 in almacenados:
+            item.archivo = almacenados[item.sha256]
+        else:
+            a_subir.setdefault(item.sha256, item)
+    for subido in pool.map(_subir, a_subir.values()):
+        if not subido.error:
+            almacenados[subido.sha256] = subido.archivo
+            resultado.subidos += 1
+    for item in items:
+        if item.sha256 in almacenados:
+            item.archivo = almacenados[item.sha256]
+        else:
+            item.error = a_subir[item.sha256].error
+            resultado.errores.append((item.clave, item.error))
+    items = [i for i in items if not i.error]
+
+    subidos = [i.archivo for i in a_subir.values() if not i.error]
+    try:
+        with transaction.atomic():
+            items = _confirmar_reutilizados(items, set(almacenados.values()) - set(subidos), resultado)
+            documentos = _crear(items)
+    except BaseException:
+        # Sin el commit ningún Documento apunta a lo recién subido
+        storage = Documento._meta.get_field("archivo").storage
+        for clave in subidos:
+            _descartar(storage, clave)
+        raise
+    resultado.importados += len(documentos)
+    resultado.bytes += sum(i.tamano for i in items)
+    anotar([(i.clave, d.pk) for i, d in zip(items, documentos)])
+
+
+def _confirmar_reutilizados(items: list[Item], reutilizados: set[str], resultado: Resultado) -> list[Item]:
+    """
+    Toma el bloqueo de cada contenido reutilizado y descarta los items cuyo
+    objeto se borró desde la consulta (ver signals.borrar_archivo_sin_referencias).
+    Va en la transacción del bulk_create.
+    """
+    for sha256 in sorted({i.sha256 for i in items if i.archivo in reutilizados}):
+        bloquear_contenido(sha256)
+    vigentes = set(Documento.objects.filter(archivo__in=reutilizados).values_list("archivo", flat=True))
+    confirmados = []
+    for item in items:
+        if item.archivo in reutilizados and item.archivo not in vigentes:
+            item.error = "el archivo almacenado se borró durante la importación"
+            resultado.errores.append((item.clave, item.error))
+        else:
+            confirmados.append(item)
+    return confirmados
+
+
+def _hashear(item: Item) -> Item:
+    if item.ruta.suffix.lower() not in EXTENSIONES:
+        item.error = "formato no permitido, solo " + ", ".join(sorted(EXTENSIONES))
+        return item
+    hasher = hashlib.sha256()
+    try:
+        with open(item.ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(bloque)
+                item.tamano += len(bloque)
+    except OSError as e:
+        item.error = f"no se pudo leer: {e.strerror or e}"
+        return item
+    item.sha256 = hasher.hexdigest()
+    return item
+
+
+def _subir(item: Item) -> Item:
+    campo = Documento._meta.get_field("archivo")
+    try:
+        with open(item.ruta, "rb") as f:
+            item.archivo = campo.storage.save(
+                campo.generate_filename(None, item.ruta.name), File(f, name=item.ruta.name), max_length=campo.max_length
+            )
+    except Exception as e:
+        item.error = f"no se pudo subir: {type(e).__name__}: {e}"
+    return item
+
+
+def _resolver_destinos(items: list[Item], resultado: Resultado) -> list[Item]:
+    """Carga estudiantes y justificaciones del lote con una consulta cada uno."""
+    usuarios = get_user_model().objects.in_bulk({i.username for i in items if i.username}, field_name="username")
+    existentes = Justificacion.objects.only("id", "estudiante_id").in_bulk(
+        {i.justificacion_id for i in items if i.justificacion_id}
+    )
+    validos = []
+    for item in items:
+        if item.justificacion_id is not None:
+            if item.justificacion_id not in existentes:
+                item.error = f"justificación inexistente: {item.justificacion_id}"
+        elif item.username not in usuarios:
+            item.error = f"usuario desconocido: {item.username}"
+        if item.error:
+            resultado.errores.append((item.clave, item.error))
+        else:
+            if item.justificacion_id is not None:
+                item.estudiante_id = existentes[item.justificacion_id].estudiante_id
+            else:
+                item.estudiante = usuarios[item.username]
+                item.estudiante_id = item.estudiante.pk
+            validos.append(item)
+    return validos
+
+
+def _ya_importados(items: list[Item]) -> list[Item]:
+    claves = set(
+        Justificacion.objects.filter(clave_idempotencia__in={i.clave_idempotencia for i in items if not i.justificacion_id})
+        .values_list("clave_idempotencia", flat=True)
+    )
+    adjuntos = set(
+        Documento.objects.filter(
+            justificacion_id__in={i.justificacion_id for i in items if i.justificacion_id},
+            sha256__in={i.sha256 for i in items},
+        ).values_list("justificacion_id", "sha256")
+    )
+    return [
+        i for i in items
+        if (i.justificacion_id, i.sha256) in adjuntos or (not i.justificacion_id and i.clave_idempotencia in claves)
+    ]
+
+
+def _crear(items: list[Item]) -> list[Documento]:
+    """Crea justificaciones y documentos del lote; devuelve un Documento por item, en orden."""
+    nuevas: dict[str, Justificacion] = {}
+    for item in items:
+        if item.justificacion_id or item.clave_idempotencia in nuevas:
+            continue
+        justi = Justificacion(
+            estudiante=item.estudiante,
+            fecha_inicio=item.fecha_inicio,
+            motivo=item.motivo,
+            descripcion=item.descripcion,
+            fuente=FUENTE,
+            clave_idempotencia=item.clave_idempotencia,
+        )
+        # bulk_create no llama a save(): se completa a mano lo que save() y los signals mantienen
+        justi.texto_busqueda = texto_busqueda(justi)
+        nuevas[item.clave_idempotencia] = justi
+
+    with transaction.atomic():
+        Justificacion.objects.bulk_create(nuevas.values(), batch_size=500)
+        documentos = Documento.objects.bulk_create(
+            [
+                Documento(
+                    justificacion_id=item.justificacion_id or nuevas[item.clave_idempotencia].pk,
+                    archivo=item.archivo,
+                    sha256=item.sha256,
+                )
+                for item in items
+            ],
+            batch_size=500,
+        )
+        estadisticas.registrar(Counter(j.clave_stats() for j in nuevas.values()))
+        encolar_validaciones(documentos)
+        fragmentos.invalidar(i.estudiante_id for i in items)
+    return documentos
@@ -0,0 +1,349 @@
+"""
+Análisis de legibilidad de documentos PDF y PNG.
+
+El archivo se lee como stream con límites duros (LEGIBILIDAD_MAX_BYTES de
+lectura, LEGIBILIDAD_MAX_DESCOMPRIMIDO por documento y
+LEGIBILIDAD_MAX_SEGUNDOS de CPU), de modo que un PDF malicioso no puede
+bloquear a un worker: al superar un límite el documento queda como no
+legible con la observación correspondiente.
+
+El parser de PDF es deliberadamente mínimo (Python puro): indexa los objetos,
+incluidos los de object streams, cuenta páginas, mide la resolución efectiva
+de las imágenes embebidas y detecta páginas sin operadores de dibujo.
+"""
+from __future__ import annotations
+import io
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from django.conf import settings
+from PIL import Image
+
+
+@dataclass
+class ResultadoLegibilidad:
+    legible: bool
+    paginas: int | None = None
+    paginas_en_blanco: int | None = None
+    ancho_px: int | None = None
+    alto_px: int | None = None
+    dpi: int | None = None
+    entropia: float | None = None
+    observaciones: str = ""
+
+
+class LimiteExcedido(Exception):
+    pass
+
+
+class _Presupuesto:
+    """
+    Controla el tiempo de CPU y los bytes descomprimidos de un análisis. El
+    tiempo es el del hilo (thread_time): con varios workers en el mismo
+    proceso, el CPU de los otros análisis no descuenta del presupuesto.
+    """
+
+    def __init__(self, max_segundos: float, max_descomprimido: int) -> None:
+        self.limite_cpu = time.thread_time() + max_segundos
+        self.descomprimido_restante = max_descomprimido
+
+    def verificar(self) -> None:
+        if time.thread_time() > self.limite_cpu:
+            raise LimiteExcedido("tiempo de análisis excedido")
+
+    def inflar(self, datos: bytes) -> bytes:
+        """zlib con tope de salida: una bomba de compresión no agota la memoria."""
+        self.verificar()
+        d = zlib.decompressobj()
+        try:
+            salida = d.decompress(datos, self.descomprimido_restante + 1)
+        except zlib.error:
+            return b""
+        if len(salida) > self.descomprimido_restante:
+            raise LimiteExcedido("contenido descomprimido demasiado grande")
+        self.descomprimido_restante -= len(salida)
+        return salida
+
+
+def _config(nombre: str, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def _leer_con_limite(archivo, max_bytes: int) -> bytes:
+    buffer = bytearray()
+    for chunk in archivo.chunks():
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise LimiteExcedido("archivo demasiado grande para analizar")
+    return bytes(buffer)
+
+
+def analizar(archivo) -> ResultadoLegibilidad:
+    """Analiza un File de Django (PDF o PNG) y devuelve el resultado estructurado."""
+    presupuesto = _Presupuesto(
+        _config("LEGIBILIDAD_MAX_SEGUNDOS", 5.0),
+        _config("LEGIBILIDAD_MAX_DESCOMPRIMIDO", 64 * 1024 * 1024),
+    )
+    try:
+        datos = _leer_con_limite(archivo, _config("LEGIBILIDAD_MAX_BYTES", 25 * 1024 * 1024))
+        if datos.startswith(b"\x89PNG\r\n\x1a\n"):
+            return _analizar_png(datos, presupuesto)
+        if datos.lstrip()[:5] == b"%PDF-":
+            return _analizar_pdf(datos, presupuesto)
+        return ResultadoLegibilidad(legible=False, observaciones="formato no reconocido")
+    except LimiteExcedido as e:
+        return ResultadoLegibilidad(legible=False, observaciones=str(e))
+
+
+# -- PNG ------------------------------------------------------------------------
+
+def _analizar_png(datos: bytes, presupuesto: _Presupuesto) -> ResultadoLegibilidad:
+    try:
+        imagen = Image.open(io.BytesIO(datos))
+        ancho, alto = imagen.size
+        if ancho * alto > _config("LEGIBILIDAD_MAX_PIXELES", 20_000_000):
+            return ResultadoLegibilidad(legible=False, ancho_px=ancho, alto_px=alto, observaciones="imagen demasiado grande")
+        # La entropía se mide sobre una versión reducida: suficiente para detectar imágenes vacías
+        imagen.thumbnail((512, 512))
+        entropia = max(0.0, round(imagen.convert("L").entropy(), 3))
+    except (OSError, Image.DecompressionBombError):
+        return ResultadoLegibilidad(legible=False, observaciones="imagen dañada")
+    presupuesto.verificar()
+
+    observaciones = []
+    if min(ancho, alto) < _config("LEGIBILIDAD_MIN_LADO_PX", 500):
+        observaciones.append("resolución insuficiente")
+    if entropia < _config("LEGIBILIDAD_MIN_ENTROPIA", 1.0):
+        observaciones.append("imagen en blanco")
+    return ResultadoLegibilidad(
+        legible=not observaciones,
+        paginas=1,
+        paginas_en_blanco=1 if entropia < _config("LEGIBILIDAD_MIN_ENTROPIA", 1.0) else 0,
+        ancho_px=ancho,
+        alto_px=alto,
+        entropia=entropia,
+        observaciones=", ".join(observaciones),
+    )
+
+
+# -- PDF ------------------------------------------------------------------------
+
+_OBJ_RE = re.compile(rb"(\d+)\s+\d+\s+obj\b")
+_STREAM_RE = re.compile(rb"stream\r?\n")
+_REF_RE = re.compile(rb"(\d+)\s+\d+\s+R")
+_TIPO_PAGINA_RE = re.compile(rb"/Type\s*/Page(?![s\w])")
+_MEDIABOX_RE = re.compile(rb"/MediaBox\s*\[\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s*\]")
+# Operadores que pintan algo: texto, XObjects (imágenes) y relleno/trazo de trayectos
+_DIBUJO_RE = re.compile(rb"(?<![\w/])(Tj|TJ|'|\"|Do|f\*?|F|B\*?|b\*?|S|s|sh|BI)(?![\w])")
+
+
+@dataclass
+class _Objeto:
+    diccionario: bytes
+    stream: bytes | None = None
+
+
+def _entero(diccionario: bytes, clave: bytes) -> int | None:
+    m = re.search(rb"/" + clave + rb"\s+(\d+)(?!\d)(?!\s+\d+\s+R)", diccionario)
+    return int(m.group(1)) if m else None
+
+
+def _indexar_objetos(datos: bytes, presupuesto: _Presupuesto) -> dict[int, _Objeto]:
+    objetos: dict[int, _Objeto] = {}
+    posiciones = [(int(m.group(1)), m.start(), m.end()) for m in _OBJ_RE.finditer(datos)]
+    for i, (numero, _, inicio) in enumerate(posiciones):
+        if i % 200 == 0:
+            presupuesto.verificar()
+        fin = posiciones[i + 1][1] if i + 1 < len(posiciones) else len(datos)
+        cuerpo = datos[inicio:fin]
+        corte = cuerpo.find(b"endobj")
+        m = _STREAM_RE.search(cuerpo, 0, corte if corte >= 0 else len(cuerpo))
+        if m is None:
+            objetos[numero] = _Objeto(cuerpo[:corte] if corte >= 0 else cuerpo)
+            continue
+        diccionario = cuerpo[: m.start()]
+        largo = _entero(diccionario, b"Length")
+        if largo is not None and m.end() + largo <= len(cuerpo):
+            stream = cuerpo[m.end(): m.end() + largo]
+        else:
+            stream = cuerpo[m.end(): cuerpo.rfind(b"endstream")]
+        objetos[numero] = _Objeto(diccionario, stream)
+
+    # Los PDF 1.5+ guardan los diccionarios de página dentro de object streams
+    for obj in list(objetos.values()):
+        if obj.stream is None or not re.search(rb"/Type\s*/ObjStm", obj.diccionario):
+            continue
+        contenido = _contenido_stream(obj, presupuesto)
+        primero = _entero(obj.diccionario, b"First") or 0
+        cabecera = contenido[:primero].split()
+        pares = [(int(cabecera[j]), int(cabecera[j + 1])) for j in range(0, len(cabecera) - 1, 2)]
+        for j, (numero, desplazamiento) in enumerate(pares):
+            fin = pares[j + 1][1] if j + 1 < len(pares) else len(contenido) - primero
+            objetos.setdefault(numero, _Objeto(contenido[primero + desplazamiento: primero + fin]))
+    return objetos
+
+
+def _contenido_stream(obj: _Objeto, presupuesto: _Presupuesto) -> bytes:
+    if obj.stream is None:
+        return b""
+    if re.search(rb"/FlateDecode", obj.diccionario):
+        return presupuesto.inflar(obj.stream)
+    return obj.stream
+
+
+def _analizar_pdf(datos: bytes, presupuesto: _Presupuesto) -> ResultadoLegibilidad:
+    objetos = _indexar_objetos(datos, presupuesto)
+    paginas = [obj for obj in objetos.values() if _TIPO_PAGINA_RE.search(obj.diccionario)]
+    if not paginas:
+        return ResultadoLegibilidad(legible=False, paginas=0, observaciones="PDF sin páginas")
+    if len(paginas) > _config("LEGIBILIDAD_MAX_PAGINAS", 200):
+        return ResultadoLegibilidad(legible=False, paginas=len(paginas), observaciones="demasiadas páginas")
+
+    en_blanco = 0
+    pinta: dict[int, bool] = {}  # varias páginas pueden compartir el mismo stream
+    for pagina in paginas:
+        presupuesto.verificar()
+        contenidos = re.search(rb"/Contents\s*(\[[^\]]*\]|\d+\s+\d+\s+R)", pagina.diccionario)
+        refs = [int(r) for r in _REF_RE.findall(contenidos.group(1))] if contenidos else []
+        for r in refs:
+            if r in objetos and r not in pinta:
+                pinta[r] = bool(_DIBUJO_RE.search(_contenido_stream(objetos[r], presupuesto)))
+        if not any(pinta.get(r) for r in refs):
+            en_blanco += 1
+
+    # Resolución efectiva: la imagen más grande frente al tamaño de página (1 pt = 1/72")
+    ancho_pt, alto_pt = 612.0, 792.0
+    for obj in paginas + list(objetos.values()):  # la página o un nodo /Pages del que hereda
+        m = _MEDIABOX_RE.search(obj.diccionario)
+        if m:
+            x0, y0, x1, y1 = (float(v) for v in m.groups())
+            ancho_pt, alto_pt = abs(x1 - x0) or ancho_pt, abs(y1 - y0) or alto_pt
+            break
+    ancho = alto = dpi = None
+    for obj in objetos.values():
+        if obj.stream is None or not re.search(rb"/Subtype\s*/Image", obj.diccionario):
+            continue
+        w, h = _entero(obj.diccionario, b"Width"), _entero(obj.diccionario, b"Height")
+        if w and h and w * h > (ancho or 0) * (alto or 0):
+            ancho, alto = w, h
+            dpi = int(min(w / (ancho_pt / 72), h / (alto_pt / 72)))
+
+    observaciones = []
+    if en_blanco == len(paginas):
+        observaciones.append("todas las páginas en blanco")
+    if dpi is not None and dpi < _config("LEGIBILIDAD_MIN_DPI", 100):
+        observaciones.append("resolución insuficiente")
+    return ResultadoLegibilidad(
+        legible=not observaciones,
+        paginas=len(paginas),
+        paginas_en_blanco=en_blanco,
+        ancho_px=ancho,
+        alto_px=alto,
+        dpi=dpi,
+        observaciones=", ".join(observaciones),
+    )
+
+
+# -- Portada --------------------------------------------------------------------
+
+# Páginas y nodos /Pages: al seguir referencias desde la página no hay que pasar a otras
+_NODO_PAGINAS_RE = re.compile(rb"/Type\s*/Pages?\b")
+_COLOR_MODOS = {b"DeviceRGB": "RGB", b"DeviceGray": "L", b"DeviceCMYK": "CMYK"}
+
+
+def imagen_portada(archivo) -> Image.Image | None:
+    """
+    Imagen que representa la primera página, para las miniaturas
+    (justificaciones/miniaturas.py): el PNG completo, o en un PDF la imagen
+    embebida más grande de la primera página, que en un documento escaneado
+    es la página entera. None si no hay una imagen que se pueda decodificar
+    (p. ej. un PDF solo con texto). Respeta los mismos límites que analizar().
+    """
+    presupuesto = _Presupuesto(
+        _config("LEGIBILIDAD_MAX_SEGUNDOS", 5.0),
+        _config("LEGIBILIDAD_MAX_DESCOMPRIMIDO", 64 * 1024 * 1024),
+    )
+    try:
+        datos = _leer_con_limite(archivo, _config("LEGIBILIDAD_MAX_BYTES", 25 * 1024 * 1024))
+        if datos.startswith(b"\x89PNG\r\n\x1a\n"):
+            imagen = Image.open(io.BytesIO(datos))
+        elif datos.lstrip()[:5] == b"%PDF-":
+            imagen = _portada_pdf(datos, presupuesto)
+        else:
+            return None
+        if imagen is None or imagen.width * imagen.height > _config("LEGIBILIDAD_MAX_PIXELES", 20_000_000):
+            return None
+        imagen.load()
+        return imagen
+    except (LimiteExcedido, OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def _portada_pdf(datos: bytes, presupuesto: _Presupuesto) -> Image.Image | None:
+    objetos = _indexar_objetos(datos, presupuesto)
+    imagenes = {
+        numero: obj for numero, obj in objetos.items()
+        if obj.stream is not None and re.search(rb"/Subtype\s*/Image", obj.diccionario)
+    }
+    # Las imágenes referenciadas desde la primera página (sus recursos, directos o por referencia)
+    pagina = _primera_pagina(objetos)
+    candidatas = []
+    if pagina is not None:
+        pendientes, vistos = [pagina], set()
+        while pendientes and len(vistos) < 50:
+            diccionario = pendientes.pop()
+            for r in (int(r) for r in _REF_RE.findall(diccionario)):
+                if r in imagenes:
+                    candidatas.append(imagenes[r])
+                elif r in objetos and r not in vistos and not _NODO_PAGINAS_RE.search(objetos[r].diccionario):
+                    vistos.add(r)
+                    if objetos[r].stream is None:  # /Resources o /XObject por referencia, no el contenido
+                        pendientes.append(objetos[r].diccionario)
+    candidatas = candidatas or list(imagenes.values())
+    candidatas.sort(key=lambda o: (_entero(o.diccionario, b"Width") or 0) * (_entero(o.diccionario, b"Height") or 0))
+    for obj in reversed(candidatas):
+        imagen = _decodificar_imagen(obj, presupuesto)
+        if imagen is not None:
+            return imagen
+    return None
+
+
+def _primera_pagina(objetos: dict[int, _Objeto]) -> bytes | None:
+    """Diccionario de la primera página según el árbol /Pages (el orden en el archivo puede ser otro)."""
+    raiz = next(
+        (o for o in objetos.values() if re.search(rb"/Type\s*/Pages\b", o.diccionario) and b"/Parent" not in o.diccionario),
+        None,
+    )
+    nodo = raiz
+    for _ in range(32):  # profundidad máxima del árbol
+        if nodo is None:
+            break
+        if _TIPO_PAGINA_RE.search(nodo.diccionario):
+            return nodo.diccionario
+        kids = re.search(rb"/Kids\s*\[\s*(\d+)\s+\d+\s+R", nodo.diccionario)
+        nodo = objetos.get(int(kids.group(1))) if kids else None
+    primera = next((o for o in objetos.values() if _TIPO_PAGINA_RE.search(o.diccionario)), None)
+    return primera.diccionario if primera else None
+
+
+def _decodificar_imagen(obj: _Objeto, presupuesto: _Presupuesto) -> Image.Image | None:
+    ancho, alto = _entero(obj.diccionario, b"Width"), _entero(obj.diccionario, b"Height")
+    if not ancho or not alto or ancho * alto > _config("LEGIBILIDAD_MAX_PIXELES", 20_000_000):
+        return None
+    if re.search(rb"/(DCTDecode|JPXDecode)", obj.diccionario):
+        return Image.open(io.BytesIO(obj.stream))  # JPEG (o JPEG 2000) tal cual
+    if not re.search(rb"/FlateDecode", obj.diccionario) or b"/Predictor" in obj.diccionario:
+        return None
+    bits = _entero(obj.diccionario, b"BitsPerComponent") or 8
+    espacio = re.search(rb"/ColorSpace\s*/(\w+)", obj.diccionario)
+    modo = _COLOR_MODOS.get(espacio.group(1)) if espacio else None
+    if bits == 1 and (modo in (None, "L")):
+        modo = "1"
+    elif bits != 8 or modo is None:
+        return None  # paletas, 16 bits o espacios de color ICC: sin vista previa
+    datos = presupuesto.inflar(obj.stream)
+    try:
+        return Image.frombytes(modo, (ancho, alto), datos)
+    except ValueError:
+        return None  # stream más corto que lo que declara el diccionario
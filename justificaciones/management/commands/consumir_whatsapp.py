@@ -0,0 +1,66 @@
+from __future__ import annotations
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from justificaciones import bandeja
+
+
+class Command(BaseCommand):
+    help = "Consume la bandeja del webhook de WhatsApp y crea las justificaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Número de hilos worker.")
+        parser.add_argument("--lote", type=int, default=20, help="Archivos de la bandeja que ingiere cada worker por vez.")
+        parser.add_argument("--intervalo", type=float, default=1.0, help="Segundos de espera cuando la bandeja está vacía.")
+        parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina.")
+        parser.add_argument(
+            "--reintentar-fallidos", action="store_true", help="Devuelve los archivos de fallidos/ a la bandeja antes de empezar."
+        )
+
+    def handle(self, *args, **options):
+        if options["reintentar_fallidos"]:
+            self.stdout.write(f"{bandeja.reintentar_fallidos()} archivos devueltos a la bandeja.")
+        detener = threading.Event()
+        procesados = [0] * options["workers"]
+
+        def bucle(indice: int) -> None:
+            while not detener.is_set():
+                close_old_connections()
+                n = bandeja.procesar(options["lote"])
+                procesados[indice] += n
+                if n == 0:
+                    if options["once"]:
+                        return
+                    detener.wait(options["intervalo"])
+
+        def worker(indice: int) -> None:
+            try:
+                bucle(indice)
+            finally:
+                connection.close()
+
+        if options["workers"] == 1:
+            # Un solo worker corre en el hilo principal
+            try:
+                bucle(0)
+            except KeyboardInterrupt:
+                pass
+        else:
+            hilos = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(options["workers"])]
+            for h in hilos:
+                h.start()
+            try:
+                while any(h.is_alive() for h in hilos):
+                    time.sleep(0.2)
+            except KeyboardInterrupt:
+                detener.set()
+                for h in hilos:
+                    h.join()
+
+        estado = bandeja.pendientes()
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(procesados)} archivos procesados; quedan {estado['nuevos']} en la bandeja "
+            f"y {estado['fallidos']} en fallidos."
+        ))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+import os
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+
+from justificaciones import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa documentos escaneados desde un directorio (<origen>/<username>/<archivo>) o un manifiesto CSV "
+        "(archivo, username o justificacion, fecha_inicio, motivo, descripcion). Se puede interrumpir y "
+        "volver a ejecutar: retoma desde el diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("origen", help="Directorio con una carpeta por estudiante o archivo CSV.")
+        parser.add_argument("--fecha", type=date.fromisoformat, default=None,
+                            help="fecha_inicio de las justificaciones nuevas (AAAA-MM-DD, por defecto hoy).")
+        parser.add_argument("--motivo", default=importacion.MOTIVO_POR_DEFECTO, help="Motivo de las justificaciones nuevas.")
+        parser.add_argument("--hilos", type=int, default=None, help="Subidas simultáneas (IMPORTACION_HILOS).")
+        parser.add_argument("--lote", type=int, default=None, help="Archivos por transacción (IMPORTACION_LOTE).")
+        parser.add_argument("--diario", default=None, help="Archivo de progreso (por defecto <origen>.diario).")
+
+    def handle(self, *args, **options):
+        origen = options["origen"].rstrip("/")
+        fecha = options["fecha"] or date.today()
+        if os.path.isdir(origen):
+            items = importacion.leer_directorio(origen, fecha, options["motivo"])
+        elif os.path.isfile(origen):
+            items = importacion.leer_manifiesto(origen, fecha, options["motivo"])
+        else:
+            raise CommandError(f"No existe {origen}")
+        diario = options["diario"] or f"{origen}.diario"
+
+        def progreso(r: importacion.Resultado) -> None:
+            hechos = r.importados + r.omitidos + len(r.errores)
+            self.stdout.write(
+                f"{hechos}/{r.total} archivos  {r.archivos_s:.1f} archivos/s  {r.mb_s:.2f} MB/s  "
+                f"({len(r.errores)} errores)"
+            )
+
+        r = importacion.importar(items, diario, options["hilos"], options["lote"], progreso)
+        for clave, error in r.errores:
+            self.stderr.write(f"{clave}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{r.importados} documentos importados ({r.subidos} subidos, el resto ya estaba en el storage), "
+            f"{r.omitidos} ya importados antes, {len(r.errores)} errores. "
+            f"{r.archivos_s:.1f} archivos/s, {r.mb_s:.2f} MB/s en {r.segundos:.1f} s."
+        ))
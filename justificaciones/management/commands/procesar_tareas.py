@@ -0,0 +1,58 @@
+from __future__ import annotations
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from justificaciones import tareas
+
+
+class Command(BaseCommand):
+    help = "Ejecuta los workers de la cola de tareas en segundo plano (validación de documentos, etc.)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Número de hilos worker.")
+        parser.add_argument("--lote", type=int, default=10, help="Tareas que toma cada worker por consulta.")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos de espera cuando no hay tareas.")
+        parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina.")
+
+    def handle(self, *args, **options):
+        detener = threading.Event()
+        procesadas = [0] * options["workers"]
+
+        def bucle(indice: int) -> None:
+            while not detener.is_set():
+                close_old_connections()
+                n = tareas.procesar_pendientes(options["lote"])
+                procesadas[indice] += n
+                if n == 0:
+                    if options["once"]:
+                        return
+                    detener.wait(options["intervalo"])
+
+        def worker(indice: int) -> None:
+            try:
+                bucle(indice)
+            finally:
+                connection.close()
+
+        if options["workers"] == 1:
+            # Un solo worker corre en el hilo principal
+            try:
+                bucle(0)
+            except KeyboardInterrupt:
+                pass
+            self.stdout.write(self.style.SUCCESS(f"{procesadas[0]} tareas procesadas."))
+            return
+
+        hilos = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(options["workers"])]
+        for h in hilos:
+            h.start()
+        try:
+            while any(h.is_alive() for h in hilos):
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            detener.set()
+            for h in hilos:
+                h.join()
+        self.stdout.write(self.style.SUCCESS(f"{sum(procesadas)} tareas procesadas."))
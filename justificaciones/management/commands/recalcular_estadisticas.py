@@ -0,0 +1,26 @@
+from __future__ import annotations
+from django.core.management.base import BaseCommand, CommandError
+
+from justificaciones import estadisticas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye JustificacionStats desde la tabla de justificaciones o verifica que coincidan."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar", action="store_true", help="Solo compara y falla si hay diferencias; no modifica nada."
+        )
+
+    def handle(self, *args, **options):
+        if options["verificar"]:
+            diferencias = estadisticas.diferencias()
+            for (estudiante_id, estado, fuente, dia), (esperado, registrado) in sorted(diferencias.items()):
+                self.stdout.write(f"{estudiante_id} {estado} {fuente} {dia}: esperado {esperado}, registrado {registrado}")
+            if diferencias:
+                raise CommandError(f"{len(diferencias)} filas de estadísticas no coinciden.")
+            self.stdout.write(self.style.SUCCESS("Estadísticas al día."))
+            return
+
+        filas = estadisticas.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"{filas} filas de estadísticas reconstruidas."))
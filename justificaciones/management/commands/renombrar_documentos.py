@@ -0,0 +1,45 @@
+from __future__ import annotations
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from justificaciones.models import Documento
+from justificaciones.storage_naming import is_uuid_name, uuid_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia los archivos de Documento con nombres antiguos (documentos/<nombre>.pdf) "
+        "a claves UUID particionadas y actualiza Documento.archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo muestra los cambios, no copia ni actualiza.")
+        parser.add_argument("--borrar-original", action="store_true", help="Elimina el objeto antiguo tras copiarlo.")
+        parser.add_argument("--limite", type=int, default=None, help="Máximo de archivos a procesar.")
+
+    def handle(self, *args, **options):
+        storage = Documento._meta.get_field("archivo").storage
+        max_length = Documento._meta.get_field("archivo").max_length
+        nombres = (
+            Documento.objects.exclude(archivo="")
+            .order_by("archivo")
+            .values_list("archivo", flat=True)
+            .distinct()
+        )
+        pendientes = [n for n in nombres if not is_uuid_name(n)][: options["limite"]]
+
+        for antiguo in pendientes:
+            nuevo = uuid_name(storage, antiguo, max_length)
+            self.stdout.write(f"{antiguo} -> {nuevo}")
+            if options["dry_run"]:
+                continue
+            with storage.open(antiguo) as origen:
+                guardado = storage.save(nuevo, origen, max_length=max_length)
+            with transaction.atomic():
+                # Varios Documento pueden compartir el mismo objeto
+                Documento.objects.filter(archivo=antiguo).update(archivo=guardado)
+            if options["borrar_original"]:
+                storage.delete(antiguo)
+
+        accion = "por renombrar" if options["dry_run"] else "renombrados"
+        self.stdout.write(self.style.SUCCESS(f"{len(pendientes)} archivos {accion}."))
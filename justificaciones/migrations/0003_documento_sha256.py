@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0002_alter_documento_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0004_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='alto_px',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='ancho_px',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='dpi',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='entropia',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='observaciones_legibilidad',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='paginas',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='documento',
+            name='paginas_en_blanco',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:43
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def marcar_existentes_como_enviadas(apps, schema_editor):
+    # Antes del outbox las notificaciones se enviaban en el mismo request
+    Notificacion = apps.get_model('justificaciones', 'Notificacion')
+    Notificacion.objects.update(estado='ENVIADA', enviada_en=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0005_documento_analisis_legibilidad'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='asunto',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='enviada_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIADA', 'Enviada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='intentos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='proximo_intento',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['estado', 'proximo_intento'], name='notif_estado_proximo_idx'),
+        ),
+        migrations.RunPython(marcar_existentes_como_enviadas, reverse_code=migrations.RunPython.noop),
+    ]
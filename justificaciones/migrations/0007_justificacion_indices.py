@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0006_notificacion_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='justificacion',
+            index=models.Index(fields=['-created_at', '-id'], name='justi_creada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='justificacion',
+            index=models.Index(fields=['estudiante', '-created_at', '-id'], name='justi_estudiante_creada_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='justificacion',
+            index=models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['created_at', 'id'], name='justi_pendientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='justificacion',
+            index=models.Index(fields=['fuente', '-created_at'], name='justi_fuente_creada_idx'),
+        ),
+    ]
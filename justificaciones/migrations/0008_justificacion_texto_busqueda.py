@@ -0,0 +1,65 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:51
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copia congelada de busqueda.texto_busqueda al crear el campo: la migración no
+# debe cambiar de comportamiento (ni romperse) si el módulo cambia después
+def normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.lower().split())
+
+
+def texto_busqueda(justi):
+    estudiante = justi.estudiante
+    partes = [estudiante.username, estudiante.first_name, estudiante.last_name, justi.motivo, justi.descripcion]
+    return normalizar(' '.join(p for p in partes if p))
+
+
+def calcular_texto_busqueda(apps, schema_editor):
+    Justificacion = apps.get_model('justificaciones', 'Justificacion')
+    lote = []
+    for justi in Justificacion.objects.select_related('estudiante').iterator(chunk_size=2000):
+        justi.texto_busqueda = texto_busqueda(justi)
+        lote.append(justi)
+        if len(lote) >= 2000:
+            Justificacion.objects.bulk_update(lote, ['texto_busqueda'])
+            lote = []
+    Justificacion.objects.bulk_update(lote, ['texto_busqueda'])
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    # Solo PostgreSQL: en SQLite la búsqueda usa el motor simple sin índice
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS justi_busqueda_trgm_idx ON justificaciones_justificacion '
+        'USING gin (texto_busqueda gin_trgm_ops)'
+    )
+
+
+def borrar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS justi_busqueda_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0007_justificacion_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='justificacion',
+            name='texto_busqueda',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(calcular_texto_busqueda, reverse_code=migrations.RunPython.noop),
+        migrations.RunPython(crear_indice_trigramas, reverse_code=borrar_indice_trigramas),
+    ]
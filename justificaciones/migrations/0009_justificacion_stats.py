@@ -0,0 +1,57 @@
+# Generated by Django 5.0.6 on 2026-10-17 20:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+
+
+def calcular_estadisticas(apps, schema_editor):
+    # Sin historial de cambios de estado, se toma la última modificación
+    Justificacion = apps.get_model('justificaciones', 'Justificacion')
+    JustificacionStats = apps.get_model('justificaciones', 'JustificacionStats')
+    Justificacion.objects.update(estado_actualizado_en=F('updated_at'))
+    filas = (
+        Justificacion.objects.annotate(dia=TruncDate('estado_actualizado_en'))
+        .values('estudiante_id', 'estado', 'fuente', 'dia')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    JustificacionStats.objects.bulk_create([JustificacionStats(**f) for f in filas], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0008_justificacion_texto_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='justificacion',
+            name='estado_actualizado_en',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='JustificacionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('APROBADA', 'Aprobada'), ('RECHAZADA', 'Rechazada')], max_length=20)),
+                ('fuente', models.CharField(max_length=30)),
+                ('dia', models.DateField()),
+                ('total', models.IntegerField(default=0)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'dia'], name='justi_stats_estado_dia_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='justificacionstats',
+            constraint=models.UniqueConstraint(fields=('estudiante', 'estado', 'fuente', 'dia'), name='justi_stats_clave_unica'),
+        ),
+        migrations.RunPython(calcular_estadisticas, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-17 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0009_justificacion_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='justificacion',
+            index=models.Index(fields=['updated_at'], name='justi_actualizada_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0010_justificacion_actualizada_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='justificacion',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-17 22:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('justificaciones', '0011_justificacion_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='justificacion',
+            name='justi_actualizada_idx',
+        ),
+    ]
@@ -0,0 +1,175 @@
+"""
+Miniaturas y vistas previas de los documentos.
+
+Cada documento tiene dos variantes de su primera página
+(legibilidad.imagen_portada): "miniatura", para la tabla del coordinador, y
+"previa", para el detalle. Se codifican en WebP (PNG si Pillow no tiene
+soporte WebP) y se guardan en el storage bajo una clave derivada del SHA-256
+del contenido (``miniaturas/3f/3fa2...-miniatura.webp``): documentos idénticos
+comparten sus variantes y una variante guardada nunca cambia.
+
+Se generan en segundo plano (tarea "generar_miniaturas", encolada tras la
+validación de legibilidad) o, si todavía no existen, en el primer pedido.
+Los pedidos simultáneos de la misma variante en un proceso esperan a una sola
+generación; entre procesos lo evita un candado en la caché MINIATURAS_CACHE.
+Un documento sin imagen decodificable (p. ej. un PDF solo con texto) queda
+anotado en esa caché para no reintentarlo en cada pedido.
+"""
+from __future__ import annotations
+import io
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+from .legibilidad import imagen_portada
+from .models import Documento
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Variante:
+    lado: int  # lado mayor, en píxeles
+    calidad: int
+
+
+VARIANTES = {
+    "miniatura": Variante(lado=160, calidad=70),
+    "previa": Variante(lado=1200, calidad=80),
+}
+
+_en_curso: dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def formato() -> tuple[str, str, str]:
+    """(formato de Pillow, extensión, content type)."""
+    if features.check("webp"):
+        return "WEBP", "webp", "image/webp"
+    return "PNG", "png", "image/png"
+
+
+def base(documento: Documento) -> str:
+    # Documentos anteriores al hash de contenido: se identifican por su id
+    return documento.sha256 or f"documento-{documento.pk}"
+
+
+def clave(documento: Documento, variante: str) -> str:
+    b = base(documento)
+    return f"miniaturas/{b[:2]}/{b}-{variante}.{formato()[1]}"
+
+
+def claves(documento: Documento) -> list[str]:
+    return [clave(documento, v) for v in VARIANTES]
+
+
+def etag(documento: Documento, variante: str) -> str:
+    return f'"{base(documento)}-{variante}"'
+
+
+def _cache():
+    return caches[getattr(settings, "MINIATURAS_CACHE", "default")]
+
+
+def renderizar(portada: Image.Image, variante: Variante) -> bytes:
+    imagen = portada
+    if imagen.mode in ("P", "PA", "LA"):
+        imagen = imagen.convert("RGBA")
+    elif imagen.mode not in ("RGB", "RGBA", "L"):
+        imagen = imagen.convert("L" if imagen.mode in ("1", "I", "I;16", "F") else "RGB")
+    imagen = imagen.copy() if imagen is portada else imagen  # thumbnail() modifica la imagen
+    imagen.thumbnail((variante.lado, variante.lado))
+    nombre, _, _ = formato()
+    buffer = io.BytesIO()
+    if nombre == "WEBP":
+        imagen.save(buffer, nombre, quality=variante.calidad, method=4)
+    else:
+        imagen.save(buffer, nombre, optimize=True)
+    return buffer.getvalue()
+
+
+def generar(documento: Documento) -> dict[str, str]:
+    """
+    Genera y guarda las variantes que falten. Devuelve {variante: clave};
+    vacío si el documento no tiene una imagen de la que partir.
+    """
+    storage = documento.archivo.storage
+    claves = {v: clave(documento, v) for v in VARIANTES}
+    faltan = {v: c for v, c in claves.items() if not storage.exists(c)}
+    if not faltan:
+        return claves
+    with documento.archivo.open("rb") as contenido:
+        portada = imagen_portada(contenido)
+    if portada is None:
+        _cache().set(f"miniaturas:sin:{base(documento)}", True, 24 * 3600)
+        return {}
+    for v, c in faltan.items():
+        # _save y no save(): la clave es fija, no debe pasar por la estrategia de nombres
+        storage._save(c, ContentFile(renderizar(portada, VARIANTES[v]), name=c))
+    return claves
+
+
+def faltan_variantes(documento: Documento) -> bool:
+    """Si falta en el storage alguna variante de un documento que puede tenerlas."""
+    if _cache().get(f"miniaturas:sin:{base(documento)}"):
+        return False
+    storage = documento.archivo.storage
+    return not all(storage.exists(clave(documento, v)) for v in VARIANTES)
+
+
+def obtener(documento: Documento, variante: str) -> str | None:
+    """Clave de la variante en el storage, generándola si hace falta; None si no hay vista previa."""
+    c = clave(documento, variante)
+    storage = documento.archivo.storage
+    if storage.exists(c):
+        return c
+    if _cache().get(f"miniaturas:sin:{base(documento)}"):
+        return None
+    # Una generación produce todas las variantes: se agrupa por documento, no por variante
+    return _una_vez(base(documento), lambda: _generar_entre_procesos(documento, c)).get(variante)
+
+
+def _una_vez(clave_trabajo: str, funcion: Callable[[], T]) -> T:
+    """Ejecuta ``funcion`` una sola vez por clave; los pedidos simultáneos esperan su resultado."""
+    with _lock:
+        futuro = _en_curso.get(clave_trabajo)
+        propio = futuro is None
+        if propio:
+            futuro = _en_curso[clave_trabajo] = Future()
+    if not propio:
+        return futuro.result()
+    try:
+        resultado = funcion()
+        futuro.set_result(resultado)
+        return resultado
+    except BaseException as e:
+        futuro.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _en_curso.pop(clave_trabajo, None)
+
+
+def _generar_entre_procesos(documento: Documento, c: str) -> dict[str, str]:
+    cache = _cache()
+    candado = f"miniaturas:generando:{base(documento)}"
+    espera = getattr(settings, "MINIATURAS_ESPERA_SEGUNDOS", 10)
+    if not cache.add(candado, True, espera):
+        # Otro proceso la está generando: se espera a que aparezca en el storage
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite and cache.get(candado):
+            time.sleep(0.1)
+        if documento.archivo.storage.exists(c):
+            return {v: clave(documento, v) for v in VARIANTES}
+        if cache.get(f"miniaturas:sin:{base(documento)}"):
+            return {}
+    try:
+        return generar(documento)
+    finally:
+        cache.delete(candado)
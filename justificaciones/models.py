@@ -1,9 +1,13 @@
 from __future__ import annotations
+import hashlib
+import posixpath
 from django.conf import settings
-from django.db import models
+from django.db import connection, models, transaction
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 
+from .busqueda import texto_busqueda
+
 
 class Justificacion(models.Model):
     class Estado(models.TextChoices):
@@ -18,13 +22,69 @@ class Justificacion(models.Model):
     descripcion = models.TextField(blank=True)
     estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
     comentarios_coordinador = models.TextField(blank=True)
-    fuente = models.CharField(max_length=30, default="app")  # app | whatsapp
+    fuente = models.CharField(max_length=30, default="app")  # app | whatsapp | importacion
+    # Id del mensaje del proveedor (justificaciones/whatsapp.py); evita duplicados por reintentos
+    clave_idempotencia = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Estudiante, motivo y descripción normalizados para la búsqueda (justificaciones/busqueda.py)
+    texto_busqueda = models.TextField(blank=True, editable=False)
+    # Último cambio de estado; define el día en JustificacionStats
+    estado_actualizado_en = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        # Una por forma de consulta de los listados (ver tests_unitarios/test_planes_consulta.py)
+        indexes = [
+            # Listado general y del profesor: ORDER BY created_at DESC, id DESC
+            models.Index(fields=["-created_at", "-id"], name="justi_creada_idx"),
+            # Dashboard del estudiante: WHERE estudiante_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=["estudiante", "-created_at", "-id"], name="justi_estudiante_creada_idx"),
+            # Dashboard del coordinador: solo las pendientes, que son una fracción pequeña de la tabla
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(estado="PENDIENTE"),
+                name="justi_pendientes_idx",
+            ),
+            # Filtros del admin por fuente y fecha
+            models.Index(fields=["fuente", "-created_at"], name="justi_fuente_creada_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Justificación #{self.pk} - {self.estudiante} - {self.estado}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Recuerda a qué fila de JustificacionStats pertenece, para moverla al guardar
+        if {"estudiante_id", "estado", "fuente", "estado_actualizado_en"} <= set(field_names):
+            instancia._clave_stats_original = instancia.clave_stats()
+        return instancia
+
+    def clave_stats(self) -> tuple:
+        """(estudiante_id, estado, fuente, día del último cambio de estado)."""
+        return self.estudiante_id, self.estado, self.fuente, timezone.localdate(self.estado_actualizado_en)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        campos_extra = set()
+        if update_fields is None or {"estudiante", "motivo", "descripcion"} & set(update_fields):
+            self.texto_busqueda = texto_busqueda(self)
+            campos_extra.add("texto_busqueda")
+        if not self._state.adding and getattr(self, "_clave_stats_original", None) is None:
+            # Cargada con campos diferidos: se lee la fila actual para poder ajustar las estadísticas
+            actual = Justificacion.objects.filter(pk=self.pk).first()
+            self._clave_stats_original = actual.clave_stats() if actual else None
+        original = getattr(self, "_clave_stats_original", None)
+        if original is not None and original[1] != self.estado:
+            self.estado_actualizado_en = timezone.now()
+            campos_extra.add("estado_actualizado_en")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, *campos_extra}
+        # JustificacionStats se ajusta en post_save (signals.py) dentro de la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._clave_stats_original = self.clave_stats()
+
 
 class Documento(models.Model):
     justificacion = models.ForeignKey(Justificacion, on_delete=models.CASCADE, related_name="documentos")
@@ -33,28 +93,198 @@ class Documento(models.Model):
         upload_to="documentos/",
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'png'])]
     )
+    # SHA-256 del contenido; documentos idénticos comparten el mismo objeto en storage
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     legible = models.BooleanField(default=False)
     validado_en = models.DateTimeField(blank=True, null=True)
+    # Resultado del análisis de legibilidad (justificaciones/legibilidad.py)
+    paginas = models.PositiveIntegerField(blank=True, null=True)
+    paginas_en_blanco = models.PositiveIntegerField(blank=True, null=True)
+    ancho_px = models.PositiveIntegerField(blank=True, null=True)
+    alto_px = models.PositiveIntegerField(blank=True, null=True)
+    dpi = models.PositiveIntegerField(blank=True, null=True)
+    entropia = models.FloatField(blank=True, null=True)
+    observaciones_legibilidad = models.CharField(max_length=255, blank=True)
+
+    def save(self, *args, **kwargs) -> None:
+        if self.archivo and not self.archivo._committed:
+            deduplicar = self._deduplicar_archivo
+        elif getattr(self, "_archivo_compartido", False):
+            deduplicar = self._confirmar_archivo_compartido
+        else:
+            super().save(*args, **kwargs)
+            return
+        # La consulta de deduplicación y el INSERT van bajo bloquear_contenido, en la misma transacción
+        with transaction.atomic():
+            deduplicar()
+            super().save(*args, **kwargs)
+
+    def _deduplicar_archivo(self) -> None:
+        # El hash viene calculado por el upload handler; si no, se calcula localmente
+        contenido = self.archivo.file
+        self.sha256 = getattr(contenido, "sha256", None) or _sha256(contenido)
+        bloquear_contenido(self.sha256)
+        existente = self._archivo_existente().first()
+        if existente:
+            # Mismo contenido ya almacenado: se apunta al objeto existente sin subirlo
+            self.archivo.name = existente
+            self.archivo._committed = True
+
+    def _confirmar_archivo_compartido(self) -> None:
+        # asubir_archivo eligió el objeto existente fuera de esta transacción
+        self._archivo_compartido = False
+        bloquear_contenido(self.sha256)
+        if not Documento.objects.filter(archivo=self.archivo.name).exists():
+            # Se borró el último documento que lo usaba y con él el objeto: se sube el contenido de nuevo
+            self.archivo.name = posixpath.basename(self.archivo.name)
+            self.archivo._committed = False
+            self._deduplicar_archivo()
+
+    def _archivo_existente(self):
+        return Documento.objects.filter(sha256=self.sha256).exclude(archivo="").values_list("archivo", flat=True)
+
+    async def asubir_archivo(self) -> None:
+        """
+        Versión async de la subida que hace save(): deduplica por hash y sube
+        con el cliente async del storage, sin retener un hilo durante la espera.
+        Después basta ``asave()``, que ya no vuelve a subir el archivo.
+        """
+        from . import storage_async
+
+        if not self.archivo or self.archivo._committed:
+            return
+        contenido = self.archivo.file
+        self.sha256 = getattr(contenido, "sha256", None) or _sha256(contenido)
+        existente = await self._archivo_existente().afirst()
+        if existente:
+            self.archivo.name = existente
+            self._archivo_compartido = True  # save() confirma que siga en el storage
+        else:
+            campo = self.archivo.field
+            self.archivo.name = await storage_async.asave(
+                self.archivo.storage, campo.generate_filename(self, self.archivo.name), contenido, max_length=campo.max_length
+            )
+        self.archivo._committed = True
 
     def validar_legibilidad(self) -> None:
-        # Validación básica como stub: si el tamaño > 0 lo consideramos legible
-        if self.archivo and self.archivo.size >= 1:
-            self.legible = True
-            self.validado_en = timezone.now()
+        from .legibilidad import ResultadoLegibilidad, analizar
+
+        if self.archivo:
+            with self.archivo.open("rb") as contenido:
+                resultado = analizar(contenido)
         else:
-            self.legible = False
-            self.validado_en = timezone.now()
-        self.save(update_fields=["legible", "validado_en"])
+            resultado = ResultadoLegibilidad(legible=False, observaciones="sin archivo")
+        self.legible = resultado.legible
+        self.paginas = resultado.paginas
+        self.paginas_en_blanco = resultado.paginas_en_blanco
+        self.ancho_px = resultado.ancho_px
+        self.alto_px = resultado.alto_px
+        self.dpi = resultado.dpi
+        self.entropia = resultado.entropia
+        self.observaciones_legibilidad = resultado.observaciones
+        self.validado_en = timezone.now()
+        self.save(update_fields=[
+            "legible", "paginas", "paginas_en_blanco", "ancho_px", "alto_px",
+            "dpi", "entropia", "observaciones_legibilidad", "validado_en",
+        ])
 
     def __str__(self) -> str:
         return f"Documento #{self.pk} de Justificación #{self.justificacion_id}"
 
 
+def bloquear_contenido(sha256: str) -> None:
+    """
+    Serializa hasta el fin de la transacción a quien deduplica contra un
+    contenido y a quien borra su objeto del storage (advisory lock de
+    PostgreSQL; en otras bases no hace nada). Va dentro de transaction.atomic().
+    """
+    if not sha256 or connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [int(sha256[:15], 16)])
+
+
+def _sha256(contenido) -> str:
+    hasher = hashlib.sha256()
+    for chunk in contenido.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
 class Notificacion(models.Model):
+    """Fila del outbox de notificaciones; ver justificaciones/notificaciones.py."""
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "PENDIENTE", "Pendiente"
+        ENVIADA = "ENVIADA", "Enviada"
+        FALLIDA = "FALLIDA", "Fallida"
+
     destinatario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    asunto = models.CharField(max_length=200, blank=True)
     mensaje = models.TextField()
     canal = models.CharField(max_length=20, default="email")  # email | app | sms
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    enviada_en = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["estado", "proximo_intento"], name="notif_estado_proximo_idx")]
+
     def __str__(self) -> str:
         return f"Notificación a {self.destinatario} por {self.canal}"
+
+
+class JustificacionStats(models.Model):
+    """
+    Conteo precalculado de justificaciones por estudiante, estado, fuente y
+    día del último cambio de estado. Lo mantiene justificaciones/estadisticas.py;
+    ``manage.py recalcular_estadisticas`` lo reconstruye y detecta diferencias.
+    """
+
+    estudiante = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    estado = models.CharField(max_length=20, choices=Justificacion.Estado.choices)
+    fuente = models.CharField(max_length=30)
+    dia = models.DateField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["estudiante", "estado", "fuente", "dia"], name="justi_stats_clave_unica"),
+        ]
+        indexes = [models.Index(fields=["estado", "dia"], name="justi_stats_estado_dia_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.estudiante_id} {self.estado} {self.fuente} {self.dia}: {self.total}"
+
+
+class Tarea(models.Model):
+    """Trabajo en segundo plano (cola en base de datos). Ver justificaciones/tareas.py."""
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "PENDIENTE", "Pendiente"
+        EN_CURSO = "EN_CURSO", "En curso"
+        COMPLETADA = "COMPLETADA", "Completada"
+        FALLIDA = "FALLIDA", "Fallida"
+
+    tipo = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    # Encolar dos veces la misma clave no crea un segundo trabajo
+    clave = models.CharField(max_length=200, unique=True)
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    # Si un worker muere con la tarea tomada, otro la retoma al vencer este plazo
+    bloqueada_hasta = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado", "disponible_en"], name="tarea_estado_disponible_idx")]
+
+    def __str__(self) -> str:
+        return f"Tarea #{self.pk} {self.tipo} - {self.estado}"
@@ -0,0 +1,103 @@
+"""
+Generadores de documentos de ejemplo (PDF y PNG) para tests y benchmarks.
+Los PDF se arman a mano, sin dependencias, con la estructura mínima que
+entiende justificaciones/legibilidad.py y cualquier visor.
+"""
+from __future__ import annotations
+import io
+import os
+import random
+import zlib
+from PIL import Image
+
+
+def _armar_pdf(objetos: list[bytes]) -> bytes:
+    salida = io.BytesIO()
+    salida.write(b"%PDF-1.4\n")
+    offsets = []
+    for numero, cuerpo in enumerate(objetos, start=1):
+        offsets.append(salida.tell())
+        salida.write(b"%d 0 obj\n" % numero + cuerpo + b"\nendobj\n")
+    xref = salida.tell()
+    salida.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1))
+    for offset in offsets:
+        salida.write(b"%010d 00000 n \n" % offset)
+    salida.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref))
+    return salida.getvalue()
+
+
+def _stream(diccionario: bytes, datos: bytes, comprimir: bool = True) -> bytes:
+    if comprimir:
+        datos = zlib.compress(datos)
+        diccionario += b" /Filter /FlateDecode"
+    return b"<< " + diccionario + b" /Length %d >>\nstream\n" % len(datos) + datos + b"\nendstream"
+
+
+def pdf(paginas: int = 1, texto: str | None = "Certificado medico", imagen: tuple[int, int] | None = None) -> bytes:
+    """
+    PDF carta de ``paginas`` páginas. Cada página dibuja ``texto`` y, si se
+    indica ``imagen=(ancho, alto)``, una imagen en escala de grises a página
+    completa (como un escaneo). Sin texto ni imagen las páginas quedan en blanco.
+    """
+    objetos: list[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b""]
+    kids = []
+    imagen_ref = None
+    if imagen:
+        ancho, alto = imagen
+        pixeles = bytes(random.getrandbits(8) for _ in range(min(ancho * alto, 64 * 1024)))
+        pixeles = (pixeles * (ancho * alto // len(pixeles) + 1))[: ancho * alto]
+        objetos.append(_stream(
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray /BitsPerComponent 8"
+            % (ancho, alto),
+            pixeles,
+        ))
+        imagen_ref = len(objetos)
+    for _ in range(paginas):
+        operaciones = b""
+        if imagen_ref:
+            operaciones += b"q 612 0 0 792 0 0 cm /Im1 Do Q\n"
+        if texto:
+            operaciones += b"BT /F1 18 Tf 72 700 Td (" + texto.encode("latin-1") + b") Tj ET\n"
+        objetos.append(_stream(b"", operaciones))
+        recursos = b"/Font << /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> >>"
+        if imagen_ref:
+            recursos += b" /XObject << /Im1 %d 0 R >>" % imagen_ref
+        objetos.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << "
+            + recursos + b" >> /Contents %d 0 R >>" % len(objetos)
+        )
+        kids.append(b"%d 0 R" % len(objetos))
+    objetos[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % paginas
+    return _armar_pdf(objetos)
+
+
+def png(ancho: int = 1240, alto: int = 1754, en_blanco: bool = False) -> bytes:
+    """PNG en escala de grises; con ruido (simula texto escaneado) salvo ``en_blanco``."""
+    if en_blanco:
+        imagen = Image.new("L", (ancho, alto), 255)
+    else:
+        imagen = Image.effect_noise((ancho, alto), 64)
+    salida = io.BytesIO()
+    imagen.save(salida, format="PNG")
+    return salida.getvalue()
+
+
+def generar_corpus(directorio: str, cantidad: int = 40) -> list[str]:
+    """Escribe un corpus variado (texto, escaneos, páginas en blanco, PNG) en ``directorio``."""
+    os.makedirs(directorio, exist_ok=True)
+    variantes = [
+        ("texto.pdf", lambda: pdf(paginas=2)),
+        ("escaneo.pdf", lambda: pdf(paginas=1, texto=None, imagen=(1275, 1650))),
+        ("escaneo_baja.pdf", lambda: pdf(paginas=1, texto=None, imagen=(300, 400))),
+        ("en_blanco.pdf", lambda: pdf(paginas=3, texto=None)),
+        ("foto.png", lambda: png()),
+        ("vacia.png", lambda: png(en_blanco=True)),
+    ]
+    rutas = []
+    for i in range(cantidad):
+        nombre, generar = variantes[i % len(variantes)]
+        ruta = os.path.join(directorio, f"{i:04d}_{nombre}")
+        with open(ruta, "wb") as f:
+            f.write(generar())
+        rutas.append(ruta)
+    return rutas
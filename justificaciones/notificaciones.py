@@ -0,0 +1,162 @@
+"""
+Outbox de notificaciones.
+
+Los cambios de estado escriben filas Notificacion (una por canal) en la misma
+transacción que el cambio y encolan la tarea ``despachar_notificaciones``.
+El despacho reserva lotes de filas pendientes en una transacción corta, envía
+fuera de ella todos los correos del lote por una sola conexión SMTP y registra
+el estado de entrega por fila, con reintentos y backoff exponencial.
+"""
+from __future__ import annotations
+import logging
+from datetime import timedelta
+from typing import Callable, Iterable
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Justificacion, Notificacion
+from .tareas import encolar, tarea
+
+logger = logging.getLogger(__name__)
+
+
+def _contenido(justi: Justificacion) -> tuple[str, str]:
+    asunto = f"Tu justificación #{justi.pk} fue {justi.estado.lower()}"
+    cuerpo = (
+        f"Hola {justi.estudiante.get_full_name() or justi.estudiante.username},\n\n"
+        f"Estado: {justi.get_estado_display()}\n"
+        f"Comentario: {justi.comentarios_coordinador or 'Sin comentarios'}\n\n"
+        f"Saludos,\nEquipo JustiFácil"
+    )
+    return asunto, cuerpo
+
+
+def notificar_cambio_estado(justificaciones: Iterable[Justificacion]) -> list[Notificacion]:
+    """
+    Registra las notificaciones de cambio de estado en el outbox. Debe llamarse
+    dentro de la transacción que cambia el estado: si esta se revierte, no queda
+    nada por enviar. ``estudiante`` debería venir con select_related.
+    """
+    canales = getattr(settings, "NOTIFICACIONES_CANALES", ["email", "app"])
+    filas = []
+    for justi in justificaciones:
+        asunto, cuerpo = _contenido(justi)
+        filas += [
+            Notificacion(destinatario=justi.estudiante, asunto=asunto, mensaje=cuerpo, canal=canal)
+            for canal in canales
+        ]
+    if filas:
+        Notificacion.objects.bulk_create(filas)
+        encolar("despachar_notificaciones")
+    return filas
+
+
+# -- Envío por canal -------------------------------------------------------------
+
+def _enviar_app(notificaciones: list[Notificacion]) -> dict[int, str | None]:
+    # El canal app es la propia fila: queda disponible apenas se registra
+    return {n.pk: None for n in notificaciones}
+
+
+def _enviar_email(notificaciones: list[Notificacion]) -> dict[int, str | None]:
+    resultados: dict[int, str | None] = {}
+    with get_connection() as conexion:  # una conexión para todo el lote
+        for n in notificaciones:
+            mensaje = EmailMessage(
+                n.asunto, n.mensaje, None, [n.destinatario.email or "devnull@example.com"], connection=conexion
+            )
+            try:
+                conexion.send_messages([mensaje])
+                resultados[n.pk] = None
+            except Exception as e:
+                resultados[n.pk] = f"{type(e).__name__}: {e}"
+    return resultados
+
+
+def _enviar_sms(notificaciones: list[Notificacion]) -> dict[int, str | None]:
+    return {n.pk: "No hay proveedor SMS configurado" for n in notificaciones}
+
+
+ENVIADORES: dict[str, Callable[[list[Notificacion]], dict[int, str | None]]] = {
+    "app": _enviar_app,
+    "email": _enviar_email,
+    "sms": _enviar_sms,
+}
+
+
+def reclamar(lote: int = 100) -> list[Notificacion]:
+    """
+    Toma hasta ``lote`` notificaciones pendientes y las reserva por
+    NOTIFICACIONES_PLAZO_SEGUNDOS: el intento se cuenta aquí, así que si el
+    worker muere a mitad del envío la fila vuelve a tomarse al vencer el
+    plazo y se agota como cualquier otro reintento.
+    """
+    ahora = timezone.now()
+    plazo = timedelta(seconds=getattr(settings, "NOTIFICACIONES_PLAZO_SEGUNDOS", 300))
+    with transaction.atomic():
+        pendientes = list(
+            Notificacion.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("destinatario")
+            .filter(estado=Notificacion.Estado.PENDIENTE, proximo_intento__lte=ahora)
+            .order_by("proximo_intento")[:lote]
+        )
+        for n in pendientes:
+            n.intentos += 1
+            n.proximo_intento = ahora + plazo
+        Notificacion.objects.bulk_update(pendientes, ["intentos", "proximo_intento"])
+    return pendientes
+
+
+@tarea("despachar_notificaciones")
+def despachar_notificaciones(lote: int = 100) -> int:
+    """Envía hasta ``lote`` notificaciones pendientes. Devuelve cuántas se enviaron."""
+    max_intentos = getattr(settings, "NOTIFICACIONES_MAX_INTENTOS", 5)
+    backoff = getattr(settings, "NOTIFICACIONES_BACKOFF_SEGUNDOS", 30)
+    enviadas = 0
+    # El envío (SMTP) corre fuera de la transacción que reservó las filas
+    pendientes = reclamar(lote)
+    por_canal: dict[str, list[Notificacion]] = {}
+    for n in pendientes:
+        por_canal.setdefault(n.canal, []).append(n)
+    for canal, notificaciones in por_canal.items():
+        enviador = ENVIADORES.get(canal)
+        if enviador is None:
+            resultados = {n.pk: f"Canal desconocido: {canal}" for n in notificaciones}
+        else:
+            try:
+                resultados = enviador(notificaciones)
+            except Exception as e:
+                # P. ej. el servidor SMTP rechaza la conexión: cuenta como intento de cada fila del canal
+                logger.exception("Falló el canal %s para %s notificaciones", canal, len(notificaciones))
+                resultados = {n.pk: f"{type(e).__name__}: {e}" for n in notificaciones}
+        ahora = timezone.now()
+        for n in notificaciones:
+            error = resultados.get(n.pk)
+            if error is None:
+                n.estado = Notificacion.Estado.ENVIADA
+                n.enviada_en = ahora
+                n.error = ""
+                enviadas += 1
+            else:
+                logger.warning("No se pudo enviar %s: %s", n, error)
+                n.error = error
+                if n.intentos >= max_intentos:
+                    n.estado = Notificacion.Estado.FALLIDA
+                else:
+                    n.proximo_intento = ahora + timedelta(seconds=backoff * 2 ** (n.intentos - 1))
+    Notificacion.objects.bulk_update(pendientes, ["estado", "proximo_intento", "enviada_en", "error"])
+
+    # Quedan reintentos o más filas que el lote: se programa el siguiente despacho
+    siguiente = (
+        Notificacion.objects.filter(estado=Notificacion.Estado.PENDIENTE)
+        .order_by("proximo_intento")
+        .values_list("proximo_intento", flat=True)
+        .first()
+    )
+    if siguiente is not None:
+        cuando = max(siguiente, timezone.now()).replace(microsecond=0)
+        # Clave por segundo: varios despachos que ven la misma fila no programan tareas duplicadas
+        encolar("despachar_notificaciones", clave=f"despachar_notificaciones:{cuando.isoformat()}", disponible_en=cuando)
+    return enviadas
@@ -0,0 +1,190 @@
+"""
+Paginación por cursor (keyset) para los listados de Justificacion.
+
+En vez de OFFSET/COUNT cada página filtra a partir de la última fila vista,
+p. ej. ``WHERE (created_at, id) < (:c, :id) ORDER BY created_at DESC, id DESC
+LIMIT n + 1``, de modo que el costo no crece con el historial. El cursor es
+un JSON en base64 con los valores de orden de la fila límite y la dirección.
+"""
+from __future__ import annotations
+import base64
+import json
+from datetime import datetime
+from typing import Callable
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest, QueryDict
+from django.utils.functional import cached_property
+
+ORDEN_RECIENTES = ("-created_at", "-id")
+ORDEN_ANTIGUAS = ("created_at", "id")
+
+
+class Pagina:
+    """
+    Página de resultados. La consulta se ejecuta recién al acceder a las filas
+    o cursores, así un fragmento de template cacheado no toca la base.
+    """
+
+    def __init__(self, cargar: Callable[[], tuple[list, str | None, str | None]], parametros: QueryDict) -> None:
+        self._cargar = cargar
+        self.parametros = parametros
+
+    @cached_property
+    def _resultado(self) -> tuple[list, str | None, str | None]:
+        return self._cargar()
+
+    @property
+    def objetos(self) -> list:
+        return self._resultado[0]
+
+    @property
+    def siguiente(self) -> str | None:
+        return self._resultado[1]
+
+    @property
+    def anterior(self) -> str | None:
+        return self._resultado[2]
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self) -> int:
+        return len(self.objetos)
+
+    def _url(self, cursor: str) -> str:
+        parametros = self.parametros.copy()
+        parametros["cursor"] = cursor
+        return "?" + parametros.urlencode()
+
+    @property
+    def url_siguiente(self) -> str | None:
+        return self._url(self.siguiente) if self.siguiente else None
+
+    @property
+    def url_anterior(self) -> str | None:
+        return self._url(self.anterior) if self.anterior else None
+
+
+class _Encoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder trunca a milisegundos; el cursor necesita el valor exacto
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def codificar_cursor(valores: list, direccion: str) -> str:
+    datos = json.dumps({"v": valores, "d": direccion}, cls=_Encoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> tuple[list, str] | None:
+    """Devuelve (valores, dirección) o None si el cursor no es válido."""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        valores, direccion = datos["v"], datos["d"]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if direccion not in ("sig", "ant") or not isinstance(valores, list):
+        return None
+    return valores, direccion
+
+
+def _filtro_keyset(queryset: QuerySet, orden: tuple[str, ...], valores: list, hacia_adelante: bool) -> Q:
+    """
+    (a, b) > (x, y) expandido como a > x OR (a = x AND b > y), respetando
+    ASC/DESC por campo. ValidationError si los valores no son del tipo de sus
+    campos (un cursor alterado a mano).
+    """
+    if len(valores) != len(orden):
+        raise ValidationError("El cursor no corresponde al orden del listado")
+    filtro = Q()
+    iguales = Q()
+    for campo_orden, valor in zip(orden, valores):
+        nombre = campo_orden.lstrip("-")
+        descendente = campo_orden.startswith("-")
+        try:
+            campo = queryset.model._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            campo = queryset.query.annotations[nombre].output_field  # p. ej. el rango de una búsqueda
+        try:
+            valor = campo.to_python(valor)
+        except (TypeError, ValueError) as e:
+            raise ValidationError(str(e))
+        operador = "lt" if descendente == hacia_adelante else "gt"
+        filtro |= iguales & Q(**{f"{nombre}__{operador}": valor})
+        iguales &= Q(**{nombre: valor})
+    return filtro
+
+
+def _valores(objeto, orden: tuple[str, ...]) -> list:
+    return [getattr(objeto, campo.lstrip("-")) for campo in orden]
+
+
+def consulta_pagina(
+    queryset: QuerySet,
+    orden: tuple[str, ...],
+    tamano: int,
+    cursor: tuple[list, str] | None = None,
+) -> QuerySet:
+    """
+    La consulta de una página (``tamano + 1`` filas para saber si hay más),
+    tal como la ejecuta paginar(); test_planes_consulta revisa su EXPLAIN.
+    ValidationError si el cursor no corresponde al orden.
+    """
+    if cursor is None:
+        return queryset.order_by(*orden)[: tamano + 1]
+    valores, direccion = cursor
+    adelante = direccion == "sig"
+    invertido = tuple(c[1:] if c.startswith("-") else f"-{c}" for c in orden)
+    return (
+        queryset.filter(_filtro_keyset(queryset, orden, valores, adelante))
+        .order_by(*(orden if adelante else invertido))[: tamano + 1]
+    )
+
+
+def paginar(
+    request: HttpRequest,
+    queryset: QuerySet,
+    orden: tuple[str, ...] = ORDEN_RECIENTES,
+    tamano: int | None = None,
+) -> Pagina:
+    """
+    Devuelve la página indicada por ``?cursor=`` (la primera si no hay o es
+    inválido). ``orden`` debe terminar en un campo único (normalmente ``id``)
+    para que el orden sea total; puede incluir anotaciones del queryset.
+    """
+    tamano = tamano or getattr(settings, "JUSTIFICACIONES_PAGE_SIZE", 25)
+    parametros = request.GET.copy()
+    parametros.pop("cursor", None)
+    cursor = decodificar_cursor(request.GET.get("cursor", ""))
+    try:
+        consulta = consulta_pagina(queryset, orden, tamano, cursor)
+    except ValidationError:
+        # Alterado: como cualquier cursor inválido, se sirve la primera página
+        cursor = None
+        consulta = consulta_pagina(queryset, orden, tamano)
+
+    def cargar() -> tuple[list, str | None, str | None]:
+        filas = list(consulta)
+        if cursor is None:
+            hay_mas, hay_previas = len(filas) > tamano, False
+        else:
+            adelante = cursor[1] == "sig"
+            hay_extra = len(filas) > tamano
+            filas = filas[:tamano]
+            if not adelante:
+                filas.reverse()
+            # Se llegó desde una página vecina, así que en esa dirección siempre hay filas
+            hay_mas, hay_previas = (hay_extra, True) if adelante else (True, hay_extra)
+        filas = filas[:tamano]
+        return (
+            filas,
+            codificar_cursor(_valores(filas[-1], orden), "sig") if hay_mas and filas else None,
+            codificar_cursor(_valores(filas[0], orden), "ant") if hay_previas and filas else None,
+        )
+
+    return Pagina(cargar, parametros)
@@ -0,0 +1,139 @@
+"""
+Presupuesto de consultas por vista.
+
+Cada vista declara cuántas consultas SQL puede hacer por request con
+``@presupuesto_consultas(n)`` (incluye sesión y usuario). El middleware
+cuenta las consultas de cada request y, si se supera el presupuesto, registra
+un warning con las consultas sobrantes (normalmente un N+1) o, con
+JUSTIFICACIONES_PRESUPUESTO_ESTRICTO, levanta PresupuestoExcedido. En tests,
+``verificar_presupuesto`` hace la misma comprobación sin el middleware.
+
+El presupuesto se toma midiendo la vista (X-Consultas-DB o el contador que
+devuelve ``verificar_presupuesto``), no estimándolo, y cada vista decorada
+tiene un test que lo comprueba con ``verificar_presupuesto``.
+"""
+from __future__ import annotations
+import logging
+from contextlib import contextmanager
+from typing import Callable
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+
+def presupuesto_consultas(maximo: int):
+    """
+    Declara el máximo de consultas por request de la vista decorada. Va como
+    decorador más externo (sobre login_required) para quedar en la vista que
+    resuelve la URL.
+    """
+    def decorator(view_func):
+        view_func.presupuesto_consultas = maximo
+        return view_func
+    return decorator
+
+
+def presupuesto_de(view_func: Callable) -> int | None:
+    return getattr(view_func, "presupuesto_consultas", None)
+
+
+class ContadorConsultas:
+    """execute_wrapper de Django que guarda el SQL de cada consulta."""
+
+    def __init__(self) -> None:
+        self.consultas: list[str] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self) -> int:
+        return len(self.consultas)
+
+
+def _informe(nombre: str, maximo: int, contador: ContadorConsultas) -> str:
+    sobrantes = "\n".join(f"  {sql}" for sql in contador.consultas[maximo:])
+    return f"{nombre}: {len(contador)} consultas, presupuesto {maximo}. Consultas sobrantes:\n{sobrantes}"
+
+
+@contextmanager
+def verificar_presupuesto(view_func: Callable, maximo: int | None = None):
+    """
+    Para tests: falla si el bloque hace más consultas que el presupuesto
+    declarado por ``view_func`` (o ``maximo``).
+    """
+    maximo = maximo if maximo is not None else presupuesto_de(view_func)
+    if maximo is None:
+        raise PresupuestoExcedido(f"{view_func.__name__} no declara presupuesto de consultas")
+    contador = ContadorConsultas()
+    with connection.execute_wrapper(contador):
+        yield contador
+    if len(contador) > maximo:
+        raise PresupuestoExcedido(_informe(view_func.__name__, maximo, contador))
+
+
+class PresupuestoConsultasMiddleware:
+    """
+    Activo con DEBUG o JUSTIFICACIONES_PRESUPUESTO_ACTIVO. Agrega la cabecera
+    X-Consultas-DB con el total de consultas del request. Soporta ASGI sin
+    forzar las vistas async a un hilo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _activo():
+            return self.get_response(request)
+        contador = ContadorConsultas()
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+        return self._revisar(request, response, contador)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if not _activo():
+            return await self.get_response(request)
+        contador = ContadorConsultas()
+        # El ORM async consulta desde el hilo sync del request: el wrapper se instala en esa conexión
+        gestor = await sync_to_async(_instalar)(contador)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(gestor.__exit__)(None, None, None)
+        return self._revisar(request, response, contador)
+
+    def _revisar(self, request: HttpRequest, response: HttpResponse, contador: ContadorConsultas) -> HttpResponse:
+        response["X-Consultas-DB"] = str(len(contador))
+
+        coincidencia = getattr(request, "resolver_match", None)
+        maximo = presupuesto_de(coincidencia.func) if coincidencia else None
+        if maximo is not None and len(contador) > maximo:
+            informe = _informe(coincidencia.view_name, maximo, contador)
+            if getattr(settings, "JUSTIFICACIONES_PRESUPUESTO_ESTRICTO", False):
+                raise PresupuestoExcedido(informe)
+            logger.warning(informe)
+        return response
+
+
+def _activo() -> bool:
+    return getattr(settings, "JUSTIFICACIONES_PRESUPUESTO_ACTIVO", settings.DEBUG)
+
+
+def _instalar(contador: ContadorConsultas):
+    gestor = connection.execute_wrapper(contador)
+    gestor.__enter__()
+    return gestor
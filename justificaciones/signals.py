@@ -0,0 +1,88 @@
+from __future__ import annotations
+import logging
+from collections import Counter
+from contextlib import suppress
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import estadisticas, fragmentos, miniaturas
+from .busqueda import CAMPOS_USUARIO, texto_busqueda
+from .models import Documento, Justificacion, bloquear_contenido
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=Documento)
+def borrar_archivo_sin_referencias(sender, instance: Documento, **kwargs) -> None:
+    """
+    Elimina el objeto del storage, y sus miniaturas, cuando se borra el último
+    Documento que lo referencia (varios Documento pueden compartir archivo
+    por deduplicación).
+    """
+    nombre = instance.archivo.name
+    if not nombre:
+        return
+    storage = instance.archivo.storage
+    sha256 = instance.sha256
+    variantes = miniaturas.claves(instance)  # ya: al confirmar, Django dejó el pk del instance en None
+
+    def _borrar() -> None:
+        with transaction.atomic():
+            # Con el bloqueo de la deduplicación: nadie pasa a apuntar al objeto entre la consulta y el borrado
+            bloquear_contenido(sha256)
+            if Documento.objects.filter(archivo=nombre).exists():
+                return
+            try:
+                storage.delete(nombre)
+            except Exception:
+                logger.exception("No se pudo eliminar %s del storage", nombre)
+            for clave in variantes:
+                # Puede no existir (p. ej. un PDF sin imagen): no es un error
+                with suppress(Exception):
+                    storage.delete(clave)
+
+    transaction.on_commit(_borrar)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def actualizar_busqueda_estudiante(sender, instance, created: bool, update_fields=None, **kwargs) -> None:
+    """Mantiene texto_busqueda al día cuando cambian el usuario o el nombre del estudiante."""
+    if created or (update_fields is not None and not set(CAMPOS_USUARIO) & set(update_fields)):
+        return  # p. ej. el login solo actualiza last_login
+    justificaciones = list(Justificacion.objects.filter(estudiante=instance).only("id", "motivo", "descripcion"))
+    for justi in justificaciones:
+        justi.estudiante = instance
+        justi.texto_busqueda = texto_busqueda(justi)
+    Justificacion.objects.bulk_update(justificaciones, ["texto_busqueda"], batch_size=500)
+    fragmentos.invalidar([instance.pk])  # el nombre aparece en el detalle
+
+
+@receiver(post_save, sender=Justificacion)
+def mover_estadisticas(sender, instance: Justificacion, **kwargs) -> None:
+    # Justificacion.save() envuelve esto en la misma transacción que el INSERT/UPDATE
+    estadisticas.mover([instance])
+
+
+@receiver(post_delete, sender=Justificacion)
+def descontar_estadisticas(sender, instance: Justificacion, **kwargs) -> None:
+    clave = getattr(instance, "_clave_stats_original", None) or instance.clave_stats()
+    estadisticas.registrar(Counter({clave: -1}))
+
+
+@receiver([post_save, post_delete], sender=Justificacion)
+def invalidar_fragmentos_justificacion(sender, instance: Justificacion, **kwargs) -> None:
+    fragmentos.invalidar([instance.estudiante_id])
+
+
+@receiver([post_save, post_delete], sender=Documento)
+def invalidar_fragmentos_documento(sender, instance: Documento, **kwargs) -> None:
+    if Documento._meta.get_field("justificacion").is_cached(instance):
+        estudiante_id = instance.justificacion.estudiante_id
+    else:
+        estudiante_id = (
+            Justificacion.objects.filter(pk=instance.justificacion_id).values_list("estudiante_id", flat=True).first()
+        )
+    if estudiante_id is not None:
+        fragmentos.invalidar([estudiante_id])
@@ -2,13 +2,17 @@
 Custom Django Storage Backend for Supabase Storage
 """
 from __future__ import annotations
+import io
 import os
-from io import BytesIO
 from typing import Any
+import requests
 from django.core.files.base import File
 from django.core.files.storage import Storage
 from django.conf import settings
 from supabase import create_client, Client
+from . import storage_naming
+from .storage_cache import ObjectMetadata, get_metadata_cache
+from .storage_http import ChunkedReader, RemoteFile, TUS_CHUNK_SIZE, get_session, get_timeout, tus_upload
 
 
 class SupabaseStorage(Storage):
@@ -23,6 +27,10 @@ class SupabaseStorage(Storage):
         self.supabase_key = getattr(settings, "SUPABASE_KEY")
         self.bucket_name = getattr(settings, "SUPABASE_BUCKET", "Documentos")
         self._client: Client | None = None
+        self.storage_url = f"{self.supabase_url}/storage/v1"
+        # Uploads larger than this use the resumable (TUS) endpoint
+        self.resumable_threshold = getattr(settings, "SUPABASE_STORAGE_RESUMABLE_THRESHOLD", TUS_CHUNK_SIZE)
+        self.resumable_chunk_size = getattr(settings, "SUPABASE_STORAGE_RESUMABLE_CHUNK_SIZE", TUS_CHUNK_SIZE)
 
     @property
     def client(self) -> Client:
@@ -31,6 +39,19 @@ class SupabaseStorage(Storage):
             self._client = create_client(self.supabase_url, self.supabase_key)
         return self._client
 
+    @property
+    def metadata_cache(self):
+        return get_metadata_cache()
+
+    def _cache_key(self, name: str) -> str:
+        return f"{self.bucket_name}/{name}"
+
+    def _get_headers(self) -> dict:
+        """Auth headers for the raw Storage API calls the client cannot stream."""
+        return {
+            "Authorization": f"Bearer {self.supabase_key}",
+            "apikey": self.supabase_key,
+        }
 
     def _save(self, name: str, content: File) -> str:
         """
@@ -43,17 +64,31 @@ class SupabaseStorage(Storage):
         Returns:
             The name/path of the saved file
         """
-        # Read file content
-        content.seek(0)
-        file_data = content.read()
+        content_type = getattr(content, 'content_type', None) or "application/octet-stream"
         
-        # Upload to Supabase Storage
+        if content.size > self.resumable_threshold:
+            # Large files go through the resumable endpoint, one chunk at a time
+            tus_upload(
+                get_session(),
+                f"{self.storage_url}/upload/resumable",
+                self._get_headers(),
+                self.bucket_name,
+                name,
+                content,
+                content_type,
+                chunk_size=self.resumable_chunk_size,
+            )
+            self.metadata_cache.set(self._cache_key(name), ObjectMetadata.from_upload(content.size, content_type))
+            return name
+        
+        # Upload to Supabase Storage, streaming the content chunk by chunk
         self.client.storage.from_(self.bucket_name).upload(
             path=name,
-            file=file_data,
-            file_options={"content-type": content.content_type if hasattr(content, 'content_type') else "application/octet-stream"}
+            file=io.BufferedReader(ChunkedReader(content)),
+            file_options={"content-type": content_type}
         )
         
+        self.metadata_cache.set(self._cache_key(name), ObjectMetadata.from_upload(content.size, content_type))
         return name
 
     def _open(self, name: str, mode: str = "rb") -> File:
@@ -65,15 +100,23 @@ class SupabaseStorage(Storage):
             mode: The file mode (only 'rb' is supported)
             
         Returns:
-            A File object containing the file data
+            A File object that reads lazily from the streamed response
         """
-        # Download file from Supabase
-        response = self.client.storage.from_(self.bucket_name).download(name)
-        
-        # Create a File object from the bytes
-        file_obj = BytesIO(response)
-        file_obj.name = name
-        return File(file_obj, name=name)
+        # The client's download() returns the whole body as bytes, so the
+        # object is streamed from the same endpoint with the pooled session.
+        return RemoteFile(self._download(name), name=name, reopen=lambda: self._download(name))
+
+    def _download(self, name: str) -> requests.Response:
+        response = get_session().get(
+            f"{self.storage_url}/object/{self.bucket_name}/{name}",
+            headers=self._get_headers(),
+            timeout=get_timeout("download"),
+            stream=True,
+        )
+        if response.status_code != 200:
+            response.close()
+            raise FileNotFoundError(f"File not found: {name}")
+        return response
 
     def delete(self, name: str) -> None:
         """
@@ -82,8 +125,36 @@ class SupabaseStorage(Storage):
         Args:
             name: The name/path of the file to delete
         """
+        self.metadata_cache.delete(self._cache_key(name))
         self.client.storage.from_(self.bucket_name).remove([name])
 
+    def metadata(self, name: str) -> ObjectMetadata | None:
+        """
+        Get the metadata of a file, listing its folder only on a cache miss.
+        
+        Args:
+            name: The name/path of the file
+            
+        Returns:
+            The object metadata, or None if the file does not exist
+        """
+        metadata = self.metadata_cache.get(self._cache_key(name))
+        if metadata is not None:
+            return metadata
+        
+        # List only the file's own folder, filtered by its basename
+        folder, filename = os.path.split(name)
+        files = self.client.storage.from_(self.bucket_name).list(folder, {"search": filename})
+        for f in files:
+            if f.get("id") is None:
+                continue  # sub-folders have no metadata
+            found = ObjectMetadata.from_listing(f)
+            path = f"{folder}/{f['name']}" if folder else f["name"]
+            self.metadata_cache.set(self._cache_key(path), found)
+            if f["name"] == filename:
+                metadata = found
+        return metadata
+
     def exists(self, name: str) -> bool:
         """
         Check if a file exists in Supabase Storage.
@@ -95,11 +166,7 @@ class SupabaseStorage(Storage):
             True if the file exists, False otherwise
         """
         try:
-            # List files in the bucket and check if our file is there
-            files = self.client.storage.from_(self.bucket_name).list()
-            # Extract just the filename from the path
-            filename = os.path.basename(name)
-            return any(f.get("name") == filename for f in files)
+            return self.metadata(name) is not None
         except Exception:
             return False
 
@@ -128,16 +195,15 @@ class SupabaseStorage(Storage):
             The size of the file in bytes
         """
         try:
-            # Download the file to get its size
-            response = self.client.storage.from_(self.bucket_name).download(name)
-            return len(response)
+            metadata = self.metadata(name)
+            return metadata.size if metadata else 0
         except Exception:
             return 0
 
     def get_available_name(self, name: str, max_length: int | None = None) -> str:
         """
-        Get an available filename. If a file with the given name already exists,
-        append a suffix to make it unique.
+        Get an available filename using the strategy set in
+        SUPABASE_STORAGE_NAMING (see storage_naming.py).
         
         Args:
             name: The desired filename
@@ -146,13 +212,4 @@ class SupabaseStorage(Storage):
         Returns:
             An available filename
         """
-        if self.exists(name):
-            # If file exists, append a timestamp or counter
-            import time
-            base, ext = os.path.splitext(name)
-            name = f"{base}_{int(time.time())}{ext}"
-        
-        if max_length and len(name) > max_length:
-            name = name[:max_length]
-            
-        return name
+        return storage_naming.available_name(self, name, max_length)
@@ -0,0 +1,218 @@
+"""
+Async transport for the Supabase Storage backend.
+Keeps one pooled, keep-alive httpx.AsyncClient per event loop so async views
+running under ASGI await the Supabase round trip instead of holding a worker
+thread for it. Also provides storage-agnostic helpers (asave, astream) that
+fall back to running the sync API in a thread for backends without native
+async support, such as FileSystemStorage in development.
+"""
+from __future__ import annotations
+import asyncio
+import weakref
+from typing import AsyncIterator, Iterator
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .storage_cache import ObjectMetadata
+from .storage_http import RETRY_METHODS, RETRY_STATUSES, get_timeout
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+# Chunk size used to stream bodies in both directions
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def build_client() -> httpx.AsyncClient:
+    """Create a client with the same pool bounds as the sync session."""
+    maxsize = getattr(settings, "SUPABASE_STORAGE_POOL_MAXSIZE", 10)
+    limits = httpx.Limits(max_connections=maxsize, max_keepalive_connections=maxsize)
+    # httpx only retries failed connection attempts; status retries are done in request()
+    transport = httpx.AsyncHTTPTransport(limits=limits, retries=getattr(settings, "SUPABASE_STORAGE_RETRIES", 3))
+    return httpx.AsyncClient(transport=transport)
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the client for the running event loop.
+    Connections belong to the loop that opened them, so each loop gets its
+    own pool; under uvicorn/daphne that is one pool per worker process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = build_client()
+    return client
+
+
+async def aclose_client() -> None:
+    """Close the client of the running loop (e.g. on ASGI lifespan shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting: str, **kwargs) -> None:
+    if setting.startswith("SUPABASE_STORAGE_"):
+        _clients.clear()
+
+
+def get_async_timeout(operation: str) -> httpx.Timeout:
+    connect, read = get_timeout(operation)
+    return httpx.Timeout(read, connect=connect)
+
+
+async def request(method: str, url: str, operation: str, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared client.
+    Idempotent methods are retried on 429/5xx with exponential backoff, the
+    same policy the sync session gets from urllib3's Retry.
+    """
+    client = get_client()
+    retries = getattr(settings, "SUPABASE_STORAGE_RETRIES", 3) if method in RETRY_METHODS else 0
+    backoff = getattr(settings, "SUPABASE_STORAGE_BACKOFF", 0.3)
+    stream = kwargs.pop("stream", False)
+    for attempt in range(retries + 1):
+        response = await client.send(
+            client.build_request(method, url, timeout=get_async_timeout(operation), **kwargs), stream=stream
+        )
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+        await response.aclose()
+        retry_after = response.headers.get("Retry-After", "")
+        await asyncio.sleep(float(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt)
+    return response
+
+
+async def aiter_file(content: File, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Upload body over a Django File; chunks come from a local temp file or memory."""
+    for chunk in content.chunks(chunk_size):
+        yield chunk
+
+
+async def aiter_response(response: httpx.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield a streamed response body and release the connection when done."""
+    try:
+        async for chunk in response.aiter_bytes(chunk_size):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def aiter_storage_file(
+    storage: Storage, name: str, byte_range: tuple[int, int] | None = None, chunk_size: int = STREAM_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Stream a file from a sync-only backend, reading each chunk in a thread."""
+    file = await sync_to_async(_open_at, thread_sensitive=False)(storage, name, byte_range)
+    remaining = byte_range[1] - byte_range[0] + 1 if byte_range else None
+    read = sync_to_async(_read, thread_sensitive=False)
+    try:
+        while remaining != 0 and (chunk := await read(file, remaining, chunk_size)):
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        await sync_to_async(file.close, thread_sensitive=False)()
+
+
+def _read(file: File, remaining: int | None, chunk_size: int = STREAM_CHUNK_SIZE) -> bytes:
+    return file.read(chunk_size if remaining is None else min(chunk_size, remaining))
+
+
+def _open_at(storage: Storage, name: str, byte_range: tuple[int, int] | None) -> File:
+    file = storage.open(name, "rb")
+    if byte_range:
+        file.seek(byte_range[0])
+    return file
+
+
+async def asave(storage: Storage, name: str, content: File, max_length: int | None = None) -> str:
+    """Async counterpart of Storage.save() for any backend."""
+    if hasattr(storage, "asave"):
+        return await storage.asave(name, content, max_length=max_length)
+    return await sync_to_async(storage.save, thread_sensitive=False)(name, content, max_length=max_length)
+
+
+async def ametadata(storage: Storage, name: str) -> ObjectMetadata | None:
+    """Metadata of a stored file for any backend, or None if it does not exist."""
+    if hasattr(storage, "ametadata"):
+        return await storage.ametadata(name)
+
+    def metadata() -> ObjectMetadata | None:
+        if not storage.exists(name):
+            return None
+        return ObjectMetadata(size=storage.size(name))
+
+    return await sync_to_async(metadata, thread_sensitive=False)()
+
+
+async def astream(
+    storage: Storage, name: str, byte_range: tuple[int, int] | None = None, sync_body: bool = False
+) -> tuple[ObjectMetadata, AsyncIterator[bytes] | Iterator[bytes]]:
+    """
+    Open a stored file, or its inclusive (start, end) byte range, for
+    streaming: returns the file's metadata and an iterator over the body,
+    read as it is consumed. Raises FileNotFoundError if it does not exist.
+
+    With ``sync_body`` the body is a plain iterator from the sync client:
+    a WSGI server can only consume an async iterator by buffering it whole.
+    """
+    if sync_body:
+        return await sync_to_async(_open_sync, thread_sensitive=False)(storage, name, byte_range)
+    if hasattr(storage, "astream"):
+        return await storage.astream(name, byte_range)
+    metadata = await ametadata(storage, name)
+    if metadata is None:
+        raise FileNotFoundError(f"File not found: {name}")
+    return metadata, aiter_storage_file(storage, name, byte_range)
+
+
+async def asigned_url(storage: Storage, name: str, expires_in: int) -> str | None:
+    """Short-lived direct URL to the file, or None if the backend cannot sign URLs."""
+    if hasattr(storage, "asigned_url"):
+        return await storage.asigned_url(name, expires_in)
+    return None
+
+
+async def asigned_upload_url(storage: Storage, name: str) -> str | None:
+    """URL the browser can PUT the file to directly, or None if the backend cannot sign uploads."""
+    if hasattr(storage, "asigned_upload_url"):
+        return await storage.asigned_upload_url(name)
+    return None
+
+
+def _open_sync(
+    storage: Storage, name: str, byte_range: tuple[int, int] | None
+) -> tuple[ObjectMetadata, Iterator[bytes]]:
+    if hasattr(storage, "open_range"):
+        file = storage.open_range(name, byte_range)
+        remaining = None  # the server already sent only the range
+    else:
+        file = _open_at(storage, name, byte_range)
+        remaining = byte_range[1] - byte_range[0] + 1 if byte_range else None
+    response = getattr(file, "response", None)  # RemoteFile: the GET already brought the headers
+    if response is not None:
+        metadata = ObjectMetadata.from_headers(response.headers)
+    else:
+        metadata = ObjectMetadata(size=storage.size(name))
+
+    def body() -> Iterator[bytes]:
+        pending = remaining
+        try:
+            if response is not None:
+                yield from file.chunks(STREAM_CHUNK_SIZE)
+                return
+            # File.chunks() rewinds to the start, so a range is read by hand from the seek position
+            while pending != 0 and (chunk := _read(file, pending)):
+                if pending is not None:
+                    pending -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
+
+    return metadata, body()
@@ -0,0 +1,182 @@
+"""
+Object metadata cache shared by the Supabase storage backends.
+Keeps size, etag, content-type and last-modified of stored objects so that
+exists()/size() do not need a network round trip for objects we already know.
+"""
+from __future__ import annotations
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from email.utils import formatdate
+from typing import Any, Mapping
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class ObjectMetadata:
+    size: int
+    etag: str = ""
+    content_type: str = ""
+    last_modified: str = ""
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> "ObjectMetadata":
+        """Build metadata from the headers of a HEAD/GET response (including a 206 to a Range request)."""
+        content_range = headers.get("Content-Range", "")
+        # "bytes 0-99/1234": for a partial response the object size is the total
+        size = content_range.rsplit("/", 1)[1] if "/" in content_range else headers.get("Content-Length", 0)
+        return cls(
+            size=int(size),
+            etag=headers.get("ETag", ""),
+            content_type=headers.get("Content-Type", ""),
+            last_modified=headers.get("Last-Modified", ""),
+        )
+
+    @classmethod
+    def from_listing(cls, item: Mapping[str, Any]) -> "ObjectMetadata":
+        """Build metadata from an entry returned by the Storage list endpoint."""
+        metadata = item.get("metadata") or {}
+        return cls(
+            size=int(metadata.get("size", 0)),
+            etag=metadata.get("eTag", ""),
+            content_type=metadata.get("mimetype", ""),
+            last_modified=metadata.get("lastModified", ""),
+        )
+
+    @classmethod
+    def from_upload(cls, size: int, content_type: str) -> "ObjectMetadata":
+        """Metadata known locally right after a successful upload."""
+        return cls(size=size, content_type=content_type, last_modified=formatdate(usegmt=True))
+
+
+class BaseMetadataCache:
+    """Interface for metadata caches. Keys are "<bucket>/<name>"."""
+
+    def __init__(self, timeout: float = 300, **options: Any) -> None:
+        self.timeout = timeout
+
+    def get(self, key: str) -> ObjectMetadata | None:
+        raise NotImplementedError
+
+    def set(self, key: str, metadata: ObjectMetadata) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LocMemMetadataCache(BaseMetadataCache):
+    """In-process cache with TTL expiry and LRU eviction."""
+
+    def __init__(self, timeout: float = 300, max_entries: int = 10000, **options: Any) -> None:
+        super().__init__(timeout=timeout)
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, ObjectMetadata]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> ObjectMetadata | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, metadata = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return metadata
+
+    def set(self, key: str, metadata: ObjectMetadata) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, metadata)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoMetadataCache(BaseMetadataCache):
+    """
+    Cache stored in one of the CACHES aliases, shared between worker processes
+    when that alias is (Memcached, Redis, database...). Eviction is left to
+    the cache backend. Keys carry a generation stored in the same alias, so
+    clear() drops every entry of this cache without touching the others.
+    """
+
+    def __init__(self, timeout: float = 300, alias: str = "default", key_prefix: str = "storage-meta", **options: Any) -> None:
+        super().__init__(timeout=timeout)
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation(self) -> str:
+        key = f"{self.key_prefix}:generation"
+        generation = self.cache.get(key)
+        if generation is None:
+            # add(): workers that start at the same time agree on one generation
+            self.cache.add(key, uuid.uuid4().hex, timeout=None)
+            generation = self.cache.get(key)
+        return generation
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}:{self._generation()}:{key}"
+
+    def get(self, key: str) -> ObjectMetadata | None:
+        data = self.cache.get(self._key(key))
+        return ObjectMetadata(**data) if data else None
+
+    def set(self, key: str, metadata: ObjectMetadata) -> None:
+        self.cache.set(self._key(key), asdict(metadata), self.timeout)
+
+    def delete(self, key: str) -> None:
+        self.cache.delete(self._key(key))
+
+    def clear(self) -> None:
+        # Entries of the old generation are never read again and expire with their timeout
+        self.cache.set(f"{self.key_prefix}:generation", uuid.uuid4().hex, timeout=None)
+
+
+DEFAULT_METADATA_CACHE = {
+    "BACKEND": "justificaciones.storage_cache.LocMemMetadataCache",
+    "OPTIONS": {"timeout": 300, "max_entries": 10000},
+}
+
+_lock = threading.Lock()
+_cache: BaseMetadataCache | None = None
+
+
+def get_metadata_cache() -> BaseMetadataCache:
+    """Return the process-wide cache configured in SUPABASE_STORAGE_METADATA_CACHE."""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                config = getattr(settings, "SUPABASE_STORAGE_METADATA_CACHE", DEFAULT_METADATA_CACHE)
+                _cache = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return _cache
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting: str, **kwargs) -> None:
+    global _cache
+    if setting == "SUPABASE_STORAGE_METADATA_CACHE":
+        _cache = None
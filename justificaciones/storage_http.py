@@ -0,0 +1,287 @@
+"""
+Shared HTTP transport for the Supabase Storage backends.
+Keeps a single pooled, keep-alive requests.Session per worker process so
+consecutive storage calls reuse the same TCP+TLS connection, and provides the
+streaming helpers used to upload and download documents without buffering.
+"""
+from __future__ import annotations
+import base64
+import io
+import os
+import threading
+from typing import Callable, Iterator
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.files.base import File
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+# (connect, read) timeouts in seconds for each kind of storage operation
+DEFAULT_TIMEOUTS = {
+    "upload": (5, 60),
+    "download": (5, 60),
+    "metadata": (5, 10),
+    "delete": (5, 10),
+}
+
+# Supabase's resumable endpoint only accepts 6 MB chunks (except the last one)
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+TUS_VERSION = "1.0.0"
+
+# Supabase answers 429 when rate limiting and 5xx on transient gateway errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Only idempotent requests are retried once they reached the server. Connect
+# errors are retried for every method, rewinding the upload body first.
+RETRY_METHODS = frozenset({"GET", "HEAD", "DELETE"})
+
+_lock = threading.Lock()
+_session: requests.Session | None = None
+_session_pid: int | None = None
+
+
+def build_session() -> requests.Session:
+    """Create a session with a bounded connection pool and retry policy."""
+    retry = Retry(
+        total=getattr(settings, "SUPABASE_STORAGE_RETRIES", 3),
+        backoff_factor=getattr(settings, "SUPABASE_STORAGE_BACKOFF", 0.3),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, "SUPABASE_STORAGE_POOL_CONNECTIONS", 4),
+        pool_maxsize=getattr(settings, "SUPABASE_STORAGE_POOL_MAXSIZE", 10),
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the session for the current process.
+    A forked worker (gunicorn --preload) must not share sockets with its
+    parent, so the session is rebuilt whenever the PID changes.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = build_session()
+                _session_pid = pid
+    return _session
+
+
+def reset_session() -> None:
+    """Close the pooled session; the next call to get_session() rebuilds it."""
+    global _session, _session_pid
+    with _lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def get_timeout(operation: str) -> tuple[float, float]:
+    """Get the (connect, read) timeout configured for an operation."""
+    timeouts = {**DEFAULT_TIMEOUTS, **getattr(settings, "SUPABASE_STORAGE_TIMEOUTS", {})}
+    return timeouts[operation]
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting: str, **kwargs) -> None:
+    if setting.startswith("SUPABASE_STORAGE_"):
+        reset_session()
+
+
+class ChunkedReader(io.RawIOBase):
+    """
+    Read-only stream over a Django File's chunks().
+    Lets requests/httpx send an upload with a known Content-Length while only
+    one chunk is held in memory at a time. It can only seek back to the start,
+    which is what urllib3 does to replay the body on a connect-level retry.
+    """
+
+    def __init__(self, content: File) -> None:
+        super().__init__()
+        self._content = content
+        self._size = content.size
+        self._chunks = content.chunks()
+        self._buffer = b""
+        self._position = 0
+
+    def __len__(self) -> int:
+        return self._size - self._position
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        position = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}[whence] + offset
+        if position == self._position:
+            return position
+        if position != 0:
+            raise io.UnsupportedOperation("ChunkedReader can only seek to the start")
+        try:
+            self._content.seek(0)
+        except (AttributeError, OSError) as exc:
+            raise io.UnsupportedOperation(f"content cannot be rewound: {exc}")
+        # chunks() restarts from the beginning of a seekable file
+        self._chunks = self._content.chunks()
+        self._buffer = b""
+        self._position = 0
+        return 0
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        self._position += n
+        return n
+
+
+class RemoteFile(File):
+    """
+    File backed by a streamed HTTP response.
+    The body is only read from the socket as the caller consumes it, so opening
+    a large document does not load it into memory.
+    """
+
+    def __init__(self, response: requests.Response, name: str, reopen: Callable[[], requests.Response]) -> None:
+        response.raw.decode_content = True
+        super().__init__(response.raw, name=name)
+        self.response = response
+        self._reopen = reopen
+        length = response.headers.get("Content-Length")
+        if length is not None:
+            self.size = int(length)
+
+    def chunks(self, chunk_size: int | None = None) -> Iterator[bytes]:
+        yield from self.response.iter_content(chunk_size or self.DEFAULT_CHUNK_SIZE)
+
+    def open(self, mode: str | None = None) -> "RemoteFile":
+        # The response cannot be rewound; request the object again instead
+        self.close()
+        self.response = self._reopen()
+        self.response.raw.decode_content = True
+        self.file = self.response.raw
+        return self
+
+    def close(self) -> None:
+        self.response.close()
+
+
+def iter_fixed_chunks(content: File, chunk_size: int) -> Iterator[bytes]:
+    """Re-slice content.chunks() into blocks of exactly chunk_size bytes."""
+    buffer = bytearray()
+    for chunk in content.chunks():
+        buffer += chunk
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def tus_upload(
+    session: requests.Session,
+    endpoint: str,
+    headers: dict,
+    bucket: str,
+    name: str,
+    content: File,
+    content_type: str,
+    chunk_size: int = TUS_CHUNK_SIZE,
+    max_attempts: int = 3,
+) -> None:
+    """
+    Upload content with Supabase's resumable (TUS 1.0) protocol.
+    Each chunk is PATCHed separately; if a PATCH fails the server's offset
+    is read back with HEAD and the upload resumes from there, seeking content
+    when that offset is not the start of a chunk so every PATCH but the last
+    is chunk_size long. max_attempts bounds the consecutive failed PATCHes.
+    """
+    def encode(value: str) -> str:
+        return base64.b64encode(value.encode()).decode()
+
+    tus_headers = {**headers, "Tus-Resumable": TUS_VERSION}
+    tus_headers.pop("Content-Type", None)
+    metadata = ",".join(
+        f"{key} {encode(value)}"
+        for key, value in (("bucketName", bucket), ("objectName", name), ("contentType", content_type))
+    )
+    response = session.post(
+        endpoint,
+        headers={**tus_headers, "Upload-Length": str(content.size), "Upload-Metadata": metadata},
+        timeout=get_timeout("upload"),
+    )
+    if response.status_code != 201:
+        raise Exception(f"Failed to create resumable upload: {response.text}")
+    location = urljoin(endpoint, response.headers["Location"])
+
+    def read_from(start: int) -> Iterator[bytes]:
+        # chunks() rewinds to the start, so resuming elsewhere reads after a seek
+        try:
+            content.seek(start)
+        except (AttributeError, OSError) as exc:
+            raise Exception(f"Failed to upload file: cannot resume at byte {start}: {exc}")
+        while chunk := content.read(chunk_size):
+            yield chunk
+
+    offset = chunk_start = attempts = 0
+    chunks = iter_fixed_chunks(content, chunk_size)
+    chunk = next(chunks, b"")
+    while offset != content.size:
+        if offset != chunk_start:
+            if offset != chunk_start + len(chunk):
+                # The server kept part of the chunk, or lost some: Supabase rejects
+                # short non-final chunks, so a full one is re-read from its offset
+                chunks = read_from(offset)
+            chunk_start, chunk = offset, next(chunks, b"")
+        if not chunk:
+            raise Exception(f"Failed to upload file: no content at byte {offset} of {content.size}")
+        attempts += 1
+        try:
+            response = session.patch(
+                location,
+                data=chunk,
+                headers={
+                    **tus_headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                },
+                timeout=get_timeout("upload"),
+            )
+            if response.status_code == 204 and int(response.headers["Upload-Offset"]) > offset:
+                offset = int(response.headers["Upload-Offset"])
+                attempts = 0
+                continue
+            error = response.text or f"HTTP {response.status_code}"
+        except requests.RequestException as exc:
+            error = str(exc)
+        if attempts >= max_attempts:
+            raise Exception(f"Failed to upload file: {error}")
+        head = session.head(location, headers=tus_headers, timeout=get_timeout("metadata"))
+        if head.status_code == 200:
+            offset = int(head.headers["Upload-Offset"])
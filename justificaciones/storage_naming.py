@@ -0,0 +1,73 @@
+"""
+Object naming strategies for the Supabase storage backends.
+Selected with the SUPABASE_STORAGE_NAMING setting:
+
+    "uuid"    documentos/3f/a2/3fa2...c9-certificado.pdf (default). Unique
+              without asking the server, sharded by the first UUID bytes.
+    "legacy"  previous behaviour: HEAD the name and append a timestamp if
+              it is taken. Costs a round trip and can collide.
+"""
+from __future__ import annotations
+import os
+import posixpath
+import re
+import time
+import uuid
+from typing import Callable
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+
+UUID_NAME_RE = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32}(-[^/]*)?\.[^/.]+$")
+
+
+def is_uuid_name(name: str) -> bool:
+    """True when the name was already produced by the "uuid" strategy."""
+    return bool(UUID_NAME_RE.search(name))
+
+
+def uuid_name(storage: Storage, name: str, max_length: int | None = None) -> str:
+    if is_uuid_name(name):
+        # Already unique (e.g. chosen by renombrar_documentos); keep it as is
+        return name
+    folder, filename = posixpath.split(name.replace("\\", "/"))
+    base, ext = os.path.splitext(filename)
+    key = uuid.uuid4().hex
+    prefix = posixpath.join(folder, key[:2], key[2:4], key)
+    ext = ext.lower()
+    slug = slugify(base)
+    if max_length:
+        # Keep the unique part intact and shorten only the readable suffix
+        slug = slug[: max(0, max_length - len(prefix) - len(ext) - 1)]
+    return f"{prefix}-{slug}{ext}" if slug else f"{prefix}{ext}"
+
+
+def legacy_name(storage: Storage, name: str, max_length: int | None = None) -> str:
+    if storage.exists(name):
+        base, ext = os.path.splitext(name)
+        name = f"{base}_{int(time.time())}{ext}"
+
+    if max_length and len(name) > max_length:
+        name = name[:max_length]
+
+    return name
+
+
+NAMING_STRATEGIES: dict[str, Callable[[Storage, str, int | None], str]] = {
+    "uuid": uuid_name,
+    "legacy": legacy_name,
+}
+
+
+def get_naming_strategy() -> Callable[[Storage, str, int | None], str]:
+    """Return the configured strategy; a dotted path to a callable is also accepted."""
+    strategy = getattr(settings, "SUPABASE_STORAGE_NAMING", "uuid")
+    if strategy in NAMING_STRATEGIES:
+        return NAMING_STRATEGIES[strategy]
+    return import_string(strategy)
+
+
+def available_name(storage: Storage, name: str, max_length: int | None = None) -> str:
+    return get_naming_strategy()(storage, name, max_length)
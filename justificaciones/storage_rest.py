@@ -3,13 +3,15 @@ Custom Django Storage Backend for Supabase Storage using REST API
 This version uses direct HTTP requests instead of the supabase-py client
 """
 from __future__ import annotations
-import os
 import requests
-from io import BytesIO
-from typing import Any
+from typing import Any, AsyncIterator
 from django.core.files.base import File
 from django.core.files.storage import Storage
 from django.conf import settings
+from asgiref.sync import sync_to_async
+from . import storage_async, storage_naming
+from .storage_cache import ObjectMetadata, get_metadata_cache
+from .storage_http import ChunkedReader, RemoteFile, TUS_CHUNK_SIZE, get_session, get_timeout, tus_upload
 
 
 class SupabaseStorageREST(Storage):
@@ -24,6 +26,24 @@ class SupabaseStorageREST(Storage):
         self.supabase_key = getattr(settings, "SUPABASE_KEY")
         self.bucket_name = getattr(settings, "SUPABASE_BUCKET", "Documentos")
         self.storage_url = f"{self.supabase_url}/storage/v1"
+        # Uploads larger than this use the resumable (TUS) endpoint
+        self.resumable_threshold = getattr(settings, "SUPABASE_STORAGE_RESUMABLE_THRESHOLD", TUS_CHUNK_SIZE)
+        self.resumable_chunk_size = getattr(settings, "SUPABASE_STORAGE_RESUMABLE_CHUNK_SIZE", TUS_CHUNK_SIZE)
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled keep-alive session shared by every instance in this process."""
+        return get_session()
+
+    @property
+    def metadata_cache(self):
+        return get_metadata_cache()
+
+    def _object_url(self, name: str) -> str:
+        return f"{self.storage_url}/object/{self.bucket_name}/{name}"
+
+    def _cache_key(self, name: str) -> str:
+        return f"{self.bucket_name}/{name}"
 
     def _get_headers(self, content_type: str = "application/octet-stream") -> dict:
         """Get headers for Supabase Storage API requests."""
@@ -36,53 +56,127 @@ class SupabaseStorageREST(Storage):
     def _save(self, name: str, content: File) -> str:
         """
         Save file to Supabase Storage bucket using REST API.
+        The body is streamed from content.chunks(), never read whole.
         """
         # Normalize path to use forward slashes (Supabase requirement)
         name = name.replace('\\', '/')
         
-        content.seek(0)
-        file_data = content.read()
-        
-        content_type = getattr(content, 'content_type', 'application/octet-stream')
+        content_type = getattr(content, 'content_type', None) or 'application/octet-stream'
         
-        url = f"{self.storage_url}/object/{self.bucket_name}/{name}"
-        headers = {
-            "Authorization": f"Bearer {self.supabase_key}",
-            "apikey": self.supabase_key,
-        }
+        if content.size > self.resumable_threshold:
+            tus_upload(
+                self.session,
+                f"{self.storage_url}/upload/resumable",
+                self._get_headers(),
+                self.bucket_name,
+                name,
+                content,
+                content_type,
+                chunk_size=self.resumable_chunk_size,
+            )
+            self.metadata_cache.set(self._cache_key(name), ObjectMetadata.from_upload(content.size, content_type))
+            return name
         
-        response = requests.post(
-            url,
-            data=file_data,
-            headers=headers
+        response = self.session.post(
+            self._object_url(name),
+            data=ChunkedReader(content),
+            headers=self._get_headers(content_type),
+            timeout=get_timeout("upload"),
         )
         
         if response.status_code not in [200, 201]:
             raise Exception(f"Failed to upload file: {response.text}")
         
+        self.metadata_cache.set(self._cache_key(name), ObjectMetadata.from_upload(content.size, content_type))
         return name
 
     def _open(self, name: str, mode: str = "rb") -> File:
         """
         Retrieve a file from Supabase Storage using REST API.
+        The returned file reads lazily from the streamed response.
         """
         # Normalize path to use forward slashes
         name = name.replace('\\', '/')
+        return RemoteFile(self._download(name), name=name, reopen=lambda: self._download(name))
+
+    def _download(self, name: str, byte_range: tuple[int, int] | None = None) -> requests.Response:
+        response = self.session.get(
+            self._object_url(name),
+            headers=self._range_headers(byte_range),
+            timeout=get_timeout("download"),
+            stream=True,
+        )
         
-        url = f"{self.storage_url}/object/{self.bucket_name}/{name}"
-        headers = {
-            "Authorization": f"Bearer {self.supabase_key}",
-            "apikey": self.supabase_key,
-        }
-        
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
+        if response.status_code != (206 if byte_range else 200):
+            response.close()
             raise FileNotFoundError(f"File not found: {name}")
-        
-        file_obj = BytesIO(response.content)
-        file_obj.name = name
-        return File(file_obj, name=name)
+        return response
+
+    def _range_headers(self, byte_range: tuple[int, int] | None) -> dict:
+        headers = self._get_headers()
+        if byte_range:
+            headers["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        return headers
+
+    def open_range(self, name: str, byte_range: tuple[int, int] | None = None) -> File:
+        """
+        Open a file, or only the inclusive (start, end) byte range of it,
+        reading lazily from the streamed response.
+        """
+        name = name.replace('\\', '/')
+        return RemoteFile(
+            self._download(name, byte_range), name=name, reopen=lambda: self._download(name, byte_range)
+        )
+
+    async def asave(self, name: str, content: File, max_length: int | None = None) -> str:
+        """
+        Async counterpart of save() used by the async views.
+        The body is streamed through the shared httpx client; uploads above
+        the resumable threshold still go through the sync TUS client, in a
+        thread, since each of their chunks is a separate round trip anyway.
+        """
+        name = (name or content.name).replace('\\', '/')
+        naming = storage_naming.get_naming_strategy()
+        if naming is storage_naming.uuid_name:
+            name = naming(self, name, max_length)  # no round trip needed
+        else:
+            name = await sync_to_async(naming, thread_sensitive=False)(self, name, max_length)
+
+        content_type = getattr(content, 'content_type', None) or 'application/octet-stream'
+        if content.size > self.resumable_threshold:
+            return await sync_to_async(self._save, thread_sensitive=False)(name, content)
+
+        response = await storage_async.request(
+            "POST",
+            self._object_url(name),
+            "upload",
+            content=storage_async.aiter_file(content),
+            headers={**self._get_headers(content_type), "Content-Length": str(content.size)},
+        )
+        if response.status_code not in [200, 201]:
+            raise Exception(f"Failed to upload file: {response.text}")
+
+        self.metadata_cache.set(self._cache_key(name), ObjectMetadata.from_upload(content.size, content_type))
+        return name
+
+    async def astream(
+        self, name: str, byte_range: tuple[int, int] | None = None
+    ) -> tuple[ObjectMetadata, AsyncIterator[bytes]]:
+        """
+        Start an async download of the whole object or of an inclusive
+        (start, end) byte range: returns the object's metadata (from the
+        response headers) and an iterator over the body, read as consumed.
+        """
+        name = name.replace('\\', '/')
+        response = await storage_async.request(
+            "GET", self._object_url(name), "download", headers=self._range_headers(byte_range), stream=True
+        )
+        if response.status_code != (206 if byte_range else 200):
+            await response.aclose()
+            raise FileNotFoundError(f"File not found: {name}")
+        metadata = ObjectMetadata.from_headers(response.headers)
+        self.metadata_cache.set(self._cache_key(name), metadata)
+        return metadata, storage_async.aiter_response(response)
 
     def delete(self, name: str) -> None:
         """
@@ -90,34 +184,119 @@ class SupabaseStorageREST(Storage):
         """
         # Normalize path to use forward slashes
         name = name.replace('\\', '/')
+        self.metadata_cache.delete(self._cache_key(name))
         
-        url = f"{self.storage_url}/object/{self.bucket_name}/{name}"
-        headers = {
-            "Authorization": f"Bearer {self.supabase_key}",
-            "apikey": self.supabase_key,
-        }
-        
-        response = requests.delete(url, headers=headers)
+        response = self.session.delete(
+            self._object_url(name),
+            headers=self._get_headers(),
+            timeout=get_timeout("delete"),
+        )
         
         if response.status_code not in [200, 204]:
             raise Exception(f"Failed to delete file: {response.text}")
 
+    def metadata(self, name: str) -> ObjectMetadata | None:
+        """
+        Get the cached metadata of a file, issuing a HEAD only on a cache miss.
+        Returns None when the file does not exist.
+        """
+        # Normalize path to use forward slashes
+        name = name.replace('\\', '/')
+        key = self._cache_key(name)
+        
+        metadata = self.metadata_cache.get(key)
+        if metadata is None:
+            response = self.session.head(
+                self._object_url(name),
+                headers=self._get_headers(),
+                timeout=get_timeout("metadata"),
+            )
+            if response.status_code != 200:
+                return None
+            metadata = ObjectMetadata.from_headers(response.headers)
+            self.metadata_cache.set(key, metadata)
+        return metadata
+
+    async def ametadata(self, name: str) -> ObjectMetadata | None:
+        """Async counterpart of metadata(); the HEAD on a cache miss goes through the httpx client."""
+        name = name.replace('\\', '/')
+        key = self._cache_key(name)
+        metadata = self.metadata_cache.get(key)
+        if metadata is None:
+            response = await storage_async.request("HEAD", self._object_url(name), "metadata", headers=self._get_headers())
+            if response.status_code != 200:
+                return None
+            metadata = ObjectMetadata.from_headers(response.headers)
+            self.metadata_cache.set(key, metadata)
+        return metadata
+
+    def signed_url(self, name: str, expires_in: int) -> str:
+        """
+        Get a short-lived URL that serves the object straight from Supabase,
+        for private buckets.
+        """
+        name = name.replace('\\', '/')
+        response = self.session.post(
+            f"{self.storage_url}/object/sign/{self.bucket_name}/{name}",
+            json={"expiresIn": expires_in},
+            headers=self._get_headers("application/json"),
+            timeout=get_timeout("metadata"),
+        )
+        return self._signed_url_from(response, name)
+
+    async def asigned_url(self, name: str, expires_in: int) -> str:
+        """Async counterpart of signed_url()."""
+        name = name.replace('\\', '/')
+        response = await storage_async.request(
+            "POST",
+            f"{self.storage_url}/object/sign/{self.bucket_name}/{name}",
+            "metadata",
+            json={"expiresIn": expires_in},
+            headers=self._get_headers("application/json"),
+        )
+        return self._signed_url_from(response, name)
+
+    def _signed_url_from(self, response, name: str) -> str:
+        if response.status_code != 200:
+            raise FileNotFoundError(f"File not found: {name}")
+        return f"{self.storage_url}{response.json()['signedURL']}"
+
+    def signed_upload_url(self, name: str) -> str:
+        """
+        Get a URL the browser can PUT the object to, so the upload does not
+        go through Django. Supabase keeps it valid for two hours and rejects
+        the PUT if the name is already taken.
+        """
+        name = name.replace('\\', '/')
+        response = self.session.post(
+            f"{self.storage_url}/object/upload/sign/{self.bucket_name}/{name}",
+            headers=self._get_headers("application/json"),
+            timeout=get_timeout("metadata"),
+        )
+        return self._signed_upload_url_from(response)
+
+    async def asigned_upload_url(self, name: str) -> str:
+        """Async counterpart of signed_upload_url()."""
+        name = name.replace('\\', '/')
+        response = await storage_async.request(
+            "POST",
+            f"{self.storage_url}/object/upload/sign/{self.bucket_name}/{name}",
+            "metadata",
+            headers=self._get_headers("application/json"),
+        )
+        return self._signed_upload_url_from(response)
+
+    def _signed_upload_url_from(self, response) -> str:
+        if response.status_code != 200:
+            raise Exception(f"Failed to sign upload: {response.text}")
+        return f"{self.storage_url}{response.json()['url']}"
+
     def exists(self, name: str) -> bool:
         """
         Check if a file exists in Supabase Storage using REST API.
         """
         try:
-            # Normalize path to use forward slashes
-            name = name.replace('\\', '/')
-            
-            url = f"{self.storage_url}/object/{self.bucket_name}/{name}"
-            headers = {
-                "Authorization": f"Bearer {self.supabase_key}",
-                "apikey": self.supabase_key,
-            }
-            
-            response = requests.head(url, headers=headers)
-            return response.status_code == 200
+            return self.metadata(name) is not None
         except Exception:
             return False
 
@@ -134,32 +313,14 @@ class SupabaseStorageREST(Storage):
         Get the size of a file in Supabase Storage.
         """
         try:
-            # Normalize path to use forward slashes
-            name = name.replace('\\', '/')
-            
-            url = f"{self.storage_url}/object/{self.bucket_name}/{name}"
-            headers = {
-                "Authorization": f"Bearer {self.supabase_key}",
-                "apikey": self.supabase_key,
-            }
-            
-            response = requests.head(url, headers=headers)
-            if response.status_code == 200:
-                return int(response.headers.get('Content-Length', 0))
-            return 0
+            metadata = self.metadata(name)
+            return metadata.size if metadata else 0
         except Exception:
             return 0
 
     def get_available_name(self, name: str, max_length: int | None = None) -> str:
         """
-        Get an available filename.
+        Get an available filename using the strategy set in
+        SUPABASE_STORAGE_NAMING (see storage_naming.py).
         """
-        if self.exists(name):
-            import time
-            base, ext = os.path.splitext(name)
-            name = f"{base}_{int(time.time())}{ext}"
-        
-        if max_length and len(name) > max_length:
-            name = name[:max_length]
-            
-        return name
+        return storage_naming.available_name(self, name, max_length)
@@ -0,0 +1,437 @@
+"""
+Tiered storage: a bounded local-disk cache in front of the Supabase backend.
+
+Wraps SupabaseStorageREST or SupabaseStorage (SUPABASE_STORAGE_DISK_CACHE_BACKEND).
+Uploads are written through to the remote backend and then to the cache,
+reads are served from the local copy (memory-mapped when possible) and
+fetched from the remote only on a miss, and delete() removes both. Objects
+larger than the cache itself are streamed from the remote and never copied. Object
+names are unique and never rewritten in place, so a cached copy cannot go
+stale; the limits only bound disk usage:
+
+    SUPABASE_STORAGE_DISK_CACHE_MAX_BYTES  least recently used copies are evicted above this size
+    SUPABASE_STORAGE_DISK_CACHE_MAX_AGE    copies not read for this many seconds are evicted
+
+The cache directory (SUPABASE_STORAGE_DISK_CACHE_DIR, by default
+MEDIA_ROOT/storage_cache) can be shared by every worker process on the host:
+copies appear with an atomic rename, concurrent misses on the same object
+are serialized with a per-object flock() so only one process downloads it,
+and only one process sweeps at a time.
+"""
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Iterator
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.utils.module_loading import import_string
+
+from . import storage_async
+from .storage_cache import ObjectMetadata
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, enough for a single development server
+    fcntl = None
+
+DEFAULT_BACKEND = "justificaciones.storage_rest.SupabaseStorageREST"
+# Seconds between sweeps, and between LRU timestamp updates of the same copy
+SWEEP_INTERVAL = 60
+TOUCH_INTERVAL = 60
+# Temp files older than this were left by a crashed process
+STALE_TMP_SECONDS = 3600
+
+
+class CacheStats:
+    """Hit/miss counters of this process (each worker process counts its own)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.disk_bytes = self.disk_files = 0  # as of the last sweep, across all processes
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4),
+            "evictions": self.evictions,
+            "disk_bytes": self.disk_bytes,
+            "disk_files": self.disk_files,
+        }
+
+
+class TieredStorage(Storage):
+    """
+    Local-disk LRU cache tier over a remote storage backend.
+    """
+
+    def __init__(
+        self,
+        backend: Storage | None = None,
+        location: str | os.PathLike | None = None,
+        max_bytes: int | None = None,
+        max_age: float | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.backend = backend or import_string(getattr(settings, "SUPABASE_STORAGE_DISK_CACHE_BACKEND", DEFAULT_BACKEND))()
+        self.location = Path(
+            location
+            or getattr(settings, "SUPABASE_STORAGE_DISK_CACHE_DIR", None)
+            or Path(settings.MEDIA_ROOT) / "storage_cache"
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else getattr(
+            settings, "SUPABASE_STORAGE_DISK_CACHE_MAX_BYTES", 1024 ** 3
+        )
+        self.max_age = max_age if max_age is not None else getattr(
+            settings, "SUPABASE_STORAGE_DISK_CACHE_MAX_AGE", 7 * 24 * 3600
+        )
+        self.stats = CacheStats()
+        self._sweep_lock = threading.Lock()
+        self._written_since_sweep = 0
+        self._last_sweep = 0.0
+
+    def _path(self, name: str) -> Path:
+        key = hashlib.sha256(name.replace('\\', '/').encode()).hexdigest()
+        return self.location / "objects" / key[:2] / key
+
+    @contextmanager
+    def _flock(self, lock_name: str, blocking: bool = True) -> Iterator[bool]:
+        """Hold an exclusive cross-process lock; yields False if non-blocking and already held."""
+        if fcntl is None:
+            yield True
+            return
+        path = self.location / "locks" / f"{lock_name}.lock"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                os.utime(f.fileno())  # sweep() removes lock files nobody took for a while
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _fill_lock(self, name: str) -> str:
+        # One lock file per object: misses on different objects never wait for each other
+        key = self._path(name).name
+        return f"fill/{key[:2]}/{key}"
+
+    # -- Local copies ------------------------------------------------------------
+
+    def _open_local(self, name: str) -> File | None:
+        path = self._path(name)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        st = os.fstat(f.fileno())
+        if time.time() - st.st_mtime > TOUCH_INTERVAL:
+            # The mtime is the LRU timestamp (atime is often disabled)
+            with suppress(OSError):
+                os.utime(path)
+        if st.st_size:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                mapped = None
+            if mapped is not None:
+                f.close()  # the mapping keeps its own reference to the file
+                file = File(mapped, name=name)
+                file.size = st.st_size
+                return file
+        return File(f, name=name)
+
+    def _store(self, name: str, chunks: Iterable[bytes], expected_size: int | None = None) -> bool:
+        """Write a local copy through a temp file and an atomic rename. Returns whether it was kept."""
+        fill = _Fill(self, name)
+        try:
+            for chunk in chunks:
+                fill.write(chunk)
+        except BaseException:
+            fill.discard()
+            raise
+        return fill.publish(expected_size)
+
+    def _store_upload(self, name: str, content: File) -> None:
+        if content.size is None or content.size > self.max_bytes or not content.seekable():
+            return
+        self._store(name, content.chunks(), expected_size=content.size)
+
+    def _written(self, size: int) -> None:
+        with self._sweep_lock:
+            self._written_since_sweep += size
+            due = (
+                self._written_since_sweep > self.max_bytes // 10
+                or time.monotonic() - self._last_sweep > SWEEP_INTERVAL
+            )
+        if due:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """
+        Evict copies not read within max_age, then the least recently used
+        ones until the cache fits in max_bytes. Returns how many were evicted;
+        0 without waiting if another process is already sweeping.
+        """
+        with self._sweep_lock:
+            self._written_since_sweep = 0
+            self._last_sweep = time.monotonic()
+        with self._flock("sweep", blocking=False) as acquired:
+            if not acquired:
+                return 0
+            now = time.time()
+            entries = []
+            for shard in _scandir(self.location / "objects"):
+                for entry in _scandir(shard.path):
+                    with suppress(FileNotFoundError):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+            for entry in _scandir(self.location / "tmp"):
+                with suppress(FileNotFoundError):
+                    if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                        os.unlink(entry.path)
+            # At worst a download still holding an old lock runs twice; the copy is replaced atomically
+            for shard in _scandir(self.location / "locks" / "fill"):
+                for entry in _scandir(shard.path):
+                    with suppress(FileNotFoundError):
+                        if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                            os.unlink(entry.path)
+
+            entries.sort()  # least recently used first
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for mtime, size, path in entries:
+                if total <= self.max_bytes and now - mtime <= self.max_age:
+                    break
+                # A reader that already opened the copy keeps reading it after the unlink
+                with suppress(FileNotFoundError):
+                    os.unlink(path)
+                total -= size
+                evicted += 1
+        self.stats.evictions += evicted
+        self.stats.disk_bytes = total
+        self.stats.disk_files = len(entries) - evicted
+        return evicted
+
+    def clear_cache(self) -> None:
+        """Drop every local copy; the remote objects are untouched."""
+        for shard in _scandir(self.location / "objects"):
+            for entry in _scandir(shard.path):
+                with suppress(FileNotFoundError):
+                    os.unlink(entry.path)
+
+    def cache_stats(self) -> dict[str, float]:
+        return self.stats.as_dict()
+
+    # -- Storage API -------------------------------------------------------------
+
+    def _open(self, name: str, mode: str = "rb") -> File:
+        file = self._open_local(name)
+        self.stats.record(hit=file is not None)
+        if file is not None:
+            return file
+        if self._uncacheable(name):
+            # A copy larger than the whole cache would only evict everything else
+            return self.backend.open(name, "rb")
+        # One download per object even when several processes miss it at once
+        with self._flock(self._fill_lock(name)):
+            file = self._open_local(name)
+            if file is None:
+                with self.backend.open(name, "rb") as remote:
+                    self._store(name, remote.chunks())
+                file = self._open_local(name)
+        return file
+
+    def _uncacheable(self, name: str) -> bool:
+        metadata = self.backend.metadata(name) if hasattr(self.backend, "metadata") else None
+        return metadata is not None and metadata.size > self.max_bytes
+
+    def _save(self, name: str, content: File) -> str:
+        name = self.backend._save(name, content)
+        self._store_upload(name, content)
+        return name
+
+    async def asave(self, name: str, content: File, max_length: int | None = None) -> str:
+        """Async upload through the backend's client, then the local copy in a thread."""
+        name = await storage_async.asave(self.backend, name, content, max_length=max_length)
+        await sync_to_async(self._store_upload, thread_sensitive=False)(name, content)
+        return name
+
+    def delete(self, name: str) -> None:
+        self.backend.delete(name)
+        with suppress(FileNotFoundError):
+            os.unlink(self._path(name))
+
+    def exists(self, name: str) -> bool:
+        return self._path(name).exists() or self.backend.exists(name)
+
+    def size(self, name: str) -> int:
+        try:
+            return os.path.getsize(self._path(name))
+        except FileNotFoundError:
+            return self.backend.size(name)
+
+    def url(self, name: str) -> str:
+        return self.backend.url(name)
+
+    def open_range(self, name: str, byte_range: tuple[int, int] | None = None) -> File:
+        """
+        Open a file, or only the inclusive (start, end) byte range of it:
+        from the local copy if there is one, otherwise straight from the
+        backend without downloading the whole object first.
+        """
+        file = self._open_local(name)
+        self.stats.record(hit=file is not None)
+        if file is None:
+            if hasattr(self.backend, "open_range"):
+                return self.backend.open_range(name, byte_range)
+            file = self.backend.open(name, "rb")
+        if byte_range is None:
+            return file
+        return File(_RangeReader(file, *byte_range), name=name)
+
+    def signed_url(self, name: str, expires_in: int) -> str:
+        return self.backend.signed_url(name, expires_in)
+
+    async def asigned_url(self, name: str, expires_in: int) -> str | None:
+        return await storage_async.asigned_url(self.backend, name, expires_in)
+
+    async def asigned_upload_url(self, name: str) -> str | None:
+        # Direct uploads skip the cache; the first read fills it
+        return await storage_async.asigned_upload_url(self.backend, name)
+
+    async def astream(
+        self, name: str, byte_range: tuple[int, int] | None = None
+    ) -> tuple[ObjectMetadata, AsyncIterator[bytes]]:
+        """
+        Stream a file. An object that is not cached locally is read straight
+        from the backend, so the first bytes go out without waiting for the
+        whole download; a full read of an object that fits in the cache is
+        written to disk as it streams and becomes the local copy once
+        complete. A range is not cached (checking the first bytes of a new
+        upload does not download all of it).
+        """
+        if hasattr(self.backend, "astream") and not self._path(name).exists():
+            self.stats.record(hit=False)
+            metadata, body = await self.backend.astream(name, byte_range)
+            if byte_range or metadata.size > self.max_bytes:
+                return metadata, body
+            return metadata, self._afill(name, body, metadata.size)
+        metadata = await storage_async.ametadata(self, name)
+        if metadata is None:
+            raise FileNotFoundError(f"File not found: {name}")
+        return metadata, storage_async.aiter_storage_file(self, name, byte_range)
+
+    async def _afill(self, name: str, body: AsyncIterator[bytes], size: int) -> AsyncIterator[bytes]:
+        """Pass the backend's body through while writing it to disk in a thread."""
+        in_thread = partial(sync_to_async, thread_sensitive=False)
+        fill = await in_thread(_Fill)(self, name)
+        complete = False
+        try:
+            async for chunk in body:
+                yield chunk
+                await in_thread(fill.write)(chunk)
+            complete = True
+        finally:
+            # A client that disconnects halfway leaves an incomplete copy: it is dropped
+            if complete:
+                await in_thread(fill.publish)(size)
+            else:
+                await in_thread(fill.discard)()
+                await body.aclose()
+
+    def get_available_name(self, name: str, max_length: int | None = None) -> str:
+        return self.backend.get_available_name(name, max_length)
+
+
+class _Fill:
+    """A local copy being written to a temp file, published with an atomic rename."""
+
+    def __init__(self, storage: TieredStorage, name: str) -> None:
+        self.storage = storage
+        self.path = storage._path(name)
+        tmp_dir = storage.location / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=tmp_dir)
+        self.file = os.fdopen(fd, "wb")
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def publish(self, expected_size: int | None = None) -> bool:
+        self.file.close()
+        if expected_size is not None and self.size != expected_size:
+            self.discard()  # the content could not be re-read from the start
+            return False
+        try:
+            os.replace(self.tmp, self.path)
+        except BaseException:
+            self.discard()
+            raise
+        self.storage._written(self.size)
+        return True
+
+    def discard(self) -> None:
+        self.file.close()
+        with suppress(FileNotFoundError):
+            os.unlink(self.tmp)
+
+
+class _RangeReader:
+    """Read-only view of the inclusive (start, end) range of an open file."""
+
+    def __init__(self, file: File, start: int, end: int) -> None:
+        file.seek(start)
+        self.file = file
+        self.remaining = end - start + 1
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def read(self, size: int | None = -1) -> bytes:
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _scandir(path: str | os.PathLike) -> list[os.DirEntry]:
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except FileNotFoundError:
+        return []
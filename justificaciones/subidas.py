@@ -0,0 +1,177 @@
+"""
+Subida directa de documentos, del navegador al storage sin pasar por Django.
+
+1. El formulario pide una URL de subida firmada (``afirmar``). La clave del
+   objeto la elige el servidor con la misma estrategia de nombres que una
+   subida normal, y el token que acompaña la URL firma clave, estudiante,
+   tamaño, tipo y SHA-256 declarados.
+2. El navegador hace PUT del archivo a esa URL.
+3. El formulario se envía con el token en lugar del archivo. ``aconfirmar``
+   comprueba el objeto con una sola lectura de sus primeros bytes (tamaño,
+   tipo y firma del formato) antes de adjuntarlo como Documento.
+
+El SHA-256 declarado se comprueba en segundo plano (tarea "verificar_subida",
+``verificar``), que sí lee el objeto completo; recién entonces el documento se
+deduplica y se valida su legibilidad. Así el tiempo de Django por subida son
+dos peticiones cortas al storage, sin importar el tamaño del archivo.
+
+Cada firma encola además una tarea "limpiar_subida" (``limpiar``) para cuando
+la URL ya no sirve: si el formulario nunca se envió, el objeto que el
+navegador haya subido a esa clave se borra en vez de quedar huérfano. Con un
+storage que no firma subidas (FileSystemStorage en desarrollo) ``afirmar``
+devuelve None y el formulario sube el archivo como siempre.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import re
+from contextlib import suppress
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from . import storage_async, tareas
+from .models import Documento, bloquear_contenido
+
+SAL = "justificaciones.subidas"
+# Las extensiones que admite Documento.archivo, con su tipo y los bytes con que empieza el archivo
+TIPOS = {".pdf": "application/pdf", ".png": "image/png"}
+FIRMAS = {".pdf": b"%PDF-", ".png": b"\x89PNG\r\n\x1a\n"}
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class SubidaInvalida(Exception):
+    """La subida directa no se puede firmar o adjuntar; el mensaje es para el estudiante."""
+
+
+def _campo():
+    return Documento._meta.get_field("archivo")
+
+
+def _max_bytes() -> int:
+    return getattr(settings, "SUBIDA_DIRECTA_MAX_BYTES", 25 * 1024 * 1024)
+
+
+def _espera_limpieza() -> int:
+    # Nunca antes de que venza el token: un formulario aún válido podría adjuntar el objeto
+    return max(getattr(settings, "SUBIDA_DIRECTA_LIMPIEZA_SEGUNDOS", 2 * 3600 + 300),
+               getattr(settings, "SUBIDA_DIRECTA_SEGUNDOS", 900))
+
+
+def _extension(nombre: str) -> str:
+    ext = os.path.splitext(nombre)[1].lower()
+    if ext not in TIPOS:
+        raise SubidaInvalida("Formato no permitido. Solo se aceptan: .pdf, .png")
+    return ext
+
+
+async def afirmar(usuario, nombre: str, tamano: int, tipo: str, sha256: str) -> dict[str, str] | None:
+    """
+    URL de subida firmada y token para confirmarla, o None si el storage no
+    admite subidas directas.
+    """
+    ext = _extension(nombre)
+    if tipo != TIPOS[ext]:
+        raise SubidaInvalida("El archivo debe ser un PDF o una imagen PNG.")
+    if tamano <= 0:
+        raise SubidaInvalida("El archivo está vacío.")
+    if tamano > _max_bytes():
+        raise SubidaInvalida(f"El archivo supera el máximo de {_max_bytes() // (1024 * 1024)} MB.")
+    if not _SHA256_RE.fullmatch(sha256):
+        raise SubidaInvalida("No se pudo calcular el hash del archivo.")
+    if not getattr(settings, "SUBIDA_DIRECTA", True):
+        return None
+    campo = _campo()
+    # La estrategia "legacy" consulta el storage para elegir el nombre: en un hilo
+    clave = await sync_to_async(campo.storage.get_available_name, thread_sensitive=False)(
+        campo.generate_filename(None, nombre), max_length=campo.max_length
+    )
+    url = await storage_async.asigned_upload_url(campo.storage, clave)
+    if url is None:
+        return None
+    await sync_to_async(tareas.encolar_limpieza_subida)(clave, _espera_limpieza())
+    datos = {"clave": clave, "usuario": usuario.pk, "tamano": tamano, "tipo": tipo, "sha256": sha256}
+    return {"url": url, "token": signing.dumps(datos, salt=SAL)}
+
+
+async def aconfirmar(usuario, token: str) -> tuple[Documento, str]:
+    """
+    Comprueba la subida del token y devuelve el Documento sin guardar, con su
+    archivo ya apuntando al objeto, y el SHA-256 declarado para verificar.
+    """
+    try:
+        datos = signing.loads(token, salt=SAL, max_age=getattr(settings, "SUBIDA_DIRECTA_SEGUNDOS", 900))
+    except signing.SignatureExpired:
+        raise SubidaInvalida("La subida del archivo expiró. Vuelve a adjuntarlo.")
+    except signing.BadSignature:
+        datos = None
+    if datos is None or datos["usuario"] != usuario.pk:
+        raise SubidaInvalida("La subida del archivo no es válida. Vuelve a adjuntarlo.")
+    clave = datos["clave"]
+    if await Documento.objects.filter(archivo=clave).aexists():
+        raise SubidaInvalida("Este archivo ya fue adjuntado.")
+
+    storage = _campo().storage
+    firma = FIRMAS[_extension(clave)]
+    try:
+        # Una sola petición: el tamaño total y el tipo llegan en las cabeceras del rango
+        metadata, cuerpo = await storage_async.astream(storage, clave, (0, len(firma) - 1))
+        inicio = b"".join([parte async for parte in cuerpo])
+    except FileNotFoundError:
+        raise SubidaInvalida("El archivo no llegó al storage. Vuelve a adjuntarlo.")
+    tipo = metadata.content_type.split(";")[0].strip()
+    if metadata.size != datos["tamano"] or not inicio.startswith(firma) or tipo not in ("", datos["tipo"]):
+        await sync_to_async(_descartar, thread_sensitive=False)(storage, clave)
+        raise SubidaInvalida("El archivo recibido no coincide con el seleccionado. Vuelve a adjuntarlo.")
+    return Documento(archivo=clave), datos["sha256"]
+
+
+def verificar(documento: Documento, sha256: str) -> bool:
+    """
+    Compara el SHA-256 declarado con el del objeto subido. Si coincide lo
+    guarda en el documento y, si ese contenido ya estaba almacenado, apunta
+    al objeto existente y borra el recién subido, como Documento.save(). Si
+    no coincide el documento queda ilegible. Devuelve si coincidió.
+    """
+    subido = documento.archivo.name
+    hasher = hashlib.sha256()
+    with documento.archivo.open("rb") as contenido:
+        for bloque in contenido.chunks():
+            hasher.update(bloque)
+    if hasher.hexdigest() != sha256:
+        documento.legible = False
+        documento.validado_en = timezone.now()
+        documento.observaciones_legibilidad = "el archivo recibido no coincide con el enviado"
+        documento.save(update_fields=["legible", "validado_en", "observaciones_legibilidad"])
+        return False
+    documento.sha256 = sha256
+    with transaction.atomic():
+        bloquear_contenido(sha256)
+        existente = documento._archivo_existente().exclude(archivo=subido).first()
+        if existente:
+            documento.archivo.name = existente
+        documento.save(update_fields=["sha256", "archivo"])
+    if existente:
+        _descartar(documento.archivo.storage, subido)
+    return True
+
+
+def limpiar(clave: str) -> bool:
+    """
+    Borra el objeto de una subida directa firmada que ningún Documento
+    adjuntó. Devuelve si se borró (o si nunca se subió).
+    """
+    if Documento.objects.filter(archivo=clave).exists():
+        return False
+    storage = _campo().storage
+    if storage.exists(clave):
+        storage.delete(clave)
+    return True
+
+
+def _descartar(storage, clave: str) -> None:
+    # Un objeto huérfano solo ocupa espacio: no vale la pena fallar por él
+    with suppress(Exception):
+        storage.delete(clave)
@@ -0,0 +1,213 @@
+"""
+Cola de trabajos en segundo plano respaldada por la base de datos.
+
+Uso:
+    @tarea("validar_documento")
+    def validar_documento(documento_id): ...
+
+    encolar("validar_documento", clave=f"validar_documento:{doc.pk}", documento_id=doc.pk)
+
+Los workers (``python manage.py procesar_tareas``) toman las tareas con
+SELECT ... FOR UPDATE SKIP LOCKED, las reintentan con backoff exponencial y
+las marcan FALLIDA al agotar ``max_intentos``. Los handlers deben ser
+idempotentes: una tarea puede ejecutarse más de una vez si un worker muere.
+"""
+from __future__ import annotations
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Documento, Tarea
+
+logger = logging.getLogger(__name__)
+
+_handlers: dict[str, Callable[..., None]] = {}
+
+
+def tarea(tipo: str):
+    """Registra una función como handler del tipo de tarea indicado."""
+    def decorator(func: Callable[..., None]) -> Callable[..., None]:
+        _handlers[tipo] = func
+        return func
+    return decorator
+
+
+def encolar(
+    tipo: str,
+    clave: str | None = None,
+    max_intentos: int | None = None,
+    disponible_en: datetime | None = None,
+    **payload,
+) -> Tarea:
+    """
+    Encola una tarea. Si ya existe una con la misma clave se devuelve esa,
+    de modo que reintentar la operación que encola no duplica trabajo.
+    """
+    defaults = {"tipo": tipo, "payload": payload}
+    if max_intentos is not None:
+        defaults["max_intentos"] = max_intentos
+    if disponible_en is not None:
+        defaults["disponible_en"] = disponible_en
+    if clave is None:
+        # Clave nueva: no hay fila que buscar, alcanza con el INSERT
+        t, creada = Tarea.objects.create(clave=f"{tipo}:{uuid.uuid4().hex}", **defaults), True
+    else:
+        t, creada = Tarea.objects.get_or_create(clave=clave, defaults=defaults)
+    if creada and getattr(settings, "TAREAS_EJECUTAR_AL_ENCOLAR", False):
+        # Modo desarrollo: sin worker, se ejecuta al confirmar la transacción
+        transaction.on_commit(lambda: procesar_pendientes())
+    return t
+
+
+def reencolar(t: Tarea, **payload) -> bool:
+    """
+    Vuelve a poner en la cola una tarea ya terminada (COMPLETADA o FALLIDA),
+    con los intentos en cero. Devuelve False si otro proceso la tomó antes.
+    """
+    cambios = {"estado": Tarea.Estado.PENDIENTE, "intentos": 0, "error": "", "disponible_en": timezone.now(),
+               "bloqueada_hasta": None, "updated_at": timezone.now()}
+    if payload:
+        cambios["payload"] = payload
+    terminadas = [Tarea.Estado.COMPLETADA, Tarea.Estado.FALLIDA]
+    if not Tarea.objects.filter(pk=t.pk, estado__in=terminadas).update(**cambios):
+        return False
+    for campo, valor in cambios.items():
+        setattr(t, campo, valor)
+    if getattr(settings, "TAREAS_EJECUTAR_AL_ENCOLAR", False):
+        transaction.on_commit(lambda: procesar_pendientes())
+    return True
+
+
+def reclamar(limite: int = 10) -> list[Tarea]:
+    """Toma hasta ``limite`` tareas disponibles y las marca EN_CURSO."""
+    ahora = timezone.now()
+    plazo = timedelta(seconds=getattr(settings, "TAREAS_PLAZO_SEGUNDOS", 300))
+    with transaction.atomic():
+        tareas = list(
+            Tarea.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(estado=Tarea.Estado.PENDIENTE, disponible_en__lte=ahora)
+                | Q(estado=Tarea.Estado.EN_CURSO, bloqueada_hasta__lt=ahora)
+            )
+            .order_by("disponible_en")[:limite]
+        )
+        for t in tareas:
+            t.estado = Tarea.Estado.EN_CURSO
+            t.intentos += 1
+            t.bloqueada_hasta = ahora + plazo
+            t.save(update_fields=["estado", "intentos", "bloqueada_hasta", "updated_at"])
+    return tareas
+
+
+def ejecutar(t: Tarea) -> None:
+    try:
+        handler = _handlers[t.tipo]
+        handler(**t.payload)
+    except Exception as e:
+        logger.exception("Falló la tarea %s (intento %s)", t, t.intentos)
+        t.error = f"{type(e).__name__}: {e}"
+        if t.intentos >= t.max_intentos:
+            t.estado = Tarea.Estado.FALLIDA
+        else:
+            espera = getattr(settings, "TAREAS_BACKOFF_SEGUNDOS", 5) * 2 ** (t.intentos - 1)
+            t.estado = Tarea.Estado.PENDIENTE
+            t.disponible_en = timezone.now() + timedelta(seconds=espera)
+    else:
+        t.estado = Tarea.Estado.COMPLETADA
+        t.error = ""
+    t.bloqueada_hasta = None
+    t.save(update_fields=["estado", "error", "disponible_en", "bloqueada_hasta", "updated_at"])
+
+
+def procesar_pendientes(limite: int = 10) -> int:
+    """Ejecuta un lote de tareas disponibles. Devuelve cuántas se procesaron."""
+    tareas = reclamar(limite)
+    for t in tareas:
+        ejecutar(t)
+    return len(tareas)
+
+
+# -- Handlers ----------------------------------------------------------------
+
+@tarea("validar_documento")
+def validar_documento(documento_id: int) -> None:
+    documento = Documento.objects.filter(pk=documento_id).first()
+    if documento is None:
+        return  # eliminado antes de procesarse
+    documento.validar_legibilidad()
+    encolar_miniaturas(documento)
+
+
+@tarea("generar_miniaturas")
+def generar_miniaturas(documento_id: int) -> None:
+    from .miniaturas import generar
+
+    documento = Documento.objects.filter(pk=documento_id).first()
+    if documento is None or not documento.archivo:
+        return
+    generar(documento)
+
+
+@tarea("verificar_subida")
+def verificar_subida(documento_id: int, sha256: str) -> None:
+    from .subidas import verificar
+
+    documento = Documento.objects.filter(pk=documento_id).first()
+    if documento is None or not documento.archivo:
+        return
+    if verificar(documento, sha256):
+        encolar_validacion(documento)
+
+
+@tarea("limpiar_subida")
+def limpiar_subida(nombre: str) -> None:
+    from .subidas import limpiar
+
+    limpiar(nombre)
+
+
+def encolar_validacion(documento: Documento) -> Tarea:
+    return encolar("validar_documento", clave=f"validar_documento:{documento.pk}", documento_id=documento.pk)
+
+
+def encolar_miniaturas(documento: Documento) -> Tarea:
+    from .miniaturas import faltan_variantes
+
+    # Una tarea por contenido: los documentos idénticos comparten miniaturas
+    clave = f"generar_miniaturas:{documento.sha256 or documento.pk}"
+    t = encolar("generar_miniaturas", clave=clave, documento_id=documento.pk)
+    terminada = t.estado in (Tarea.Estado.COMPLETADA, Tarea.Estado.FALLIDA)
+    if terminada and faltan_variantes(documento):
+        # Falló, o las variantes se borraron con el último documento que las usaba
+        reencolar(t, documento_id=documento.pk)
+    return t
+
+
+def encolar_verificacion(documento: Documento, sha256: str) -> Tarea:
+    # Subida directa (subidas.py): el hash declarado se comprueba antes de validar la legibilidad
+    clave = f"verificar_subida:{documento.pk}"
+    return encolar("verificar_subida", clave=clave, documento_id=documento.pk, sha256=sha256)
+
+
+def encolar_limpieza_subida(nombre: str, segundos: int) -> Tarea:
+    # Subida directa firmada: si nadie adjunta el objeto, se borra cuando la URL ya venció
+    return encolar("limpiar_subida", disponible_en=timezone.now() + timedelta(seconds=segundos), nombre=nombre)
+
+
+def encolar_validaciones(documentos: list[Documento]) -> None:
+    """encolar_validacion para muchos documentos con un solo INSERT (importaciones masivas)."""
+    Tarea.objects.bulk_create(
+        [
+            Tarea(tipo="validar_documento", clave=f"validar_documento:{d.pk}", payload={"documento_id": d.pk})
+            for d in documentos
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    if documentos and getattr(settings, "TAREAS_EJECUTAR_AL_ENCOLAR", False):
+        transaction.on_commit(lambda: procesar_pendientes(len(documentos)))
@@ -0,0 +1,52 @@
+"""
+{% fragmento "nombre" [ambito] %} ... {% endfragmento %}
+
+Como {% cache %}, pero la clave incluye el usuario, la URL completa (página,
+búsqueda) y el sello de versión del ámbito: el id de un estudiante o, sin
+ámbito, el sello global. Ver justificaciones/fragmentos.py.
+"""
+from __future__ import annotations
+from django import template
+from django.conf import settings
+
+from justificaciones import fragmentos
+
+register = template.Library()
+
+
+class FragmentoNode(template.Node):
+    def __init__(self, nodelist, nombre, ambito) -> None:
+        self.nodelist = nodelist
+        self.nombre = nombre
+        self.ambito = ambito
+
+    def render(self, context) -> str:
+        nombre = self.nombre.resolve(context)
+        ambito = self.ambito.resolve(context) if self.ambito else None
+        request = context.get("request")
+        if request is None:
+            return self.nodelist.render(context)
+        clave = fragmentos.clave_fragmento(
+            nombre,
+            getattr(request.user, "pk", None),
+            ambito if ambito is not None else fragmentos.GLOBAL,
+            request.get_full_path(),
+        )
+        cache = fragmentos.get_cache()
+        contenido = cache.get(clave)
+        fragmentos.registrar(nombre, contenido is not None)
+        if contenido is None:
+            contenido = self.nodelist.render(context)
+            cache.set(clave, contenido, getattr(settings, "JUSTIFICACIONES_FRAGMENTOS_TIMEOUT", 600))
+        return contenido
+
+
+@register.tag
+def fragmento(parser, token):
+    bits = token.split_contents()
+    if len(bits) not in (2, 3):
+        raise template.TemplateSyntaxError(f"'{bits[0]}' recibe un nombre y opcionalmente un ámbito.")
+    nodelist = parser.parse(("endfragmento",))
+    parser.delete_first_token()
+    ambito = parser.compile_filter(bits[2]) if len(bits) == 3 else None
+    return FragmentoNode(nodelist, parser.compile_filter(bits[1]), ambito)
@@ -1,9 +1,27 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def limpiar_caches():
+    # Los ids se reutilizan entre tests: un fragmento cacheado no debe sobrevivir al test que lo creó
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def storage_local(settings, tmp_path):
+    # Los tests nunca tocan el bucket de settings.py: los archivos van a disco y
+    # un SupabaseStorage creado sin fake_storage apunta a un host que no existe
+    settings.SUPABASE_URL = "http://supabase.invalid"
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.STORAGES = {**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"}}
+
+
 @pytest.fixture
 def usuario_estudiante(db):
     return User.objects.create_user(username="alumno", password="1234", rol="ESTUDIANTE")
@@ -35,3 +53,16 @@ def cliente_coordinador(client, usuario_coordinador):
 def cliente_profesor(client, usuario_profesor):
     client.force_login(usuario_profesor)
     return client
+
+
+@pytest.fixture
+def fake_storage(settings):
+    from justificaciones import storage_http
+    from justificaciones.fake_storage import FakeSupabaseStorage
+
+    with FakeSupabaseStorage() as fake:
+        settings.SUPABASE_URL = fake.url
+        settings.SUPABASE_KEY = "clave"
+        storage_http.reset_session()
+        yield fake
+    storage_http.reset_session()
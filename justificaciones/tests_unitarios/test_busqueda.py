@@ -0,0 +1,77 @@
+import importlib
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+from justificaciones.busqueda import MotorSimple, normalizar
+from justificaciones.models import Justificacion
+from justificaciones.paginacion import paginar
+
+
+def test_normalizar_quita_tildes_y_mayusculas():
+    assert normalizar("  Ñandú   PÉREZ ") == "nandu perez"
+
+
+@pytest.fixture
+def justificaciones(usuario_estudiante, django_user_model):
+    otro = django_user_model.objects.create_user(username="mgonzalez", first_name="María", last_name="González")
+    return {
+        "gripe": Justificacion.objects.create(
+            estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="Gripe", descripcion="Reposo médico"
+        ),
+        "tramite": Justificacion.objects.create(
+            estudiante=otro, fecha_inicio="2025-01-01", motivo="Trámite en el Registro Civil"
+        ),
+    }
+
+
+@pytest.mark.django_db
+def test_migracion_calcula_el_mismo_texto_que_save(justificaciones):
+    # Si cambia la normalización, hace falta una migración nueva que recalcule el campo
+    migracion = importlib.import_module("justificaciones.migrations.0008_justificacion_texto_busqueda")
+
+    for justi in Justificacion.objects.select_related("estudiante"):
+        assert migracion.texto_busqueda(justi) == justi.texto_busqueda
+
+
+@pytest.mark.django_db
+def test_busca_por_nombre_motivo_y_descripcion_sin_tildes(justificaciones):
+    def buscar(q):
+        return set(MotorSimple().buscar(Justificacion.objects.all(), q).values_list("motivo", flat=True))
+
+    assert buscar("gonzalez maria") == {"Trámite en el Registro Civil"}
+    assert buscar("TRAMITE") == {"Trámite en el Registro Civil"}
+    assert buscar("medico") == {"Gripe"}
+    assert buscar("medico gonzalez") == set()
+
+
+@pytest.mark.django_db
+def test_cambio_de_nombre_actualiza_busqueda(justificaciones):
+    estudiante = justificaciones["gripe"].estudiante
+    estudiante.first_name = "Íñigo"
+    estudiante.save()
+
+    assert MotorSimple().buscar(Justificacion.objects.all(), "inigo").get() == justificaciones["gripe"]
+
+
+@pytest.mark.django_db
+def test_resultados_ordenados_y_paginados(justificaciones, usuario_estudiante):
+    for _ in range(4):
+        Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="Control alumno")
+    motor = MotorSimple()
+    qs = motor.buscar(Justificacion.objects.all(), "alumno")
+
+    p1 = paginar(RequestFactory().get("/", {"q": "alumno"}), qs, motor.orden, tamano=3)
+    p2 = paginar(RequestFactory().get("/", {"q": "alumno", "cursor": p1.siguiente}), qs, motor.orden, tamano=3)
+
+    # Coincide con el usuario al inicio del texto: todas tienen el mismo rango
+    assert len(p1) + len(p2) == 5
+    assert not {j.pk for j in p1} & {j.pk for j in p2}
+    assert "q=alumno" in p1.url_siguiente
+
+
+@pytest.mark.django_db
+def test_profesor_busca_por_motivo(cliente_profesor, justificaciones):
+    resp = cliente_profesor.get(reverse("profesor_dashboard"), {"q": "registro"})
+
+    assert "Trámite en el Registro Civil" in resp.content.decode()
+    assert "Gripe" not in resp.content.decode()
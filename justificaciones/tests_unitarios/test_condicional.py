@@ -0,0 +1,66 @@
+import time
+import pytest
+from django.urls import reverse
+from django.utils.http import http_date
+from justificaciones import views
+from justificaciones.models import Justificacion
+from justificaciones.presupuesto import verificar_presupuesto
+
+
+def _crear(estudiante, motivo="Gripe"):
+    return Justificacion.objects.create(estudiante=estudiante, fecha_inicio="2025-01-01", motivo=motivo)
+
+
+@pytest.mark.django_db
+def test_dashboard_responde_304_con_etag_vigente(cliente_estudiante, usuario_estudiante):
+    _crear(usuario_estudiante)
+    url = reverse("estudiante_dashboard")
+
+    primera = cliente_estudiante.get(url)
+    assert primera.status_code == 200
+    assert "private" in primera["Cache-Control"] and "no-cache" in primera["Cache-Control"]
+    assert "Cookie" in primera["Vary"]
+    assert not primera.has_header("Last-Modified")
+
+    with verificar_presupuesto(views.estudiante_dashboard, maximo=2):
+        segunda = cliente_estudiante.get(url, HTTP_IF_NONE_MATCH=primera["ETag"])
+    assert segunda.status_code == 304
+    assert segunda.content == b""
+
+    _crear(usuario_estudiante, motivo="Otra")
+    assert cliente_estudiante.get(url, HTTP_IF_NONE_MATCH=primera["ETag"]).status_code == 200
+
+
+@pytest.mark.django_db
+def test_etag_distinto_por_usuario_y_pagina(client, usuario_coordinador, usuario_profesor, usuario_estudiante):
+    _crear(usuario_estudiante)
+    client.force_login(usuario_coordinador)
+    etag_coordinador = client.get(reverse("justificacion_list"))["ETag"]
+    assert client.get(reverse("justificacion_list"), {"cursor": "x"})["ETag"] != etag_coordinador
+
+    client.force_login(usuario_profesor)
+    resp = client.get(reverse("justificacion_list"), HTTP_IF_NONE_MATCH=etag_coordinador)
+    assert resp.status_code == 200
+
+
+@pytest.mark.django_db
+def test_detalle_sin_last_modified(cliente_estudiante, usuario_estudiante):
+    j = _crear(usuario_estudiante)
+    url = reverse("justificacion_detail", args=[j.pk])
+
+    # updated_at no cambia al validar un documento: If-Modified-Since solo no alcanza para un 304
+    resp = cliente_estudiante.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 3600))
+    assert resp.status_code == 200
+    assert not resp.has_header("Last-Modified")
+
+
+@pytest.mark.django_db
+def test_detalle_ajeno_no_responde_304(client, usuario_estudiante, django_user_model):
+    j = _crear(usuario_estudiante)
+    client.force_login(django_user_model.objects.create_user(username="otro", rol="ESTUDIANTE"))
+
+    # If-None-Match: * coincide con cualquier ETag; sin acceso no debe llegar a evaluarse
+    resp = client.get(reverse("justificacion_detail", args=[j.pk]), HTTP_IF_NONE_MATCH="*")
+
+    assert resp.status_code == 302
+    assert client.get(reverse("justificacion_detail", args=[j.pk + 1]), HTTP_IF_NONE_MATCH="*").status_code == 404
@@ -0,0 +1,76 @@
+import hashlib
+import pytest
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from justificaciones import models, signals
+from justificaciones.models import Justificacion, Documento
+
+
+@pytest.fixture
+def justificacion(usuario_estudiante):
+    return Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+
+
+@pytest.mark.django_db
+def test_documentos_identicos_comparten_archivo(justificacion, django_capture_on_commit_callbacks):
+    a = Documento.objects.create(justificacion=justificacion, archivo=SimpleUploadedFile("a.pdf", b"certificado"))
+    b = Documento.objects.create(justificacion=justificacion, archivo=SimpleUploadedFile("b.pdf", b"certificado"))
+    storage = a.archivo.storage
+
+    assert a.sha256 == hashlib.sha256(b"certificado").hexdigest()
+    assert b.archivo.name == a.archivo.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        a.delete()
+    assert storage.exists(b.archivo.name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        b.delete()
+    assert not storage.exists(b.archivo.name)
+
+
+@pytest.mark.django_db
+def test_borrado_y_deduplicacion_toman_el_mismo_bloqueo(justificacion, monkeypatch, django_capture_on_commit_callbacks):
+    bloqueos = []
+    monkeypatch.setattr(models, "bloquear_contenido", bloqueos.append)
+    monkeypatch.setattr(signals, "bloquear_contenido", bloqueos.append)
+
+    a = Documento.objects.create(justificacion=justificacion, archivo=SimpleUploadedFile("a.pdf", b"bloqueado"))
+    with django_capture_on_commit_callbacks(execute=True):
+        a.delete()
+
+    assert bloqueos == [a.sha256, a.sha256]
+
+
+@pytest.mark.django_db
+def test_objeto_borrado_antes_de_guardar_se_vuelve_a_subir(justificacion, django_capture_on_commit_callbacks):
+    a = Documento.objects.create(justificacion=justificacion, archivo=SimpleUploadedFile("a.pdf", b"compartido"))
+    b = Documento(justificacion=justificacion, archivo=SimpleUploadedFile("b.pdf", b"compartido"))
+    async_to_sync(b.asubir_archivo)()
+    assert b.archivo.name == a.archivo.name
+
+    # Entre la deduplicación y el INSERT se borra el último documento que usaba el objeto
+    with django_capture_on_commit_callbacks(execute=True):
+        a.delete()
+    assert not b.archivo.storage.exists(a.archivo.name)
+    b.save()
+
+    assert b.archivo.storage.exists(b.archivo.name)
+    with b.archivo.open("rb") as contenido:
+        assert contenido.read() == b"compartido"
+
+
+@pytest.mark.django_db
+def test_hash_se_calcula_durante_la_subida(cliente_estudiante):
+    with patch("justificaciones.models._sha256") as segunda_lectura:
+        resp = cliente_estudiante.post(reverse("justificacion_create"), {
+            "fecha_inicio": "2025-01-01",
+            "motivo": "Enfermedad",
+            "archivo": SimpleUploadedFile("c.pdf", b"%PDF-1.4 licencia", content_type="application/pdf"),
+        })
+
+    assert resp.status_code == 302
+    segunda_lectura.assert_not_called()
+    assert Documento.objects.get().sha256 == hashlib.sha256(b"%PDF-1.4 licencia").hexdigest()
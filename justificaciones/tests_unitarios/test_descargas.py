@@ -0,0 +1,110 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from justificaciones import views
+from justificaciones.descargas import RangoInsatisfacible, rango_solicitado
+from justificaciones.models import Documento, Justificacion
+from justificaciones.presupuesto import verificar_presupuesto
+from justificaciones.storage_rest import SupabaseStorageREST
+
+CONTENIDO = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def documento(usuario_estudiante):
+    justi = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+    return Documento.objects.create(justificacion=justi, archivo=SimpleUploadedFile("escaneo.pdf", CONTENIDO))
+
+
+@pytest.mark.parametrize("cabecera, esperado", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-10", (990, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-1,5-6", None),  # varios rangos: archivo completo
+    ("bytes=9-3", None),
+    ("items=0-1", None),
+])
+def test_rango_solicitado(cabecera, esperado):
+    assert rango_solicitado(cabecera, 1000) == esperado
+
+
+def test_rango_fuera_del_archivo():
+    with pytest.raises(RangoInsatisfacible):
+        rango_solicitado("bytes=1000-", 1000)
+
+
+@pytest.mark.django_db
+def test_rango_e_if_none_match(cliente_estudiante, documento):
+    url = reverse("documento_descargar", args=[documento.pk])
+
+    with verificar_presupuesto(views.documento_descargar):
+        resp = cliente_estudiante.get(url, HTTP_RANGE="bytes=9-18")
+    assert resp.status_code == 206
+    assert b"".join(resp.streaming_content) == CONTENIDO[9:19]
+    assert resp["Content-Range"] == f"bytes 9-18/{len(CONTENIDO)}"
+    assert resp["ETag"] == f'"{documento.sha256}"'
+
+    assert cliente_estudiante.get(url, HTTP_IF_NONE_MATCH=resp["ETag"]).status_code == 304
+    assert cliente_estudiante.get(url, HTTP_RANGE=f"bytes={len(CONTENIDO)}-").status_code == 416
+    # If-Range con otra versión: se entrega el archivo completo
+    completo = cliente_estudiante.get(url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"otro"')
+    assert completo.status_code == 200
+    assert b"".join(completo.streaming_content) == CONTENIDO
+
+
+@pytest.mark.django_db
+def test_rango_bajo_asgi(async_client, usuario_estudiante, documento):
+    async_client.force_login(usuario_estudiante)
+
+    async def pedir():
+        resp = await async_client.get(reverse("documento_descargar", args=[documento.pk]), headers={"Range": "bytes=-5"})
+        return resp, b"".join([parte async for parte in resp.streaming_content])
+
+    resp, cuerpo = async_to_sync(pedir)()
+
+    assert resp.status_code == 206
+    assert cuerpo == CONTENIDO[-5:]
+
+
+@pytest.mark.django_db
+def test_entrega_delegada(cliente_estudiante, documento, settings):
+    url = reverse("documento_descargar", args=[documento.pk])
+
+    settings.JUSTIFICACIONES_DESCARGAS = "x-accel"
+    resp = cliente_estudiante.get(url)
+    assert resp["X-Accel-Redirect"] == f"/_documentos/{documento.archivo.name}"
+    assert resp.content == b""
+
+    # FileSystemStorage no firma URLs: se sirve por el proxy
+    settings.JUSTIFICACIONES_DESCARGAS = "firmada"
+    resp = cliente_estudiante.get(url)
+    assert resp.status_code == 200 and b"".join(resp.streaming_content) == CONTENIDO
+
+
+@pytest.mark.django_db
+def test_detalle_enlaza_a_la_descarga(cliente_estudiante, documento):
+    resp = cliente_estudiante.get(reverse("justificacion_detail", args=[documento.justificacion_id]))
+
+    assert reverse("documento_descargar", args=[documento.pk]).encode() in resp.content
+    assert documento.archivo.url.encode() not in resp.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("modo", ["proxy", "x-accel"])
+def test_tipo_sale_de_la_extension_y_no_de_la_subida(cliente_estudiante, usuario_estudiante, fake_storage, monkeypatch, settings, modo):
+    monkeypatch.setattr(Documento._meta.get_field("archivo"), "storage", SupabaseStorageREST())
+    settings.JUSTIFICACIONES_DESCARGAS = modo
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(document.cookie)</script></svg>'
+    justi = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+    documento = Documento.objects.create(
+        justificacion=justi, archivo=SimpleUploadedFile("x.pdf", svg, content_type="image/svg+xml")
+    )
+    assert fake_storage.objects[("Documentos", documento.archivo.name)].content_type == "image/svg+xml"
+
+    resp = cliente_estudiante.get(reverse("documento_descargar", args=[documento.pk]))
+
+    assert resp["Content-Type"] == "application/pdf"
+    assert resp["X-Content-Type-Options"] == "nosniff"
+    assert resp["Content-Security-Policy"] == "sandbox"
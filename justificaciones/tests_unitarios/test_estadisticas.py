@@ -0,0 +1,77 @@
+from collections import Counter
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from justificaciones import estadisticas
+from justificaciones.models import Justificacion, JustificacionStats
+
+
+def _crear(estudiante, **kwargs):
+    return Justificacion.objects.create(estudiante=estudiante, fecha_inicio="2025-01-01", motivo="X", **kwargs)
+
+
+@pytest.mark.django_db
+def test_signals_mantienen_los_contadores(usuario_estudiante):
+    a = _crear(usuario_estudiante)
+    b = _crear(usuario_estudiante, fuente="whatsapp")
+    _crear(usuario_estudiante)
+    assert estadisticas.contadores() == {
+        "pendientes": 3, "aprobadas_semana": 0, "rechazadas_semana": 0, "pendientes_whatsapp": 1,
+    }
+
+    a.estado = Justificacion.Estado.APROBADA
+    a.save(update_fields=["estado"])
+    Justificacion.objects.get(pk=b.pk).delete()
+
+    assert estadisticas.contadores() == {
+        "pendientes": 1, "aprobadas_semana": 1, "rechazadas_semana": 0, "pendientes_whatsapp": 0,
+    }
+    assert estadisticas.diferencias() == {}
+
+
+@pytest.mark.django_db
+def test_registrar_suma_y_crea_filas_en_una_consulta(usuario_estudiante, django_assert_num_queries):
+    estudiante_id, _, fuente, dia = _crear(usuario_estudiante).clave_stats()
+    pendiente = (estudiante_id, "PENDIENTE", fuente, dia)
+    aprobada = (estudiante_id, "APROBADA", fuente, dia)
+
+    with django_assert_num_queries(1):
+        estadisticas.registrar(Counter({pendiente: -1, aprobada: 1}))
+
+    assert dict(JustificacionStats.objects.values_list("estado", "total")) == {"PENDIENTE": 0, "APROBADA": 1}
+
+
+@pytest.mark.django_db
+def test_revision_en_lote_actualiza_contadores(cliente_coordinador, usuario_estudiante):
+    ids = [_crear(usuario_estudiante).pk for _ in range(4)]
+
+    cliente_coordinador.post(reverse("coordinador_revisar_lote"), {"ids": ids[:3], "accion": "rechazar"})
+
+    assert estadisticas.contadores()["pendientes"] == 1
+    assert estadisticas.contadores()["rechazadas_semana"] == 3
+    assert estadisticas.diferencias() == {}
+
+
+@pytest.mark.django_db
+def test_comando_detecta_y_corrige_diferencias(usuario_estudiante):
+    _crear(usuario_estudiante)
+    _crear(usuario_estudiante, estado="APROBADA")
+    # Un cambio que no pasa por save() ni por estadisticas.mover deja los contadores desfasados
+    Justificacion.objects.update(estado="RECHAZADA")
+
+    with pytest.raises(CommandError):
+        call_command("recalcular_estadisticas", "--verificar")
+
+    call_command("recalcular_estadisticas")
+
+    call_command("recalcular_estadisticas", "--verificar")
+    assert JustificacionStats.objects.get().total == 2
+
+
+@pytest.mark.django_db
+def test_dashboard_muestra_contadores(cliente_coordinador, usuario_estudiante):
+    _crear(usuario_estudiante)
+
+    resp = cliente_coordinador.get(reverse("coordinador_dashboard"))
+
+    assert resp.context["contadores"]["pendientes"] == 1
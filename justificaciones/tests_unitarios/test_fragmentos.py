@@ -0,0 +1,56 @@
+import pytest
+from django.urls import reverse
+from justificaciones import fragmentos, views
+from justificaciones.models import Justificacion
+from justificaciones.presupuesto import verificar_presupuesto
+
+
+@pytest.fixture(autouse=True)
+def metricas_limpias():
+    fragmentos.reiniciar_metricas()
+
+
+def _crear(estudiante, motivo="Gripe"):
+    return Justificacion.objects.create(estudiante=estudiante, fecha_inicio="2025-01-01", motivo=motivo)
+
+
+@pytest.mark.django_db
+def test_recarga_no_consulta_la_tabla(cliente_estudiante, usuario_estudiante):
+    _crear(usuario_estudiante)
+    url = reverse("estudiante_dashboard")
+    cliente_estudiante.get(url)
+
+    # Solo quedan la sesión y el usuario
+    with verificar_presupuesto(views.estudiante_dashboard, maximo=2):
+        resp = cliente_estudiante.get(url)
+
+    assert "Gripe" in resp.content.decode()
+    assert fragmentos.metricas()["tabla"] == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.django_db
+def test_escritura_invalida_al_estudiante_y_a_las_vistas_globales(
+    cliente_estudiante, usuario_estudiante, usuario_coordinador, client
+):
+    url = reverse("estudiante_dashboard")
+    cliente_estudiante.get(url)
+    client.force_login(usuario_coordinador)
+    client.get(reverse("coordinador_dashboard"))
+
+    _crear(usuario_estudiante, motivo="Control dental")
+
+    client.force_login(usuario_estudiante)
+    assert "Control dental" in client.get(url).content.decode()
+    client.force_login(usuario_coordinador)
+    assert "Control dental" in client.get(reverse("coordinador_dashboard")).content.decode()
+
+
+@pytest.mark.django_db
+def test_fragmento_es_por_usuario(client, usuario_estudiante, django_user_model):
+    otro = django_user_model.objects.create_user(username="otro", password="1234", rol="ESTUDIANTE")
+    _crear(usuario_estudiante, motivo="Solo mio")
+
+    client.force_login(usuario_estudiante)
+    assert "Solo mio" in client.get(reverse("justificacion_list")).content.decode()
+    client.force_login(otro)
+    assert "Solo mio" not in client.get(reverse("justificacion_list")).content.decode()
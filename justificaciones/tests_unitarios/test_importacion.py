@@ -0,0 +1,100 @@
+import json
+from datetime import date
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from justificaciones import estadisticas, importacion
+from justificaciones.models import Documento, Justificacion, Tarea
+
+User = get_user_model()
+
+
+@pytest.fixture
+def origen(tmp_path, usuario_estudiante):
+    User.objects.create_user(username="otra", rol="ESTUDIANTE")
+    (tmp_path / "certificados" / "alumno").mkdir(parents=True)
+    (tmp_path / "certificados" / "otra").mkdir()
+    (tmp_path / "certificados" / "alumno" / "licencia.pdf").write_bytes(b"%PDF-1.4 licencia")
+    (tmp_path / "certificados" / "alumno" / "control.png").write_bytes(b"\x89PNG control")
+    # Mismo contenido para otra estudiante: se reutiliza el objeto ya subido
+    (tmp_path / "certificados" / "otra" / "copia.pdf").write_bytes(b"%PDF-1.4 licencia")
+    (tmp_path / "certificados" / "otra" / "notas.txt").write_bytes(b"no es un documento")
+    return tmp_path / "certificados"
+
+
+@pytest.mark.django_db
+def test_importa_directorio_por_lotes(origen, tmp_path):
+    items = importacion.leer_directorio(origen, date(2025, 3, 1))
+    r = importacion.importar(items, tmp_path / "progreso.diario", hilos=2, lote=2)
+
+    assert (r.importados, r.subidos, r.omitidos) == (3, 2, 0)
+    assert r.errores == [("otra/notas.txt", "formato no permitido, solo .pdf, .png")]
+    assert r.bytes == len(b"%PDF-1.4 licencia") * 2 + len(b"\x89PNG control")
+    justis = Justificacion.objects.filter(fuente="importacion")
+    assert justis.count() == 3
+    assert all(j.texto_busqueda for j in justis)
+    documentos = Documento.objects.order_by("pk")
+    assert len({d.archivo.name for d in documentos}) == 2
+    assert Tarea.objects.filter(tipo="validar_documento").count() == 3
+    assert estadisticas.diferencias() == {}
+
+
+@pytest.mark.django_db
+def test_retoma_desde_el_diario_sin_duplicar(origen, tmp_path):
+    diario = tmp_path / "progreso.diario"
+    items = importacion.leer_directorio(origen, date(2025, 3, 1))
+    # Corte tras el commit del primer lote y antes de escribir su diario
+    importacion.importar(items[:2], diario=None)
+
+    r = importacion.importar(importacion.leer_directorio(origen, date(2025, 3, 1)), diario)
+    assert (r.importados, r.omitidos) == (1, 2)
+    assert Documento.objects.count() == 3
+
+    r = importacion.importar(importacion.leer_directorio(origen, date(2025, 3, 1)), diario)
+    assert (r.importados, r.omitidos, len(r.errores)) == (0, 3, 1)
+    assert len(diario.read_text().splitlines()) == 3
+    assert Documento.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_manifiesto_csv_adjunta_a_existentes(tmp_path, usuario_estudiante):
+    existente = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    (tmp_path / "b.pdf").write_bytes(b"%PDF-1.4 b")
+    (tmp_path / "manifiesto.csv").write_text(
+        "archivo,username,justificacion,fecha_inicio,motivo\n"
+        f"a.pdf,,{existente.pk},,\n"
+        "b.pdf,alumno,,2025-02-03,Control médico\n"
+        "b.pdf,desconocido,,,\n"
+        "falta.pdf,alumno,,,\n"
+        "a.pdf,alumno,,03/02/2025,\n",
+        encoding="utf-8",
+    )
+
+    call_command("importar_documentos", str(tmp_path / "manifiesto.csv"), "--hilos", "2")
+
+    assert existente.documentos.count() == 1
+    nueva = Justificacion.objects.get(fuente="importacion")
+    assert (nueva.fecha_inicio, nueva.motivo) == (date(2025, 2, 3), "Control médico")
+    lineas = [json.loads(l) for l in (tmp_path / "manifiesto.csv.diario").read_text().splitlines()]
+    assert [l["clave"] for l in lineas] == [f"a.pdf|{existente.pk}", "b.pdf|alumno"]
+
+
+@pytest.mark.django_db
+def test_lote_fallido_borra_lo_recien_subido(origen, tmp_path, monkeypatch):
+    def _crear(items):
+        raise RuntimeError("bulk_create falló")
+
+    monkeypatch.setattr(importacion, "_crear", _crear)
+    storage = Documento._meta.get_field("archivo").storage
+    subidos = []
+    guardar = storage.save
+    monkeypatch.setattr(storage, "save", lambda *a, **k: subidos.append(guardar(*a, **k)) or subidos[-1])
+    items = importacion.leer_directorio(origen, date(2025, 3, 1))
+
+    with pytest.raises(RuntimeError):
+        importacion.importar(items, diario=None)
+
+    assert len(subidos) == 2
+    assert not any(storage.exists(clave) for clave in subidos)
+    assert Documento.objects.count() == 0
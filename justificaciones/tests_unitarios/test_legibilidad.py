@@ -0,0 +1,81 @@
+import threading
+import time
+import zlib
+import pytest
+from django.core.files.base import ContentFile
+from justificaciones import muestras
+from justificaciones.legibilidad import LimiteExcedido, _Presupuesto, analizar
+
+
+@pytest.mark.parametrize("datos, legible, observaciones", [
+    (muestras.pdf(paginas=2), True, ""),
+    (muestras.pdf(texto=None, imagen=(1275, 1650)), True, ""),
+    (muestras.pdf(texto=None, imagen=(300, 400)), False, "resolución insuficiente"),
+    (muestras.pdf(paginas=3, texto=None), False, "todas las páginas en blanco"),
+    (muestras.png(), True, ""),
+    (muestras.png(en_blanco=True), False, "imagen en blanco"),
+    (muestras.png(ancho=200, alto=200), False, "resolución insuficiente"),
+])
+def test_analisis_de_documentos(datos, legible, observaciones):
+    resultado = analizar(ContentFile(datos))
+
+    assert resultado.legible is legible
+    assert resultado.observaciones == observaciones
+
+
+def test_pdf_reporta_paginas_y_resolucion():
+    resultado = analizar(ContentFile(muestras.pdf(paginas=2, imagen=(1275, 1650))))
+
+    assert resultado.paginas == 2
+    assert resultado.paginas_en_blanco == 0
+    assert (resultado.ancho_px, resultado.alto_px, resultado.dpi) == (1275, 1650, 150)
+
+
+def test_limite_de_bytes(settings):
+    settings.LEGIBILIDAD_MAX_BYTES = 100
+
+    resultado = analizar(ContentFile(muestras.pdf(paginas=5)))
+
+    assert resultado.legible is False
+    assert resultado.observaciones == "archivo demasiado grande para analizar"
+
+
+def test_bomba_de_compresion_no_agota_memoria(settings):
+    settings.LEGIBILIDAD_MAX_DESCOMPRIMIDO = 1024 * 1024
+    bomba = zlib.compress(b"0" * (50 * 1024 * 1024))
+    datos = (
+        b"%PDF-1.4\n1 0 obj\n<< /Type /Page /Contents 2 0 R >>\nendobj\n"
+        + b"2 0 obj\n<< /Filter /FlateDecode /Length %d >>\nstream\n" % len(bomba)
+        + bomba + b"\nendstream\nendobj\n%EOF\n"
+    )
+
+    resultado = analizar(ContentFile(datos))
+
+    assert resultado.legible is False
+    assert resultado.observaciones == "contenido descomprimido demasiado grande"
+
+
+def test_limite_de_tiempo_de_cpu(settings):
+    settings.LEGIBILIDAD_MAX_SEGUNDOS = 0
+
+    resultado = analizar(ContentFile(muestras.pdf(paginas=50)))
+
+    assert resultado.observaciones == "tiempo de análisis excedido"
+
+
+def test_limite_de_tiempo_no_cuenta_otros_hilos():
+    presupuesto = _Presupuesto(max_segundos=0.2, max_descomprimido=1)
+
+    def ocupado():
+        inicio = time.thread_time()
+        while time.thread_time() - inicio < 0.5:
+            pass
+
+    hilo = threading.Thread(target=ocupado)
+    hilo.start()
+    hilo.join()
+
+    presupuesto.verificar()  # el CPU del otro hilo no cuenta
+    with pytest.raises(LimiteExcedido):
+        ocupado()
+        presupuesto.verificar()
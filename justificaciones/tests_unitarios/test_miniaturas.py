@@ -0,0 +1,171 @@
+import io
+import threading
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+from justificaciones import legibilidad, miniaturas, muestras, tareas, views
+from justificaciones.models import Documento, Justificacion, Tarea
+from justificaciones.presupuesto import verificar_presupuesto
+
+
+def _pdf_con_jpeg(ancho: int = 600, alto: int = 800) -> bytes:
+    jpeg = io.BytesIO()
+    Image.effect_noise((ancho, alto), 64).convert("RGB").save(jpeg, "JPEG")
+    return muestras._armar_pdf([
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [4 0 R] /Count 1 >>",
+        muestras._stream(
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB /BitsPerComponent 8"
+            b" /Filter /DCTDecode" % (ancho, alto),
+            jpeg.getvalue(),
+            comprimir=False,
+        ),
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /XObject << /Im1 3 0 R >> >> >>",
+    ])
+
+
+@pytest.fixture
+def crear_documento(usuario_estudiante):
+    # storage_local (conftest) da un MEDIA_ROOT por test: sin miniaturas de otros tests con el mismo contenido
+    def crear(datos: bytes, nombre: str = "escaneo.pdf") -> Documento:
+        justi = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+        return Documento.objects.create(justificacion=justi, archivo=SimpleUploadedFile(nombre, datos))
+    return crear
+
+
+@pytest.mark.parametrize("datos, tamano", [
+    (muestras.png(ancho=400, alto=600), (400, 600)),
+    (muestras.pdf(texto=None, imagen=(300, 400)), (300, 400)),
+    (_pdf_con_jpeg(), (600, 800)),
+    (muestras.pdf(), None),  # solo texto
+], ids=["png", "pdf-flate", "pdf-jpeg", "pdf-texto"])
+def test_imagen_portada(datos, tamano):
+    portada = legibilidad.imagen_portada(ContentFile(datos))
+
+    assert (portada.size if portada else None) == tamano
+
+
+@pytest.mark.django_db
+def test_generar_guarda_las_variantes_por_contenido(crear_documento):
+    documento = crear_documento(muestras.png(ancho=400, alto=600), "control.png")
+
+    claves = miniaturas.generar(documento)
+
+    assert claves == {
+        "miniatura": f"miniaturas/{documento.sha256[:2]}/{documento.sha256}-miniatura.{miniaturas.formato()[1]}",
+        "previa": f"miniaturas/{documento.sha256[:2]}/{documento.sha256}-previa.{miniaturas.formato()[1]}",
+    }
+    storage = documento.archivo.storage
+    with storage.open(claves["miniatura"]) as f:
+        assert max(Image.open(f).size) == 160
+    with storage.open(claves["previa"]) as f:
+        assert Image.open(f).size == (400, 600)  # thumbnail() no agranda
+
+
+@pytest.mark.django_db
+def test_vista_previa_se_genera_al_pedirla(cliente_coordinador, crear_documento):
+    documento = crear_documento(_pdf_con_jpeg())
+    url = reverse("documento_vista_previa", args=[documento.pk, "miniatura"])
+
+    # Incluye la generación: el primer pedido crea las variantes
+    with verificar_presupuesto(views.documento_vista_previa):
+        resp = cliente_coordinador.get(url)
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == miniaturas.formato()[2]
+    assert "max-age=" in resp["Cache-Control"]
+    assert Image.open(io.BytesIO(b"".join(resp.streaming_content))).size == (120, 160)
+
+    assert cliente_coordinador.get(url, HTTP_IF_NONE_MATCH=resp["ETag"]).status_code == 304
+    with verificar_presupuesto(views.justificacion_miniatura):
+        assert cliente_coordinador.get(reverse("justificacion_miniatura", args=[documento.justificacion_id])).status_code == 200
+    assert cliente_coordinador.get(reverse("documento_vista_previa", args=[documento.pk, "enorme"])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_pdf_sin_imagen_no_tiene_vista_previa(cliente_coordinador, crear_documento, monkeypatch):
+    documento = crear_documento(muestras.pdf())
+    url = reverse("documento_vista_previa", args=[documento.pk, "previa"])
+    llamadas = []
+    original = miniaturas.imagen_portada
+    monkeypatch.setattr(miniaturas, "imagen_portada", lambda f: llamadas.append(1) or original(f))
+
+    assert cliente_coordinador.get(url).status_code == 404
+    assert cliente_coordinador.get(url).status_code == 404
+    assert len(llamadas) == 1  # el segundo pedido no vuelve a analizar el archivo
+
+
+@pytest.mark.django_db
+def test_pedidos_simultaneos_generan_una_vez(crear_documento, monkeypatch):
+    documento = crear_documento(muestras.png(ancho=400, alto=600), "control.png")
+    llamadas = []
+    original = miniaturas.imagen_portada
+    listos = threading.Barrier(4)
+
+    def contar(f):
+        llamadas.append(1)
+        return original(f)
+
+    monkeypatch.setattr(miniaturas, "imagen_portada", contar)
+    resultados = []
+
+    def pedir(variante):
+        listos.wait()
+        resultados.append(miniaturas.obtener(documento, variante))
+
+    hilos = [threading.Thread(target=pedir, args=(v,)) for v in ("miniatura", "previa") * 2]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert len(llamadas) == 1
+    assert sorted(resultados) == sorted([miniaturas.clave(documento, v) for v in ("miniatura", "previa")] * 2)
+
+
+@pytest.mark.django_db
+def test_validacion_encola_miniaturas(crear_documento):
+    documento = crear_documento(muestras.png(ancho=400, alto=600), "control.png")
+    tareas.encolar_validacion(documento)
+
+    tareas.procesar_pendientes()
+    tareas.procesar_pendientes()
+
+    assert Tarea.objects.get(tipo="generar_miniaturas").estado == Tarea.Estado.COMPLETADA
+    assert documento.archivo.storage.exists(miniaturas.clave(documento, "previa"))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("estado", [Tarea.Estado.FALLIDA, Tarea.Estado.COMPLETADA])
+def test_tarea_terminada_sin_variantes_se_vuelve_a_encolar(crear_documento, estado):
+    datos = muestras.png(ancho=400, alto=600)
+    anterior = tareas.encolar_miniaturas(crear_documento(datos, "control.png"))
+    Tarea.objects.filter(pk=anterior.pk).update(estado=estado, intentos=5, error="OSError: sin espacio")
+    otro = crear_documento(datos, "copia.png")  # mismo contenido, misma clave de tarea
+
+    t = tareas.encolar_miniaturas(otro)
+
+    assert t.pk == anterior.pk
+    assert (t.estado, t.intentos, t.payload) == (Tarea.Estado.PENDIENTE, 0, {"documento_id": otro.pk})
+    tareas.procesar_pendientes()
+    assert not miniaturas.faltan_variantes(otro)
+    # Con las variantes en el storage, volver a encolar no repite el trabajo
+    assert tareas.encolar_miniaturas(otro).estado == Tarea.Estado.COMPLETADA
+
+
+@pytest.mark.django_db
+def test_borrar_el_ultimo_documento_borra_sus_variantes(crear_documento, django_capture_on_commit_callbacks):
+    datos = muestras.png(ancho=400, alto=600)
+    documento, copia = crear_documento(datos, "control.png"), crear_documento(datos, "copia.png")
+    claves = miniaturas.generar(documento).values()
+    storage = documento.archivo.storage
+
+    with django_capture_on_commit_callbacks(execute=True):
+        copia.delete()
+    assert all(storage.exists(c) for c in claves)  # el contenido sigue en uso
+
+    with django_capture_on_commit_callbacks(execute=True):
+        documento.delete()
+    assert not any(storage.exists(c) for c in claves)
+    assert not storage.exists(documento.archivo.name)
@@ -1,6 +1,7 @@
 import pytest
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
+from justificaciones import muestras
 from justificaciones.models import Justificacion, Documento, Notificacion
 
 
@@ -21,7 +22,7 @@ def test_documento_validar_legibilidad(usuario_estudiante):
         fecha_inicio="2025-01-01",
         motivo="Enfermedad"
     )
-    archivo = SimpleUploadedFile("doc.pdf", b"contenido")
+    archivo = SimpleUploadedFile("doc.pdf", muestras.pdf())
 
     doc = Documento.objects.create(justificacion=justi, archivo=archivo)
 
@@ -29,9 +30,26 @@ def test_documento_validar_legibilidad(usuario_estudiante):
     doc.refresh_from_db()
 
     assert doc.legible is True
+    assert doc.paginas == 1
     assert isinstance(doc.validado_en, timezone.datetime)
 
 
+@pytest.mark.django_db
+def test_documento_no_pdf_no_es_legible(usuario_estudiante):
+    justi = Justificacion.objects.create(
+        estudiante=usuario_estudiante,
+        fecha_inicio="2025-01-01",
+        motivo="Enfermedad"
+    )
+    doc = Documento.objects.create(justificacion=justi, archivo=SimpleUploadedFile("doc.pdf", b"contenido"))
+
+    doc.validar_legibilidad()
+    doc.refresh_from_db()
+
+    assert doc.legible is False
+    assert doc.observaciones_legibilidad == "formato no reconocido"
+
+
 @pytest.mark.django_db
 def test_notificacion_str(usuario_estudiante):
     notif = Notificacion.objects.create(
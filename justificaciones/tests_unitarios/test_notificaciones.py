@@ -0,0 +1,80 @@
+import pytest
+from django.core import mail
+from django.db import connection, transaction
+from django.utils import timezone
+from justificaciones import notificaciones, tareas
+from justificaciones.models import Justificacion, Notificacion, Tarea
+
+
+def _justificacion(estudiante, estado="APROBADA"):
+    return Justificacion.objects.create(estudiante=estudiante, fecha_inicio="2025-01-01", motivo="X", estado=estado)
+
+
+@pytest.mark.django_db
+def test_lote_usa_una_sola_conexion(usuario_estudiante, monkeypatch):
+    conexiones = []
+    original = notificaciones.get_connection
+
+    def contar():
+        conexiones.append(1)
+        return original()
+
+    monkeypatch.setattr(notificaciones, "get_connection", contar)
+    notificaciones.notificar_cambio_estado([_justificacion(usuario_estudiante) for _ in range(5)])
+
+    tareas.procesar_pendientes()
+
+    assert len(conexiones) == 1
+    assert len(mail.outbox) == 5
+    assert not Notificacion.objects.exclude(estado=Notificacion.Estado.ENVIADA).exists()
+
+
+@pytest.mark.django_db
+def test_rollback_no_deja_notificaciones(usuario_estudiante):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            notificaciones.notificar_cambio_estado([_justificacion(usuario_estudiante)])
+            raise RuntimeError
+
+    assert not Notificacion.objects.exists()
+
+
+@pytest.mark.django_db
+def test_canal_sin_proveedor_reintenta_y_falla(usuario_estudiante, settings):
+    settings.NOTIFICACIONES_CANALES = ["sms"]
+    settings.NOTIFICACIONES_MAX_INTENTOS = 2
+    notificaciones.notificar_cambio_estado([_justificacion(usuario_estudiante)])
+
+    notificaciones.despachar_notificaciones()
+    notif = Notificacion.objects.get()
+    assert notif.estado == Notificacion.Estado.PENDIENTE
+    assert notif.intentos == 1
+    # quedó programado un despacho para el próximo intento
+    assert Tarea.objects.filter(tipo="despachar_notificaciones", disponible_en__gt=timezone.now()).exists()
+
+    Notificacion.objects.update(proximo_intento=notif.created_at)
+    notificaciones.despachar_notificaciones()
+    notif.refresh_from_db()
+    assert notif.estado == Notificacion.Estado.FALLIDA
+    assert "SMS" in notif.error
+
+
+@pytest.mark.django_db(transaction=True)
+def test_smtp_caido_se_registra_por_fila_sin_revertir_el_lote(usuario_estudiante, monkeypatch):
+    en_transaccion = []
+
+    def smtp_caido():
+        en_transaccion.append(connection.in_atomic_block)
+        raise ConnectionRefusedError("[Errno 111] Connection refused")
+
+    monkeypatch.setattr(notificaciones, "get_connection", smtp_caido)
+    notificaciones.notificar_cambio_estado([_justificacion(usuario_estudiante) for _ in range(2)])
+
+    assert notificaciones.despachar_notificaciones() == 2
+
+    assert en_transaccion == [False]  # el envío no retiene el lock de las filas
+    assert Notificacion.objects.filter(canal="app", estado=Notificacion.Estado.ENVIADA).count() == 2
+    for notif in Notificacion.objects.filter(canal="email"):
+        assert (notif.estado, notif.intentos) == (Notificacion.Estado.PENDIENTE, 1)
+        assert "ConnectionRefusedError" in notif.error
+        assert notif.proximo_intento > timezone.now()
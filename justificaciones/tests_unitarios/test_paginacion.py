@@ -0,0 +1,76 @@
+import pytest
+from datetime import timedelta
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from justificaciones.models import Justificacion
+from justificaciones.paginacion import ORDEN_ANTIGUAS, codificar_cursor, paginar
+
+
+@pytest.fixture
+def justificaciones(usuario_estudiante):
+    base = timezone.now()
+    creadas = [
+        Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo=f"M{i}")
+        for i in range(7)
+    ]
+    # Dos filas con el mismo created_at: el id desempata
+    for i, j in enumerate(creadas):
+        Justificacion.objects.filter(pk=j.pk).update(created_at=base - timedelta(minutes=i // 2))
+    return Justificacion.objects.order_by("-created_at", "-id")
+
+
+def _pagina(cursor=None, **kwargs):
+    request = RequestFactory().get("/", {"cursor": cursor} if cursor else {})
+    return paginar(request, Justificacion.objects.all(), tamano=3, **kwargs)
+
+
+@pytest.mark.django_db
+def test_recorre_todas_las_filas_sin_repetir(justificaciones):
+    esperado = [j.pk for j in justificaciones]
+
+    p1 = _pagina()
+    p2 = _pagina(p1.siguiente)
+    p3 = _pagina(p2.siguiente)
+
+    assert [j.pk for j in p1] + [j.pk for j in p2] + [j.pk for j in p3] == esperado
+    assert p1.anterior is None
+    assert p3.siguiente is None
+    # Volver atrás devuelve exactamente la página anterior
+    assert [j.pk for j in _pagina(p3.anterior)] == [j.pk for j in p2]
+    assert [j.pk for j in _pagina(_pagina(p2.anterior).siguiente)] == [j.pk for j in p2]
+
+
+@pytest.mark.django_db
+def test_orden_ascendente_y_cursor_invalido(justificaciones):
+    esperado = list(reversed([j.pk for j in justificaciones]))[:3]
+
+    assert [j.pk for j in _pagina(orden=ORDEN_ANTIGUAS)] == esperado
+    assert [j.pk for j in _pagina("no-es-un-cursor", orden=ORDEN_ANTIGUAS)] == esperado
+
+
+@pytest.mark.django_db
+def test_listado_sin_count_ni_offset(cliente_estudiante, justificaciones, settings, django_assert_max_num_queries):
+    settings.JUSTIFICACIONES_PAGE_SIZE = 3
+    with django_assert_max_num_queries(10) as capturadas:
+        resp = cliente_estudiante.get(reverse("estudiante_dashboard"))
+
+    sql = " ".join(q["sql"] for q in capturadas.captured_queries).upper()
+    assert "COUNT(" not in sql and "OFFSET" not in sql
+    assert "Siguientes" in resp.content.decode()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("valores", [
+    ["basura", 1],
+    ["2025-01-01T00:00:00", "x"],
+    [[1], {"a": 1}],
+    ["2025-01-01T00:00:00"],
+], ids=["fecha", "id", "tipos", "cantidad"])
+def test_cursor_alterado_sirve_la_primera_pagina(cliente_estudiante, justificaciones, settings, valores):
+    settings.JUSTIFICACIONES_PAGE_SIZE = 3
+
+    resp = cliente_estudiante.get(reverse("estudiante_dashboard"), {"cursor": codificar_cursor(valores, "sig")})
+
+    assert resp.status_code == 200
+    assert [j.pk for j in resp.context["justificaciones"]] == [j.pk for j in justificaciones[:3]]
@@ -0,0 +1,80 @@
+"""
+Regresión de planes de consulta: cada listado debe resolverse con un índice.
+Se siembra la tabla, se actualizan las estadísticas y se revisa el EXPLAIN de
+las consultas que arman las vistas (y el changelist del admin).
+"""
+import re
+import pytest
+from datetime import timedelta
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+from justificaciones import views
+from justificaciones.models import Justificacion
+from justificaciones.paginacion import ORDEN_ANTIGUAS, ORDEN_RECIENTES, consulta_pagina
+
+TABLA = Justificacion._meta.db_table
+# PostgreSQL: "Seq Scan on tabla"; SQLite: "SCAN tabla" sin "USING ... INDEX"
+SCAN_SECUENCIAL = {
+    "postgresql": re.compile(rf"Seq Scan on {TABLA}\b"),
+    "sqlite": re.compile(rf"SCAN {TABLA}\b(?! USING (COVERING )?INDEX)"),
+}
+
+
+@pytest.fixture
+def tabla_sembrada(usuario_estudiante, django_user_model):
+    otros = django_user_model.objects.bulk_create(
+        [django_user_model(username=f"alumno{i}", rol="ESTUDIANTE") for i in range(50)]
+    )
+    ahora = timezone.now()
+    Justificacion.objects.bulk_create([
+        Justificacion(
+            estudiante=otros[i % len(otros)] if i % 25 else usuario_estudiante,
+            fecha_inicio="2025-01-01",
+            motivo="Seed",
+            estado="PENDIENTE" if i % 50 == 0 else ("APROBADA" if i % 2 else "RECHAZADA"),
+            fuente="whatsapp" if i % 10 == 0 else "app",
+            created_at=ahora - timedelta(minutes=i),
+        )
+        for i in range(5000)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {TABLA}")
+    return usuario_estudiante
+
+
+def _changelist_admin(usuario, parametros):
+    request = RequestFactory().get("/admin/justificaciones/justificacion/", parametros)
+    request.user = usuario
+    modelo_admin = admin.site._registry[Justificacion]
+    return modelo_admin.get_changelist_instance(request).queryset[: modelo_admin.list_per_page]
+
+
+def _consultas(estudiante, superusuario):
+    tamano = 25
+    primera = views._consulta_global().order_by(*ORDEN_RECIENTES).first()
+    cursor = ([primera.created_at.isoformat(), primera.id], "sig")
+    return {
+        "listado": consulta_pagina(views._consulta_global(), ORDEN_RECIENTES, tamano),
+        "listado_pagina_2": consulta_pagina(views._consulta_global(), ORDEN_RECIENTES, tamano, cursor),
+        "estudiante": consulta_pagina(views._consulta_propia(estudiante), ORDEN_RECIENTES, tamano),
+        "coordinador": consulta_pagina(views._consulta_pendientes(), ORDEN_ANTIGUAS, tamano),
+        "admin_fuente": _changelist_admin(superusuario, {
+            "fuente__exact": "whatsapp",
+            "created_at__gte": (timezone.now() - timedelta(days=7)).isoformat(),
+        }),
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("nombre", ["listado", "listado_pagina_2", "estudiante", "coordinador", "admin_fuente"])
+def test_listados_usan_indices(tabla_sembrada, django_user_model, nombre):
+    patron = SCAN_SECUENCIAL.get(connection.vendor)
+    if patron is None:
+        pytest.skip(f"Sin patrón de EXPLAIN para {connection.vendor}")
+    superusuario = django_user_model.objects.create_superuser(username="superusuario", password="1234")
+
+    plan = _consultas(tabla_sembrada, superusuario)[nombre].explain()
+
+    assert not patron.search(plan), f"{nombre} hace un scan secuencial:\n{plan}"
@@ -0,0 +1,90 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import resolve, reverse
+from justificaciones import muestras
+from justificaciones.models import Documento, Justificacion
+from justificaciones.presupuesto import PresupuestoExcedido, verificar_presupuesto
+
+
+def _sembrar(estudiante, cantidad=8):
+    for i in range(cantidad):
+        justi = Justificacion.objects.create(estudiante=estudiante, fecha_inicio="2025-01-01", motivo=f"M{i}")
+        Documento.objects.create(
+            justificacion=justi,
+            archivo=SimpleUploadedFile(f"d{i}.pdf", muestras.pdf(), content_type="application/pdf"),
+        )
+    return justi
+
+
+def _get(cliente, url, **params):
+    with verificar_presupuesto(resolve(url).func):
+        resp = cliente.get(url, params)
+    assert resp.status_code == 200
+    return resp
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cantidad", [1, 8])
+def test_listados_dentro_del_presupuesto(client, usuario_estudiante, usuario_coordinador, usuario_profesor, cantidad):
+    _sembrar(usuario_estudiante, cantidad)
+
+    client.force_login(usuario_estudiante)
+    _get(client, reverse("estudiante_dashboard"))
+    _get(client, reverse("justificacion_list"))
+    client.force_login(usuario_coordinador)
+    _get(client, reverse("coordinador_dashboard"))
+    client.force_login(usuario_profesor)
+    _get(client, reverse("profesor_dashboard"), q="alumno")
+
+
+@pytest.mark.django_db
+def test_detalle_con_varios_documentos(cliente_estudiante, usuario_estudiante):
+    justi = _sembrar(usuario_estudiante, 1)
+    for i in range(4):
+        Documento.objects.create(
+            justificacion=justi, archivo=SimpleUploadedFile(f"x{i}.pdf", muestras.pdf(), content_type="application/pdf")
+        )
+
+    resp = _get(cliente_estudiante, reverse("justificacion_detail", args=[justi.pk]))
+
+    assert resp.content.decode().count("Documento ") >= 5
+
+
+@pytest.mark.django_db
+def test_exceso_informa_consultas_sobrantes(usuario_estudiante):
+    def vista():
+        pass
+
+    with pytest.raises(PresupuestoExcedido, match="Consultas sobrantes"):
+        with verificar_presupuesto(vista, maximo=1):
+            list(Justificacion.objects.all())
+            list(Documento.objects.all())
+
+
+@pytest.mark.django_db
+def test_middleware_informa_total(cliente_estudiante, settings):
+    settings.JUSTIFICACIONES_PRESUPUESTO_ACTIVO = True
+    settings.JUSTIFICACIONES_PRESUPUESTO_ESTRICTO = True
+
+    resp = cliente_estudiante.get(reverse("estudiante_dashboard"))
+
+    assert int(resp["X-Consultas-DB"]) <= 5
+
+
+@pytest.mark.django_db
+def test_middleware_cuenta_consultas_de_vistas_async_bajo_asgi(async_client, usuario_estudiante, settings):
+    settings.JUSTIFICACIONES_PRESUPUESTO_ACTIVO = True
+    settings.JUSTIFICACIONES_PRESUPUESTO_ESTRICTO = True
+    justi = _sembrar(usuario_estudiante, 1)
+    async_client.force_login(usuario_estudiante)
+
+    resp = async_to_sync(async_client.get)(reverse("documento_descargar", args=[justi.documentos.get().pk]))
+
+    # Sesión, usuario y documento, contados aunque el ORM async consulte desde otro hilo
+    assert int(resp["X-Consultas-DB"]) == 3
+    assert async_to_sync(_leer)(resp) == muestras.pdf()
+
+
+async def _leer(resp) -> bytes:
+    return b"".join([parte async for parte in resp.streaming_content])
@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import patch
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from justificaciones.storage_cache import (
+    DjangoMetadataCache,
+    LocMemMetadataCache,
+    ObjectMetadata,
+    get_metadata_cache,
+)
+from justificaciones.storage_rest import SupabaseStorageREST
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    get_metadata_cache().clear()
+
+
+def test_locmem_expulsa_el_menos_usado():
+    cache = LocMemMetadataCache(max_entries=2)
+    cache.set("b/1", ObjectMetadata(size=1))
+    cache.set("b/2", ObjectMetadata(size=2))
+    cache.get("b/1")
+    cache.set("b/3", ObjectMetadata(size=3))
+
+    assert cache.get("b/2") is None
+    assert cache.get("b/1").size == 1
+    assert cache.get("b/3").size == 3
+
+
+def test_locmem_expira_por_ttl():
+    cache = LocMemMetadataCache(timeout=10)
+    with patch("justificaciones.storage_cache.time.monotonic", return_value=100):
+        cache.set("b/1", ObjectMetadata(size=1))
+    with patch("justificaciones.storage_cache.time.monotonic", return_value=111):
+        assert cache.get("b/1") is None
+
+
+def test_django_cache_guarda_metadatos():
+    cache = DjangoMetadataCache(alias="default")
+    metadata = ObjectMetadata(size=5, etag='"abc"', content_type="application/pdf")
+    cache.set("b/1", metadata)
+
+    assert cache.get("b/1") == metadata
+    cache.delete("b/1")
+    assert cache.get("b/1") is None
+
+
+def test_django_cache_clear_solo_borra_sus_claves():
+    cache = DjangoMetadataCache(alias="default")
+    otro = DjangoMetadataCache(alias="default", key_prefix="otro-bucket")
+    cache.set("b/1", ObjectMetadata(size=1))
+    otro.set("b/1", ObjectMetadata(size=2))
+    caches["default"].set("ajena", 3)
+
+    cache.clear()
+
+    assert cache.get("b/1") is None
+    assert DjangoMetadataCache(alias="default").get("b/1") is None  # también para los demás procesos
+    assert otro.get("b/1").size == 2
+    assert caches["default"].get("ajena") == 3
+    cache.set("b/1", ObjectMetadata(size=4))
+    assert cache.get("b/1").size == 4
+
+
+def test_backend_rest_no_repite_head_para_metadatos_conocidos(fake_storage):
+    storage = SupabaseStorageREST()
+    storage._save("documentos/a.pdf", ContentFile(b"contenido", name="a.pdf"))
+    fake_storage.requests.clear()
+
+    assert storage.size("documentos/a.pdf") == 9
+    assert storage.exists("documentos/a.pdf")
+    assert fake_storage.requests == []
+
+
+def test_backend_rest_cachea_head_e_invalida_al_borrar(fake_storage):
+    storage = SupabaseStorageREST()
+    storage._save("documentos/a.pdf", ContentFile(b"contenido", name="a.pdf"))
+    get_metadata_cache().clear()
+
+    assert storage.metadata("documentos/a.pdf").etag
+    assert storage.size("documentos/a.pdf") == 9
+    assert [m for m, _, _ in fake_storage.requests].count("HEAD") == 1
+
+    storage.delete("documentos/a.pdf")
+    assert not storage.exists("documentos/a.pdf")
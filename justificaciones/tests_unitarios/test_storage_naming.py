@@ -0,0 +1,40 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from justificaciones.models import Justificacion, Documento
+from justificaciones.storage_naming import is_uuid_name
+from justificaciones.storage_rest import SupabaseStorageREST
+
+
+def test_nombres_uuid_no_colisionan_ni_consultan_al_servidor(fake_storage):
+    storage = SupabaseStorageREST()
+
+    nombres = {storage.get_available_name("documentos/certificado.pdf", max_length=100) for _ in range(50)}
+
+    assert len(nombres) == 50
+    assert all(is_uuid_name(n) and n.startswith("documentos/") and n.endswith("-certificado.pdf") for n in nombres)
+    assert all(len(n) <= 100 for n in nombres)
+    assert fake_storage.requests == []
+
+
+def test_estrategia_legacy_configurable(fake_storage, settings):
+    settings.SUPABASE_STORAGE_NAMING = "legacy"
+    storage = SupabaseStorageREST()
+
+    assert storage.get_available_name("documentos/certificado.pdf") == "documentos/certificado.pdf"
+    assert [m for m, _, _ in fake_storage.requests] == ["HEAD"]
+
+
+@pytest.mark.django_db
+def test_renombrar_documentos_existentes(usuario_estudiante):
+    justi = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+    doc = Documento.objects.create(justificacion=justi, archivo=SimpleUploadedFile("antiguo.pdf", b"contenido"))
+
+    call_command("renombrar_documentos", "--dry-run")
+    doc.refresh_from_db()
+    assert not is_uuid_name(doc.archivo.name)
+
+    call_command("renombrar_documentos", "--borrar-original")
+    doc.refresh_from_db()
+    assert is_uuid_name(doc.archivo.name)
+    assert doc.archivo.read() == b"contenido"
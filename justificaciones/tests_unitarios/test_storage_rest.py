@@ -0,0 +1,223 @@
+import io
+import pytest
+from unittest.mock import MagicMock, patch
+from asgiref.sync import async_to_sync
+from urllib3.exceptions import UnrewindableBodyError
+from urllib3.util.request import rewind_body, set_file_position
+from django.core.files.base import ContentFile, File
+from justificaciones import storage_http, storage_naming
+from justificaciones.storage_rest import SupabaseStorageREST
+
+
+@pytest.fixture
+def storage(settings):
+    settings.SUPABASE_URL = "https://example.supabase.co"
+    settings.SUPABASE_KEY = "clave"
+    storage_http.reset_session()
+    yield SupabaseStorageREST()
+    storage_http.reset_session()
+
+
+def test_session_compartida_entre_instancias(storage):
+    assert storage.session is SupabaseStorageREST().session
+
+
+def test_session_se_recrea_en_otro_proceso(storage):
+    primera = storage.session
+    with patch("justificaciones.storage_http.os.getpid", return_value=-1):
+        assert storage.session is not primera
+
+
+def test_session_configura_pool_y_reintentos(storage, settings):
+    settings.SUPABASE_STORAGE_RETRIES = 5
+    settings.SUPABASE_STORAGE_POOL_MAXSIZE = 7
+    adapter = storage.session.get_adapter("https://example.supabase.co")
+
+    assert adapter.max_retries.total == 5
+    assert 503 in adapter.max_retries.status_forcelist
+    assert "POST" not in adapter.max_retries.allowed_methods
+    assert adapter._pool_maxsize == 7
+
+
+def test_operaciones_usan_session_y_timeout(storage, settings):
+    settings.SUPABASE_STORAGE_TIMEOUTS = {"upload": (1, 2)}
+    session = MagicMock()
+    session.post.return_value.status_code = 200
+    session.head.return_value.status_code = 200
+    session.head.return_value.headers = {"Content-Length": "9"}
+
+    with patch.object(SupabaseStorageREST, "session", session):
+        storage._save("documentos/a.pdf", ContentFile(b"contenido", name="a.pdf"))
+        assert storage.size("documentos/b.pdf") == 9
+
+    assert session.post.call_args.kwargs["timeout"] == (1, 2)
+    assert session.head.call_args.kwargs["timeout"] == storage_http.DEFAULT_TIMEOUTS["metadata"]
+
+
+def test_subida_se_envia_en_streaming(fake_storage):
+    storage = SupabaseStorageREST()
+    datos = b"x" * (3 * 1024 * 1024)
+
+    storage._save("documentos/grande.pdf", ContentFile(datos, name="grande.pdf"))
+
+    _, _, headers = fake_storage.requests[-1]
+    assert headers["Content-Length"] == str(len(datos))
+    assert fake_storage.objects[("Documentos", "documentos/grande.pdf")].data == datos
+
+
+def test_subida_reanudable_sobre_umbral(fake_storage, settings):
+    settings.SUPABASE_STORAGE_RESUMABLE_THRESHOLD = 1000
+    settings.SUPABASE_STORAGE_RESUMABLE_CHUNK_SIZE = 1024
+    fake_storage.fail_next_patch = True
+    storage = SupabaseStorageREST()
+    datos = bytes(range(256)) * 20
+
+    storage._save("documentos/escaneo.pdf", ContentFile(datos, name="escaneo.pdf"))
+
+    metodos = [metodo for metodo, _, _ in fake_storage.requests]
+    assert metodos.count("PATCH") == 6  # 5 bloques + reintento tras el fallo
+    # Tras el fallo se relee un bloque completo desde el offset del servidor: solo el último es más corto
+    largos = [int(h["Content-Length"]) for m, _, h in fake_storage.requests if m == "PATCH"]
+    assert largos == [1024] * 5 + [512]
+    assert "HEAD" in metodos
+    assert fake_storage.objects[("Documentos", "documentos/escaneo.pdf")].data == datos
+
+
+class _ServidorTus:
+    """Servidor TUS mínimo que pierde parte de lo recibido en el segundo PATCH."""
+
+    def __init__(self):
+        self.recibido = bytearray()
+        self.offsets = []
+
+    def post(self, url, headers, timeout):
+        return MagicMock(status_code=201, headers={"Location": "/subida/1"})
+
+    def patch(self, url, data, headers, timeout):
+        offset = int(headers["Upload-Offset"])
+        self.offsets.append(offset)
+        if offset != len(self.recibido):
+            return MagicMock(status_code=409, text="offset")
+        self.recibido += data
+        if len(self.offsets) == 2:
+            del self.recibido[2:]  # se cayó y solo conservó los dos primeros bytes
+            return MagicMock(status_code=503, text="")
+        return MagicMock(status_code=204, headers={"Upload-Offset": str(len(self.recibido))})
+
+    def head(self, url, headers, timeout):
+        return MagicMock(status_code=200, headers={"Upload-Offset": str(len(self.recibido))})
+
+
+def test_subida_reanudable_retoma_desde_un_offset_anterior_al_bloque():
+    servidor = _ServidorTus()
+    datos = b"0123456789"
+
+    storage_http.tus_upload(
+        servidor, "https://example.supabase.co/tus", {}, "Documentos", "documentos/a.pdf",
+        ContentFile(datos, name="a.pdf"), "application/pdf", chunk_size=4,
+    )
+
+    assert bytes(servidor.recibido) == datos
+    assert servidor.offsets == [0, 4, 2, 6]
+
+
+class _FlujoSinSeek(io.RawIOBase):
+    """Como el cuerpo de una respuesta HTTP: se lee una sola vez, sin seek."""
+
+    def __init__(self, datos):
+        self.datos = io.BytesIO(datos)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self.datos.readinto(b)
+
+
+def test_subida_reanudable_sin_seek_falla():
+    servidor = _ServidorTus()
+    contenido = File(_FlujoSinSeek(b"0123456789"), name="a.pdf")
+    contenido.size = 10
+
+    with pytest.raises(Exception, match="cannot resume at byte 2"):
+        storage_http.tus_upload(
+            servidor, "https://example.supabase.co/tus", {}, "Documentos", "documentos/a.pdf",
+            contenido, "application/pdf", chunk_size=4,
+        )
+
+
+def test_cuerpo_de_subida_se_rebobina_para_reintentar():
+    datos = bytes(range(256)) * 300
+    cuerpo = storage_http.ChunkedReader(ContentFile(datos, name="a.pdf"))
+    posicion = set_file_position(cuerpo, None)
+    cuerpo.read(1000)
+
+    # Lo que hace urllib3 antes de reintentar un fallo de conexión
+    rewind_body(cuerpo, posicion)
+
+    assert cuerpo.read() == datos
+    with pytest.raises(io.UnsupportedOperation):
+        cuerpo.seek(10)
+    # Un cuerpo que no se puede releer falla en vez de reenviar bytes equivocados
+    flujo = File(_FlujoSinSeek(datos), name="a.pdf")
+    flujo.size = len(datos)
+    sin_seek = storage_http.ChunkedReader(flujo)
+    sin_seek.read(1000)
+    with pytest.raises(UnrewindableBodyError):
+        rewind_body(sin_seek, 0)
+
+
+def test_open_lee_en_streaming(fake_storage):
+    storage = SupabaseStorageREST()
+    datos = b"%PDF-1.4 " * 10000
+    storage._save("documentos/a.pdf", ContentFile(datos, name="a.pdf"))
+
+    archivo = storage.open("documentos/a.pdf")
+    assert archivo.response._content_consumed is False
+    assert archivo.size == len(datos)
+    assert archivo.read(9) == b"%PDF-1.4 "
+    assert b"".join(archivo.chunks()) == datos[9:]
+    archivo.close()
+
+
+def test_cliente_async_sube_y_lee_en_streaming(fake_storage):
+    storage = SupabaseStorageREST()
+    datos = b"%PDF-1.4 " * 20000
+
+    async def subir_y_leer():
+        nombre = await storage.asave("documentos/async.pdf", ContentFile(datos, name="async.pdf"))
+        metadata, contenido = await storage.astream(nombre)
+        return nombre, metadata, [parte async for parte in contenido]
+
+    nombre, metadata, partes = async_to_sync(subir_y_leer)()
+
+    assert storage_naming.is_uuid_name(nombre)
+    assert fake_storage.objects[("Documentos", nombre)].data == datos
+    assert metadata.size == len(datos)
+    assert len(partes) > 1 and b"".join(partes) == datos
+    assert storage.metadata(nombre) == metadata  # la descarga dejó la metadata en caché, sin HEAD
+    assert [m for m, _, _ in fake_storage.requests] == ["POST", "GET"]
+
+
+def test_rangos_y_urls_firmadas(fake_storage):
+    import requests
+
+    storage = SupabaseStorageREST()
+    datos = bytes(range(256)) * 100
+    nombre = storage.save("documentos/b.pdf", ContentFile(datos, name="b.pdf"))
+
+    assert b"".join(storage.open_range(nombre, (10, 19)).chunks()) == datos[10:20]
+    metadata, parte = async_to_sync(_leer_rango)(storage, nombre, (100, 199))
+    assert metadata.size == len(datos)
+    assert parte == datos[100:200]
+    assert fake_storage.requests[-1][2]["Range"] == "bytes=100-199"
+
+    firmada = storage.signed_url(nombre, 60)
+    assert requests.get(firmada, timeout=5).content == datos
+    assert requests.get(firmada.replace("token=", "token=1"), timeout=5).status_code == 400
+    assert async_to_sync(storage.asigned_url)(nombre, 60).startswith(f"{storage.storage_url}/object/sign/")
+
+
+async def _leer_rango(storage, nombre, rango):
+    metadata, contenido = await storage.astream(nombre, rango)
+    return metadata, b"".join([parte async for parte in contenido])
@@ -0,0 +1,185 @@
+import mmap
+import os
+import threading
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.base import ContentFile
+from justificaciones import storage_async
+from justificaciones.storage_cache import get_metadata_cache
+from justificaciones.storage_rest import SupabaseStorageREST
+from justificaciones.storage_tiered import TieredStorage
+
+
+@pytest.fixture
+def storage(fake_storage, tmp_path):
+    get_metadata_cache().clear()
+    return TieredStorage(backend=SupabaseStorageREST(), location=tmp_path / "cache", max_bytes=10_000)
+
+
+def _descargas(fake_storage) -> int:
+    return sum(1 for metodo, _, _ in fake_storage.requests if metodo == "GET")
+
+
+def test_escritura_directa_y_lectura_desde_disco(storage, fake_storage):
+    nombre = storage.save("documentos/a.pdf", ContentFile(b"%PDF-1.4 a" * 100, name="a.pdf"))
+
+    with storage.open(nombre) as archivo:
+        assert isinstance(archivo.file, mmap.mmap)
+        assert archivo.size == 1000
+        assert archivo.read(8) == b"%PDF-1.4"
+        assert b"".join(archivo.chunks()) == b"%PDF-1.4 a" * 100
+
+    assert fake_storage.objects[("Documentos", nombre)].data == b"%PDF-1.4 a" * 100
+    assert _descargas(fake_storage) == 0
+    assert storage.cache_stats()["hits"] == 1
+
+
+def test_fallo_descarga_una_vez(storage, fake_storage):
+    nombre = SupabaseStorageREST().save("documentos/b.pdf", ContentFile(b"remoto", name="b.pdf"))
+
+    for _ in range(3):
+        with storage.open(nombre) as archivo:
+            assert archivo.read() == b"remoto"
+
+    assert _descargas(fake_storage) == 1
+    assert storage.cache_stats()["hits"] == 2
+    assert storage.cache_stats()["misses"] == 1
+    assert storage.cache_stats()["hit_ratio"] == pytest.approx(2 / 3, abs=1e-4)
+
+
+def test_fallos_concurrentes_descargan_una_sola_vez(storage, fake_storage):
+    nombre = SupabaseStorageREST().save("documentos/c.pdf", ContentFile(b"c" * 5000, name="c.pdf"))
+    fake_storage.latency = 0.1
+    leidos = []
+
+    def leer():
+        with storage.open(nombre) as archivo:
+            leidos.append(archivo.read())
+
+    hilos = [threading.Thread(target=leer) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert leidos == [b"c" * 5000] * 4
+    assert _descargas(fake_storage) == 1
+
+
+def test_fallos_de_objetos_distintos_no_se_esperan(storage, fake_storage):
+    # Dos objetos cuyas copias caen en el mismo subdirectorio
+    nombres = [f"documentos/{i}.pdf" for i in range(100)]
+    a, b = next((x, y) for x in nombres for y in nombres if x < y and storage._path(x).parent == storage._path(y).parent)
+    for nombre in (a, b):
+        SupabaseStorageREST()._save(nombre, ContentFile(b"x", name="x.pdf"))
+    leido = threading.Event()
+
+    def leer_b():
+        with storage.open(b) as archivo:
+            archivo.read()
+        leido.set()
+
+    with storage._flock(storage._fill_lock(a)):  # otro proceso descargando a
+        hilo = threading.Thread(target=leer_b)
+        hilo.start()
+        assert leido.wait(5)
+    hilo.join()
+
+
+def test_objeto_mayor_que_la_cache_se_lee_del_backend(storage, fake_storage):
+    nombre = SupabaseStorageREST().save("documentos/grande.pdf", ContentFile(b"g" * 20_000, name="grande.pdf"))
+
+    for _ in range(2):
+        with storage.open(nombre) as archivo:
+            assert archivo.read() == b"g" * 20_000
+
+    assert not (storage.location / "tmp").exists()  # ni siquiera se escribió una copia temporal
+    assert _descargas(fake_storage) == 2
+
+
+def test_delete_invalida_la_copia_local(storage, fake_storage):
+    nombre = storage.save("documentos/d.pdf", ContentFile(b"d", name="d.pdf"))
+    storage.delete(nombre)
+
+    assert not storage.exists(nombre)
+    with pytest.raises(FileNotFoundError):
+        storage.open(nombre)
+
+
+def test_expulsa_por_tamano_y_por_antiguedad(storage):
+    storage.max_bytes = 10 ** 6  # sin barridos automáticos mientras se llena
+    viejo = storage.save("documentos/viejo.pdf", ContentFile(b"v" * 100, name="viejo.pdf"))
+    antes = time.time() - 30 * 24 * 3600
+    os.utime(storage._path(viejo), (antes, antes))
+    nombres = [storage.save(f"documentos/{i}.pdf", ContentFile(b"x" * 4000, name=f"{i}.pdf")) for i in range(3)]
+    # El más reciente en leerse se conserva aunque se haya subido primero
+    hace_rato = time.time() - 120
+    for nombre in nombres[1:]:
+        os.utime(storage._path(nombre), (hace_rato, hace_rato))
+
+    storage.max_bytes = 10_000
+    assert storage.sweep() == 2
+
+    assert not storage._path(viejo).exists()
+    assert storage._path(nombres[0]).exists()
+    assert [storage._path(n).exists() for n in nombres[1:]].count(True) == 1
+    assert storage.cache_stats()["disk_bytes"] <= 10_000
+
+
+def test_asave_escribe_en_la_cache(storage, fake_storage):
+    nombre = async_to_sync(storage.asave)("documentos/e.pdf", ContentFile(b"e" * 300, name="e.pdf"))
+
+    assert storage._path(nombre).read_bytes() == b"e" * 300
+    assert fake_storage.objects[("Documentos", nombre)].data == b"e" * 300
+
+
+async def _leer(cuerpo, hasta=None) -> bytes:
+    partes = []
+    async for parte in cuerpo:
+        partes.append(parte)
+        if hasta is not None and sum(map(len, partes)) >= hasta:
+            await cuerpo.aclose()  # el cliente se desconecta
+            break
+    return b"".join(partes)
+
+
+def test_astream_sin_copia_transmite_del_backend_y_llena_la_cache(storage, fake_storage):
+    storage.max_bytes = 10 ** 6
+    datos = bytes(range(256)) * 1024  # varios chunks
+    nombre = SupabaseStorageREST().save("documentos/f.pdf", ContentFile(datos, name="f.pdf"))
+
+    @async_to_sync
+    async def leer(byte_range=None, hasta=None):
+        metadata, cuerpo = await storage.astream(nombre, byte_range)
+        return metadata.size, await _leer(cuerpo, hasta)
+
+    assert leer((10, 19)) == (len(datos), datos[10:20])
+    assert leer(hasta=1) == (len(datos), datos[:storage_async.STREAM_CHUNK_SIZE])
+    assert not storage._path(nombre).exists()  # ni rangos ni lecturas cortadas quedan en disco
+    assert not list((storage.location / "tmp").iterdir())
+
+    assert leer() == (len(datos), datos)
+    assert storage._path(nombre).read_bytes() == datos
+    descargas = _descargas(fake_storage)
+    assert leer((10, 19)) == (len(datos), datos[10:20])
+    assert _descargas(fake_storage) == descargas  # ya se sirve desde el disco
+
+
+def test_open_range_y_signed_url_delegan_al_backend(storage, fake_storage):
+    datos = b"0123456789" * 100
+    nombre = SupabaseStorageREST().save("documentos/g.pdf", ContentFile(datos, name="g.pdf"))
+
+    with storage.open_range(nombre, (5, 14)) as archivo:
+        assert archivo.read() == datos[5:15]
+    assert [h.get("Range") for m, _, h in fake_storage.requests if m == "GET"] == ["bytes=5-14"]
+    assert not storage._path(nombre).exists()
+
+    storage.open(nombre).close()
+    with storage.open_range(nombre, (5, 14)) as archivo:
+        assert archivo.read() == datos[5:15]
+    with storage.open_range(nombre) as archivo:
+        assert archivo.read() == datos
+    assert _descargas(fake_storage) == 2
+
+    assert "token=" in storage.signed_url(nombre, 60)
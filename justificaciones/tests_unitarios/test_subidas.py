@@ -0,0 +1,177 @@
+import hashlib
+from datetime import timedelta
+import pytest
+import requests
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.utils import timezone
+from justificaciones import muestras, tareas, views
+from justificaciones.models import Documento, Justificacion, Tarea
+from justificaciones.presupuesto import verificar_presupuesto
+from justificaciones.storage_rest import SupabaseStorageREST
+
+PDF = muestras.pdf()
+
+
+@pytest.fixture
+def storage(fake_storage, monkeypatch):
+    storage = SupabaseStorageREST()
+    monkeypatch.setattr(Documento._meta.get_field("archivo"), "storage", storage)
+    return storage
+
+
+def _firmar(cliente, datos=PDF, nombre="certificado.pdf", tipo="application/pdf", sha256=None):
+    return cliente.post(reverse("subida_firmar"), {
+        "nombre": nombre,
+        "tamano": len(datos),
+        "tipo": tipo,
+        "sha256": sha256 or hashlib.sha256(datos).hexdigest(),
+    })
+
+
+def _enviar(cliente, token):
+    return cliente.post(reverse("justificacion_create"), {
+        "fecha_inicio": "2025-01-01",
+        "motivo": "Enfermedad",
+        "subida_token": token,
+    })
+
+
+def _objetos_subidos_por_django(fake_storage):
+    # Los PUT son del navegador; un POST al objeto sería una subida pasando por Django
+    return [p for m, p, _ in fake_storage.requests if m == "POST" and "/sign/" not in p]
+
+
+def test_url_de_subida_firmada(storage, fake_storage):
+    url = storage.signed_upload_url("documentos/a.pdf")
+
+    assert requests.put(url, data=b"%PDF-1.4", headers={"Content-Type": "application/pdf"}, timeout=5).status_code == 200
+    assert fake_storage.objects[("Documentos", "documentos/a.pdf")].data == b"%PDF-1.4"
+    assert requests.put(url, data=b"otro", timeout=5).status_code == 400  # la clave ya existe
+    # Un token de descarga no sirve para subir
+    descarga = storage.signed_url("documentos/a.pdf", 60)
+    token = descarga.split("token=")[1]
+    assert requests.put(url.split("token=")[0] + "token=" + token, data=b"x", timeout=5).status_code == 400
+
+
+@pytest.mark.django_db
+def test_subida_directa_completa(cliente_estudiante, storage, fake_storage):
+    with verificar_presupuesto(views.subida_firmar):
+        firmada = _firmar(cliente_estudiante).json()
+    assert firmada["ok"] is True
+    assert requests.put(firmada["url"], data=PDF, headers={"Content-Type": "application/pdf"}, timeout=5).ok
+
+    with verificar_presupuesto(views.justificacion_create):
+        resp = _enviar(cliente_estudiante, firmada["token"])
+
+    documento = Documento.objects.select_related("justificacion").get()
+    assert resp.status_code == 302
+    assert resp["Location"] == reverse("justificacion_detail", args=[documento.justificacion_id])
+    assert documento.archivo.name.startswith("documentos/") and documento.archivo.name.endswith("-certificado.pdf")
+    assert documento.sha256 == ""  # hasta que la tarea lo verifique
+    assert _objetos_subidos_por_django(fake_storage) == []
+    # Solo se leyó el inicio del objeto
+    assert [h.get("Range") for m, _, h in fake_storage.requests if m == "GET"] == ["bytes=0-4"]
+
+    tareas.procesar_pendientes()
+    tareas.procesar_pendientes()
+
+    documento.refresh_from_db()
+    assert documento.sha256 == hashlib.sha256(PDF).hexdigest()
+    assert documento.legible is True
+    assert set(Tarea.objects.values_list("tipo", flat=True)) >= {"verificar_subida", "validar_documento"}
+
+
+@pytest.mark.django_db
+def test_confirmacion_rechaza_un_objeto_distinto(cliente_estudiante, storage, fake_storage):
+    firmada = _firmar(cliente_estudiante).json()
+    requests.put(firmada["url"], data=b"no es un pdf", headers={"Content-Type": "application/pdf"}, timeout=5)
+
+    resp = _enviar(cliente_estudiante, firmada["token"])
+
+    assert resp.status_code == 200
+    assert "no coincide con el seleccionado" in resp.context["doc_form"].errors["archivo"][0]
+    assert not Justificacion.objects.exists()
+    assert not fake_storage.objects  # se descartó lo subido
+
+
+@pytest.mark.django_db
+def test_token_invalido_expirado_o_sin_subir(cliente_estudiante, storage, settings):
+    firmada = _firmar(cliente_estudiante).json()
+    assert "no llegó al storage" in _enviar(cliente_estudiante, firmada["token"]).context["doc_form"].errors["archivo"][0]
+    assert "no es válida" in _enviar(cliente_estudiante, firmada["token"] + "x").context["doc_form"].errors["archivo"][0]
+
+    settings.SUBIDA_DIRECTA_SEGUNDOS = -1
+    assert "expiró" in _enviar(cliente_estudiante, firmada["token"]).context["doc_form"].errors["archivo"][0]
+    assert not Justificacion.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("nombre, tipo, sha256, error", [
+    ("notas.txt", "text/plain", None, "Formato no permitido"),
+    ("certificado.pdf", "image/png", None, "PDF o una imagen PNG"),
+    ("certificado.pdf", "application/pdf", "abc", "hash"),
+])
+def test_firmar_valida_lo_declarado(cliente_estudiante, storage, nombre, tipo, sha256, error):
+    resp = _firmar(cliente_estudiante, nombre=nombre, tipo=tipo, sha256=sha256)
+
+    assert resp.status_code == 400
+    assert error in resp.json()["error"]
+
+
+@pytest.mark.django_db
+def test_sin_storage_que_firme_se_sube_con_el_formulario(cliente_estudiante):
+    # FileSystemStorage no firma subidas: el formulario envía el archivo como siempre
+    assert _firmar(cliente_estudiante).status_code == 404
+
+
+@pytest.mark.django_db
+def test_verificacion_deduplica_y_detecta_hash_distinto(cliente_estudiante, storage, fake_storage, usuario_estudiante):
+    existente = storage.save("documentos/existente.pdf", ContentFile(PDF, name="existente.pdf"))
+    justi = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+    Documento.objects.create(justificacion=justi, archivo=existente, sha256=hashlib.sha256(PDF).hexdigest())
+
+    repetido = _firmar(cliente_estudiante).json()
+    requests.put(repetido["url"], data=PDF, headers={"Content-Type": "application/pdf"}, timeout=5)
+    _enviar(cliente_estudiante, repetido["token"])
+    falso = _firmar(cliente_estudiante, sha256="0" * 64).json()
+    requests.put(falso["url"], data=PDF, headers={"Content-Type": "application/pdf"}, timeout=5)
+    _enviar(cliente_estudiante, falso["token"])
+
+    tareas.procesar_pendientes()
+
+    duplicado, alterado = Documento.objects.exclude(justificacion=justi).order_by("pk")
+    assert duplicado.archivo.name == existente
+    assert {nombre for _, nombre in fake_storage.objects} == {existente, alterado.archivo.name}  # se borró la copia
+    assert (alterado.legible, alterado.observaciones_legibilidad) == (False, "el archivo recibido no coincide con el enviado")
+    assert alterado.sha256 == ""
+    assert not Tarea.objects.filter(tipo="validar_documento", payload__documento_id=alterado.pk).exists()
+
+
+def _vencer_limpiezas():
+    Tarea.objects.filter(tipo="limpiar_subida").update(disponible_en=timezone.now())
+
+
+@pytest.mark.django_db
+def test_subida_abandonada_se_borra_al_vencer_la_url(cliente_estudiante, storage, fake_storage):
+    abandonada = _firmar(cliente_estudiante).json()
+    requests.put(abandonada["url"], data=PDF, headers={"Content-Type": "application/pdf"}, timeout=5)
+    adjuntada = _firmar(cliente_estudiante).json()
+    requests.put(adjuntada["url"], data=PDF, headers={"Content-Type": "application/pdf"}, timeout=5)
+    _enviar(cliente_estudiante, adjuntada["token"])
+    sin_subir = _firmar(cliente_estudiante).json()
+    assert sin_subir["ok"] is True
+
+    # Mientras la URL sirve, la limpieza no corre
+    limpiezas = Tarea.objects.filter(tipo="limpiar_subida")
+    assert limpiezas.count() == 3
+    assert all(t.disponible_en > timezone.now() + timedelta(hours=2) for t in limpiezas)
+    tareas.procesar_pendientes()
+    assert len(fake_storage.objects) == 2
+
+    _vencer_limpiezas()
+    tareas.procesar_pendientes()
+
+    documento = Documento.objects.get()
+    assert {nombre for _, nombre in fake_storage.objects} == {documento.archivo.name}
+    assert set(limpiezas.values_list("estado", flat=True)) == {Tarea.Estado.COMPLETADA}
@@ -0,0 +1,58 @@
+import pytest
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from justificaciones import muestras, tareas, views
+from justificaciones.models import Documento, Tarea
+from justificaciones.presupuesto import verificar_presupuesto
+
+
+@pytest.mark.django_db
+def test_crear_justificacion_encola_validacion(cliente_estudiante):
+    with verificar_presupuesto(views.justificacion_create):
+        cliente_estudiante.post(reverse("justificacion_create"), {
+            "fecha_inicio": "2025-01-01",
+            "motivo": "Enfermedad",
+            "archivo": SimpleUploadedFile("c.pdf", muestras.pdf(), content_type="application/pdf"),
+        })
+    documento = Documento.objects.get()
+    assert documento.validado_en is None
+    assert Tarea.objects.get().tipo == "validar_documento"
+
+    call_command("procesar_tareas", "--once")
+
+    documento.refresh_from_db()
+    assert documento.legible is True
+    assert Tarea.objects.get(tipo="validar_documento").estado == Tarea.Estado.COMPLETADA
+    # Al validar se encolan sus miniaturas
+    assert Tarea.objects.filter(tipo="generar_miniaturas").exists()
+
+
+@pytest.mark.django_db
+def test_encolar_es_idempotente():
+    tareas.encolar("validar_documento", clave="validar_documento:1", documento_id=1)
+    tareas.encolar("validar_documento", clave="validar_documento:1", documento_id=1)
+
+    assert Tarea.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_reintentos_con_backoff_hasta_fallar(settings):
+    @tareas.tarea("siempre_falla")
+    def siempre_falla():
+        raise RuntimeError("boom")
+
+    t = tareas.encolar("siempre_falla", max_intentos=2)
+    assert tareas.procesar_pendientes() == 1
+    t.refresh_from_db()
+    assert t.estado == Tarea.Estado.PENDIENTE
+    assert t.disponible_en > timezone.now()
+    assert "boom" in t.error
+
+    Tarea.objects.filter(pk=t.pk).update(disponible_en=timezone.now() - timedelta(seconds=1))
+    tareas.procesar_pendientes()
+    t.refresh_from_db()
+    assert t.estado == Tarea.Estado.FALLIDA
+    assert t.intentos == 2
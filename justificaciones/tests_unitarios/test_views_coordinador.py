@@ -1,7 +1,9 @@
 import pytest
-from unittest.mock import patch
+from django.core import mail
 from django.urls import reverse
+from justificaciones import tareas, views
 from justificaciones.models import Justificacion, Notificacion
+from justificaciones.presupuesto import verificar_presupuesto
 
 
 @pytest.mark.django_db
@@ -13,8 +15,7 @@ def test_coordinador_aprueba(cliente_coordinador, usuario_estudiante):
     )
 
     url = reverse("coordinador_aprobar", args=[j.pk])
-
-    with patch("justificaciones.views.send_mail") as mock_mail:
+    with verificar_presupuesto(views.coordinador_aprobar):
         resp = cliente_coordinador.post(url, {"comentarios_coordinador": "OK"})
 
     assert resp.status_code == 302
@@ -23,10 +24,17 @@ def test_coordinador_aprueba(cliente_coordinador, usuario_estudiante):
     assert j.estado == "APROBADA"
     assert j.comentarios_coordinador == "OK"
 
-    # se creó la notificación
-    assert Notificacion.objects.filter(destinatario=usuario_estudiante).exists()
+    # la notificación queda en el outbox; el correo no se envía dentro del request
+    notif = Notificacion.objects.get(destinatario=usuario_estudiante, canal="email")
+    assert notif.estado == Notificacion.Estado.PENDIENTE
+    assert len(mail.outbox) == 0
+
+    tareas.procesar_pendientes()
 
-    mock_mail.assert_called_once()
+    notif.refresh_from_db()
+    assert notif.estado == Notificacion.Estado.ENVIADA
+    assert len(mail.outbox) == 1
+    assert "aprobada" in mail.outbox[0].subject
 
 
 @pytest.mark.django_db
@@ -38,7 +46,52 @@ def test_coordinador_rechaza(cliente_coordinador, usuario_estudiante):
     )
 
     url = reverse("coordinador_rechazar", args=[j.pk])
-    resp = cliente_coordinador.post(url, {"comentarios_coordinador": "NO"})
+    with verificar_presupuesto(views.coordinador_rechazar):
+        resp = cliente_coordinador.post(url, {"comentarios_coordinador": "NO"})
+
+    j.refresh_from_db()
+    assert j.estado == "RECHAZADA"
+
+
+@pytest.mark.django_db
+def test_revisar_lote(cliente_coordinador, usuario_estudiante):
+    pendientes = [
+        Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+        for _ in range(10)
+    ]
+    revisada = Justificacion.objects.create(
+        estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X", estado="RECHAZADA"
+    )
+    ids = [j.pk for j in pendientes] + [revisada.pk, 999999]
 
+    # La cantidad de consultas no depende de cuántas justificaciones se revisan
+    with verificar_presupuesto(views.coordinador_revisar_lote):
+        resp = cliente_coordinador.post(
+            reverse("coordinador_revisar_lote"),
+            {"ids": ids, "accion": "aprobar", "comentarios_coordinador": "OK",
+             f"comentario_{pendientes[0].pk}": "Revisado en persona"},
+            HTTP_ACCEPT="application/json",
+        )
+
+    resultados = resp.json()["resultados"]
+    assert all(resultados[str(j.pk)] == "APROBADA" for j in pendientes)
+    assert resultados[str(revisada.pk)] == "no_pendiente"
+    assert resultados["999999"] == "no_pendiente"
+
+    assert Justificacion.objects.filter(estado="APROBADA").count() == 10
+    assert Justificacion.objects.get(pk=pendientes[0].pk).comentarios_coordinador == "Revisado en persona"
+    assert Justificacion.objects.get(pk=pendientes[1].pk).comentarios_coordinador == "OK"
+    assert Notificacion.objects.filter(canal="email").count() == 10
+    revisada.refresh_from_db()
+    assert revisada.estado == "RECHAZADA"
+
+
+@pytest.mark.django_db
+def test_revisar_lote_desde_dashboard(cliente_coordinador, usuario_estudiante):
+    j = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+
+    resp = cliente_coordinador.post(reverse("coordinador_revisar_lote"), {"ids": [j.pk], "accion": "rechazar"})
+
+    assert resp.status_code == 302
     j.refresh_from_db()
     assert j.estado == "RECHAZADA"
@@ -1,6 +1,7 @@
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
-from justificaciones.models import Justificacion
+from justificaciones.models import Documento, Justificacion
 
 
 @pytest.mark.django_db
@@ -15,3 +16,25 @@ def test_estudiante_dashboard(cliente_estudiante, usuario_estudiante):
 
     assert resp.status_code == 200
     assert b"Prueba" in resp.content
+
+
+@pytest.mark.django_db
+def test_descarga_de_documento_con_permisos(client, usuario_estudiante, django_user_model):
+    justi = Justificacion.objects.create(estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X")
+    documento = Documento.objects.create(
+        justificacion=justi, archivo=SimpleUploadedFile("licencia.pdf", b"%PDF-1.4 licencia")
+    )
+    url = reverse("documento_descargar", args=[documento.pk])
+
+    resp = client.get(url)
+    assert resp.status_code == 302 and resp.url.startswith(f"{reverse('login')}?next=")
+
+    client.force_login(usuario_estudiante)
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert b"".join(resp.streaming_content) == b"%PDF-1.4 licencia"
+    assert resp["Content-Length"] == str(len(b"%PDF-1.4 licencia"))
+    assert resp["Content-Type"] == "application/pdf"
+
+    client.force_login(django_user_model.objects.create_user(username="otro", rol="ESTUDIANTE"))
+    assert client.get(url).status_code == 302
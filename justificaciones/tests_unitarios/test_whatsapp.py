@@ -1,6 +1,36 @@
+import hashlib
+import hmac
+import json
+import os
+import time
 import pytest
+from django.core.management import call_command
+from django.db import OperationalError
 from django.urls import reverse
+from justificaciones import bandeja, estadisticas, views, whatsapp
 from justificaciones.models import Justificacion
+from justificaciones.presupuesto import verificar_presupuesto
+
+
+@pytest.fixture(autouse=True)
+def bandeja_temporal(settings, tmp_path):
+    settings.WHATSAPP_BANDEJA_DIR = tmp_path / "bandeja"
+    settings.WHATSAPP_BANDEJA_FSYNC = False
+    settings.WHATSAPP_APP_SECRET = "secreto"
+    settings.WHATSAPP_WEBHOOK_TOKEN = ""
+    return settings.WHATSAPP_BANDEJA_DIR
+
+
+def _firma(cuerpo: bytes, secreto: str = "secreto") -> str:
+    return "sha256=" + hmac.new(secreto.encode(), cuerpo, hashlib.sha256).hexdigest()
+
+
+def _publicar(client, payload):
+    cuerpo = json.dumps(payload).encode()
+    return client.post(
+        reverse("whatsapp_recepcion"), data=cuerpo, content_type="application/json",
+        headers={"X-Hub-Signature-256": _firma(cuerpo)},
+    )
 
 
 @pytest.mark.django_db
@@ -12,12 +42,181 @@ def test_whatsapp_recepcion(usuario_estudiante, client):
         "fecha": "2025-01-10"
     }
 
-    resp = client.post(
-        reverse("whatsapp_recepcion"),
-        data=payload,
-        content_type="application/json"
-    )
+    # El webhook solo escribe en la bandeja: ninguna consulta a la base
+    with verificar_presupuesto(views.whatsapp_recepcion):
+        resp = _publicar(client, payload)
+
+    assert resp.status_code == 202
+    assert Justificacion.objects.count() == 0
+    assert bandeja.pendientes()["nuevos"] == 1
+
+    call_command("consumir_whatsapp", "--once")
 
-    assert resp.status_code == 200
     assert Justificacion.objects.count() == 1
     assert Justificacion.objects.first().fuente == "whatsapp"
+    assert bandeja.pendientes() == {"nuevos": 0, "procesando": 0, "fallidos": 0}
+
+
+@pytest.mark.django_db
+def test_json_invalido_se_rechaza_en_el_webhook(client):
+    resp = client.post(
+        reverse("whatsapp_recepcion"), data=b"no es json", content_type="application/json",
+        headers={"X-Hub-Signature-256": _firma(b"no es json")},
+    )
+
+    assert resp.status_code == 400
+    assert bandeja.pendientes()["nuevos"] == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cabeceras", [
+    {},
+    {"X-Hub-Signature-256": "sha256=" + "0" * 64},
+    {"X-Hub-Signature-256": "firma-ñ"},
+    {"Authorization": "Bearer secreto"},
+], ids=["sin-firma", "firma-incorrecta", "firma-no-ascii", "token-sin-configurar"])
+def test_webhook_sin_firma_responde_403(usuario_estudiante, client, cabeceras):
+    cuerpo = json.dumps({"username": usuario_estudiante.username, "fecha": "2025-01-10"}).encode()
+
+    resp = client.post(reverse("whatsapp_recepcion"), data=cuerpo, content_type="application/json", headers=cabeceras)
+
+    assert resp.status_code == 403
+    assert bandeja.pendientes()["nuevos"] == 0
+
+
+@pytest.mark.django_db
+def test_webhook_con_token_compartido(usuario_estudiante, client, settings):
+    settings.WHATSAPP_APP_SECRET = ""
+    settings.WHATSAPP_WEBHOOK_TOKEN = "token"
+    cuerpo = json.dumps({"username": usuario_estudiante.username, "fecha": "2025-01-10"}).encode()
+    url = reverse("whatsapp_recepcion")
+
+    assert client.post(url, data=cuerpo, content_type="application/json", headers={"X-Hub-Signature-256": _firma(cuerpo)}).status_code == 403
+    assert client.post(url, data=cuerpo, content_type="application/json", headers={"Authorization": "Bearer token"}).status_code == 202
+
+
+@pytest.mark.django_db
+def test_reintento_del_proveedor_no_duplica(usuario_estudiante, client):
+    payload = {"id": "wamid.1", "username": usuario_estudiante.username, "fecha": "2025-01-10"}
+
+    _publicar(client, payload)
+    bandeja.procesar()
+    _publicar(client, payload)
+    bandeja.procesar()
+
+    assert Justificacion.objects.get().clave_idempotencia == "whatsapp:wamid.1"
+
+
+@pytest.mark.django_db
+def test_lote_con_rechazados_a_fallidos(usuario_estudiante, client, django_user_model, django_assert_max_num_queries):
+    otro = django_user_model.objects.create_user(username="otro", rol="ESTUDIANTE")
+    Justificacion.objects.create(
+        estudiante=usuario_estudiante, fecha_inicio="2025-01-01", motivo="X", clave_idempotencia="whatsapp:ya"
+    )
+    mensajes = [
+        {"id": f"m{i}", "username": [usuario_estudiante.username, otro.username][i % 2], "fecha": "2025-01-10"}
+        for i in range(20)
+    ] + [
+        {"id": "m0", "username": usuario_estudiante.username, "fecha": "2025-01-10"},  # repetido en el lote
+        {"id": "ya", "username": usuario_estudiante.username, "fecha": "2025-01-10"},  # ingerido antes
+        {"id": "x1", "username": "nadie", "fecha": "2025-01-10"},
+        {"id": "x2", "username": otro.username, "fecha": "10/01/2025"},
+    ]
+    _publicar(client, {"mensajes": mensajes[:12]})
+    _publicar(client, mensajes[12:])
+
+    # Consultas constantes para toda la tanda: usuarios, claves existentes, bulk_create y contadores
+    with django_assert_max_num_queries(10):
+        assert bandeja.procesar() == 2
+
+    assert Justificacion.objects.filter(fuente="whatsapp").count() == 20
+    assert Justificacion.objects.filter(estudiante=otro, texto_busqueda__contains="whatsapp").count() == 10
+    assert estadisticas.diferencias() == {}
+    assert bandeja.pendientes()["fallidos"] == 1
+    (error,) = (bandeja.directorio() / bandeja.FALLIDOS).glob("*.error")
+    assert "usuario desconocido: nadie" in error.read_text()
+
+    # Una vez creado el usuario, el lote de rechazados se reingresa
+    django_user_model.objects.create_user(username="nadie", rol="ESTUDIANTE")
+    call_command("consumir_whatsapp", "--once", "--reintentar-fallidos")
+
+    assert Justificacion.objects.filter(estudiante__username="nadie").count() == 1
+    assert bandeja.pendientes()["fallidos"] == 1  # la fecha inválida sigue rechazada
+
+
+@pytest.mark.django_db
+def test_error_de_base_reintenta_y_termina_en_fallidos(usuario_estudiante, client, settings, monkeypatch):
+    settings.WHATSAPP_BANDEJA_MAX_INTENTOS = 2
+
+    def caida(mensajes):
+        raise OperationalError("server closed the connection unexpectedly")
+
+    monkeypatch.setattr(whatsapp, "ingerir", caida)
+    _publicar(client, {"id": "wamid.9", "username": usuario_estudiante.username, "fecha": "2025-01-10"})
+
+    assert bandeja.procesar() == 1
+    (pendiente,) = (bandeja.directorio() / bandeja.NUEVOS).iterdir()
+    assert pendiente.name.endswith(".1")
+    assert pendiente.stat().st_mtime > time.time()  # backoff: aún no se vuelve a tomar
+    assert bandeja.procesar() == 0
+
+    os.utime(pendiente, (0, 0))
+    bandeja.procesar()
+
+    assert bandeja.pendientes() == {"nuevos": 0, "procesando": 0, "fallidos": 1}
+    (error,) = (bandeja.directorio() / bandeja.FALLIDOS).glob("*.error")
+    assert "OperationalError" in error.read_text()
+
+
+@pytest.mark.django_db
+def test_archivo_abandonado_en_procesando_se_recupera(usuario_estudiante, client, settings):
+    _publicar(client, {"id": "wamid.5", "username": usuario_estudiante.username, "fecha": "2025-01-10"})
+    (entrada,) = bandeja.reclamar()  # el consumidor muere sin terminar
+    os.utime(entrada.ruta, (0, 0))
+
+    assert bandeja.procesar() == 1
+    assert Justificacion.objects.filter(clave_idempotencia="whatsapp:wamid.5").exists()
+
+
+@pytest.mark.parametrize("datos, error", [
+    ({"username": "alumno", "fecha": "2025-01-10", "motivo": 5}, "motivo no es texto"),
+    ({"username": "alumno", "fecha": "2025-01-10", "descripcion": {"a": 1}}, "descripcion no es texto"),
+    ({"username": ["alumno"], "fecha": "2025-01-10"}, "username no es texto"),
+    ({"id": {"x": 1}, "username": "alumno", "fecha": "2025-01-10"}, "id no es texto"),
+    ({"username": "alumno", "fecha": 20250110}, "fecha no es texto"),
+])
+def test_campos_que_no_son_texto_rechazan_el_mensaje(datos, error):
+    mensaje = whatsapp.Mensaje.desde_payload(datos)
+
+    assert mensaje.error.startswith(error)
+
+
+@pytest.mark.django_db
+def test_payload_malformado_no_bloquea_el_lote(usuario_estudiante, client, settings, monkeypatch):
+    settings.WHATSAPP_BANDEJA_MAX_INTENTOS = 2
+    _publicar(client, {"id": "wamid.7", "username": usuario_estudiante.username, "fecha": "2025-01-10", "motivo": 5})
+    _publicar(client, {"id": "wamid.8", "username": usuario_estudiante.username, "fecha": "2025-01-10"})
+
+    assert bandeja.procesar() == 2
+    assert Justificacion.objects.get().clave_idempotencia == "whatsapp:wamid.8"
+    assert bandeja.pendientes() == {"nuevos": 0, "procesando": 0, "fallidos": 1}
+    (error,) = (bandeja.directorio() / bandeja.FALLIDOS).glob("*.error")
+    assert "motivo no es texto" in error.read_text()
+
+    # Un error inesperado al leer un archivo cuenta como intento y termina en fallidos
+    original = whatsapp.leer_payload
+
+    def falla_con_el_9(datos):
+        if datos.get("id") == "wamid.9":
+            raise TypeError("'int' object is not subscriptable")
+        return original(datos)
+
+    monkeypatch.setattr(whatsapp, "leer_payload", falla_con_el_9)
+    _publicar(client, {"id": "wamid.9", "username": usuario_estudiante.username, "fecha": "2025-01-10"})
+    bandeja.procesar()
+    (pendiente,) = (bandeja.directorio() / bandeja.NUEVOS).iterdir()
+    assert pendiente.name.endswith(".1")
+    os.utime(pendiente, (0, 0))
+    bandeja.procesar()
+
+    assert bandeja.pendientes() == {"nuevos": 0, "procesando": 0, "fallidos": 2}
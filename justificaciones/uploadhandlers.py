@@ -0,0 +1,34 @@
+"""
+Upload handlers que calculan el SHA-256 del archivo mientras se recibe,
+sin una segunda lectura. El resultado queda en ``archivo.sha256``.
+"""
+from __future__ import annotations
+import hashlib
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingUploadMixin:
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        pendiente = super().receive_data_chunk(raw_data, start)
+        if pendiente is None:
+            # Este handler se quedó con el bloque
+            self.hasher.update(raw_data)
+        return pendiente
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        if archivo is not None:
+            archivo.sha256 = self.hasher.hexdigest()
+        return archivo
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
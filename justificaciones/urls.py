@@ -6,12 +6,17 @@ urlpatterns = [
     path("", views.estudiante_dashboard, name="estudiante_dashboard"),
     path("mis/", views.justificacion_list, name="justificacion_list"),
     path("nueva/", views.justificacion_create, name="justificacion_create"),
+    path("nueva/subida/", views.subida_firmar, name="subida_firmar"),
     path("detalle/<int:pk>/", views.justificacion_detail, name="justificacion_detail"),
+    path("documento/<int:pk>/descargar/", views.documento_descargar, name="documento_descargar"),
+    path("documento/<int:pk>/vista/<str:variante>/", views.documento_vista_previa, name="documento_vista_previa"),
+    path("detalle/<int:pk>/miniatura/", views.justificacion_miniatura, name="justificacion_miniatura"),
 
     # Coordinador
     path("coordinador/", views.coordinador_dashboard, name="coordinador_dashboard"),
     path("coordinador/revisar/<int:pk>/aprobar/", views.coordinador_aprobar, name="coordinador_aprobar"),
     path("coordinador/revisar/<int:pk>/rechazar/", views.coordinador_rechazar, name="coordinador_rechazar"),
+    path("coordinador/revisar/lote/", views.coordinador_revisar_lote, name="coordinador_revisar_lote"),
 
     # Profesor
     path("profesor/", views.profesor_dashboard, name="profesor_dashboard"),
@@ -1,161 +1,429 @@
 from __future__ import annotations
+import json
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.contrib.auth.views import redirect_to_login
+from django.db import transaction
+from django.db.models import Case, QuerySet, TextField, Value, When
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
-from accounts.models import Usuario
+from . import bandeja, descargas, estadisticas, fragmentos, miniaturas, subidas, whatsapp
+from .busqueda import get_motor
+from .condicional import pagina_condicional
 from .forms import JustificacionForm, DocumentoForm
-from .models import Justificacion, Documento, Notificacion
+from .models import Justificacion, Documento
+from .notificaciones import notificar_cambio_estado
+from .paginacion import ORDEN_ANTIGUAS, paginar
+from .presupuesto import presupuesto_consultas
+from .tareas import encolar_validacion, encolar_verificacion
 
 
 def require_role(*roles: str):
+    """
+    Exige sesión iniciada y, si se indican, uno de los roles. Acepta vistas
+    async: el usuario se obtiene con ``auser()`` y queda en ``request.user``
+    para que la vista y el template no vuelvan a consultarlo.
+    """
+    def rechazo(request: HttpRequest, usuario) -> HttpResponse | None:
+        if not usuario.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if roles and getattr(usuario, "rol", None) not in roles:
+            messages.error(request, "No tienes permisos para acceder a esta sección.")
+            return redirect("home")
+        return None
+
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async(request: HttpRequest, *args, **kwargs):
+                request.user = await request.auser()
+                return rechazo(request, request.user) or await view_func(request, *args, **kwargs)
+            return _wrapped_async
+
+        @wraps(view_func)
         def _wrapped(request: HttpRequest, *args, **kwargs):
-            if not request.user.is_authenticated:
-                return redirect("login")
-            if roles and getattr(request.user, "rol", None) not in roles:
-                messages.error(request, "No tienes permisos para acceder a esta sección.")
-                return redirect("home")
-            return view_func(request, *args, **kwargs)
+            return rechazo(request, request.user) or view_func(request, *args, **kwargs)
         return _wrapped
     return decorator
 
 
+def _puede_ver(usuario, justi: Justificacion) -> bool:
+    return _puede_ver_de(usuario, justi.estudiante_id)
+
+
+def _puede_ver_de(usuario, estudiante_id: int) -> bool:
+    return usuario.is_superuser or usuario.is_coordinador() or usuario.is_profesor() or estudiante_id == usuario.id
+
+
+# Planes de carga: qué relaciones trae cada vista para que el template no haga consultas por fila
+
+def _plan_listado(qs: QuerySet[Justificacion]) -> QuerySet[Justificacion]:
+    return qs.select_related("estudiante")
+
+
+def _plan_detalle(qs: QuerySet[Justificacion]) -> QuerySet[Justificacion]:
+    # Los documentos se leen una sola vez dentro del fragmento cacheado ({% with %} en el template)
+    return qs.select_related("estudiante")
+
+
+# Querysets de los listados, antes de paginar; test_planes_consulta revisa sus planes
+
+def _consulta_propia(usuario) -> QuerySet[Justificacion]:
+    return _plan_listado(Justificacion.objects.filter(estudiante=usuario))
+
+
+def _consulta_global() -> QuerySet[Justificacion]:
+    return _plan_listado(Justificacion.objects.all())
+
+
+def _consulta_pendientes() -> QuerySet[Justificacion]:
+    return _plan_listado(Justificacion.objects.filter(estado=Justificacion.Estado.PENDIENTE))
+
+
+# Estado para el GET condicional: ámbito del sello de versión, o None sin acceso
+
+def _estado_propio(request: HttpRequest):
+    return request.user.pk
+
+
+def _estado_global(request: HttpRequest):
+    return fragmentos.GLOBAL
+
+
+def _estado_listado(request: HttpRequest):
+    if request.user.is_coordinador() or request.user.is_profesor():
+        return _estado_global(request)
+    return _estado_propio(request)
+
+
+def _estado_detalle(request: HttpRequest, pk: int):
+    # Inexistente o ajena: la vista responde 404 o redirige, nunca un 304
+    estudiante_id = Justificacion.objects.filter(pk=pk).values_list("estudiante_id", flat=True).first()
+    if estudiante_id is None or not _puede_ver_de(request.user, estudiante_id):
+        return None
+    return estudiante_id
+
+
+@presupuesto_consultas(3)
 @login_required
 @require_role("ESTUDIANTE", "ADMINISTRATIVO")
+@pagina_condicional(_estado_propio)
 def estudiante_dashboard(request: HttpRequest) -> HttpResponse:
-    justificaciones = Justificacion.objects.filter(estudiante=request.user).order_by("-created_at")
+    justificaciones = paginar(request, _consulta_propia(request.user))
     return render(request, "justificaciones/estudiante_dashboard.html", {"justificaciones": justificaciones})
 
 
+@presupuesto_consultas(3)
 @login_required
+@pagina_condicional(_estado_listado)
 def justificacion_list(request: HttpRequest) -> HttpResponse:
     if request.user.is_coordinador() or request.user.is_profesor():
-        qs = Justificacion.objects.all().order_by("-created_at")
+        qs, ambito = _consulta_global(), None
     else:
-        qs = Justificacion.objects.filter(estudiante=request.user).order_by("-created_at")
-    return render(request, "justificaciones/justificacion_list.html", {"justificaciones": qs})
+        qs, ambito = _consulta_propia(request.user), request.user.pk
+    return render(
+        request,
+        "justificaciones/justificacion_list.html",
+        {"justificaciones": paginar(request, qs), "ambito": ambito},
+    )
 
 
-@login_required
+@presupuesto_consultas(12)
 @require_role("ESTUDIANTE", "ADMINISTRATIVO")
-def justificacion_create(request: HttpRequest) -> HttpResponse:
+async def justificacion_create(request: HttpRequest) -> HttpResponse:
+    # Async: bajo ASGI la subida a Supabase se espera sin ocupar un hilo del servidor
     if request.method == "POST":
         form = JustificacionForm(request.POST)
         doc_form = DocumentoForm(request.POST, request.FILES)
+        token = request.POST.get("subida_token", "")
+        if token:
+            # El navegador ya subió el archivo directo al storage (subidas.py): llega solo el token
+            doc_form.fields["archivo"].required = False
         if form.is_valid() and doc_form.is_valid():
-            justi: Justificacion = form.save(commit=False)
-            justi.estudiante = request.user
-            justi.fuente = "app"
-            justi.save()
-            if doc_form.cleaned_data.get("archivo"):
-                documento: Documento = doc_form.save(commit=False)
-                documento.justificacion = justi
-                documento.save()
-                documento.validar_legibilidad()
-            messages.success(request, "Justificación enviada correctamente.")
-            return redirect("justificacion_detail", pk=justi.pk)
-        else:
-            # Mensaje de error
-            messages.error(
-                request,
-                "Ocurrió un error al enviar la justificación. "
-                "Por favor revisa los campos del formulario e inténtalo nuevamente."
-            )
+            documento: Documento | None = None
+            sha256 = ""
+            try:
+                if token:
+                    documento, sha256 = await subidas.aconfirmar(request.user, token)
+                elif doc_form.cleaned_data.get("archivo"):
+                    documento = doc_form.save(commit=False)
+                    await documento.asubir_archivo()
+            except subidas.SubidaInvalida as e:
+                doc_form.add_error("archivo", str(e))
+            else:
+                justi: Justificacion = form.save(commit=False)
+                justi.estudiante = request.user
+                justi.fuente = "app"
+                await justi.asave()
+                if documento is not None:
+                    documento.justificacion = justi
+                    await documento.asave()
+                    # La validación corre en segundo plano (manage.py procesar_tareas)
+                    if sha256:
+                        await sync_to_async(encolar_verificacion)(documento, sha256)
+                    else:
+                        await sync_to_async(encolar_validacion)(documento)
+                messages.success(request, "Justificación enviada correctamente.")
+                return redirect("justificacion_detail", pk=justi.pk)
+        # Mensaje de error
+        messages.error(
+            request,
+            "Ocurrió un error al enviar la justificación. "
+            "Por favor revisa los campos del formulario e inténtalo nuevamente."
+        )
     else:
         form = JustificacionForm()
         doc_form = DocumentoForm()
     return render(request, "justificaciones/justificacion_form.html", {"form": form, "doc_form": doc_form})
 
 
+@presupuesto_consultas(3)
+@require_role("ESTUDIANTE", "ADMINISTRATIVO")
+@require_http_methods(["POST"])
+async def subida_firmar(request: HttpRequest) -> HttpResponse:
+    """
+    Primer paso de la subida directa (ver subidas.py). POST: nombre, tamano,
+    tipo y sha256 del archivo elegido. Responde {"ok": true, "url", "token"};
+    404 si el storage no admite subidas directas, y el formulario entonces
+    envía el archivo junto con el resto de los campos.
+    """
+    tamano = request.POST.get("tamano", "")
+    try:
+        firmada = await subidas.afirmar(
+            request.user,
+            request.POST.get("nombre", ""),
+            int(tamano) if tamano.isdigit() else 0,
+            request.POST.get("tipo", ""),
+            request.POST.get("sha256", "").lower(),
+        )
+    except subidas.SubidaInvalida as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    if firmada is None:
+        return JsonResponse({"ok": False, "error": "Subida directa no disponible."}, status=404)
+    return JsonResponse({"ok": True, **firmada})
+
+
+@presupuesto_consultas(5)
 @login_required
+@pagina_condicional(_estado_detalle)
 def justificacion_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    justi = get_object_or_404(Justificacion, pk=pk)
-    if not (request.user.is_superuser or request.user.is_coordinador() or request.user.is_profesor() or justi.estudiante_id == request.user.id):
+    justi = get_object_or_404(_plan_detalle(Justificacion.objects.all()), pk=pk)
+    if not _puede_ver(request.user, justi):
         messages.error(request, "No tienes permisos para ver esta justificación.")
         return redirect("home")
     return render(request, "justificaciones/justificacion_detail.html", {"justificacion": justi})
 
 
+@presupuesto_consultas(4)
 @login_required
 @require_role("COORDINADOR")
+@pagina_condicional(_estado_global)
 def coordinador_dashboard(request: HttpRequest) -> HttpResponse:
-    pendientes = Justificacion.objects.filter(estado=Justificacion.Estado.PENDIENTE).order_by("created_at")
-    return render(request, "justificaciones/coordinador_dashboard.html", {"pendientes": pendientes})
+    # Las más antiguas primero: se revisan por orden de llegada
+    pendientes = paginar(request, _consulta_pendientes(), ORDEN_ANTIGUAS)
+    return render(
+        request,
+        "justificaciones/coordinador_dashboard.html",
+        {"pendientes": pendientes, "contadores": SimpleLazyObject(estadisticas.contadores)},
+    )
 
 
+@presupuesto_consultas(11)
 @login_required
 @require_role("COORDINADOR")
 @require_http_methods(["POST"]) 
 def coordinador_aprobar(request: HttpRequest, pk: int) -> HttpResponse:
-    justi = get_object_or_404(Justificacion, pk=pk)
     comentario = request.POST.get("comentarios_coordinador", "")
-    justi.estado = Justificacion.Estado.APROBADA
-    justi.comentarios_coordinador = comentario
-    justi.save(update_fields=["estado", "comentarios_coordinador", "updated_at"])
-    _notificar_cambio_estado(justi)
+    with transaction.atomic():
+        # La notificación queda en el outbox junto con el cambio de estado y se envía fuera del request
+        justi = get_object_or_404(Justificacion.objects.select_related("estudiante"), pk=pk)
+        justi.estado = Justificacion.Estado.APROBADA
+        justi.comentarios_coordinador = comentario
+        justi.save(update_fields=["estado", "comentarios_coordinador", "updated_at"])
+        notificar_cambio_estado([justi])
     messages.success(request, "Justificación aprobada y notificación enviada.")
     return redirect("coordinador_dashboard")
 
 
+@presupuesto_consultas(11)
 @login_required
 @require_role("COORDINADOR")
 @require_http_methods(["POST"]) 
 def coordinador_rechazar(request: HttpRequest, pk: int) -> HttpResponse:
-    justi = get_object_or_404(Justificacion, pk=pk)
     comentario = request.POST.get("comentarios_coordinador", "")
-    justi.estado = Justificacion.Estado.RECHAZADA
-    justi.comentarios_coordinador = comentario
-    justi.save(update_fields=["estado", "comentarios_coordinador", "updated_at"])
-    _notificar_cambio_estado(justi)
+    with transaction.atomic():
+        # La notificación queda en el outbox junto con el cambio de estado y se envía fuera del request
+        justi = get_object_or_404(Justificacion.objects.select_related("estudiante"), pk=pk)
+        justi.estado = Justificacion.Estado.RECHAZADA
+        justi.comentarios_coordinador = comentario
+        justi.save(update_fields=["estado", "comentarios_coordinador", "updated_at"])
+        notificar_cambio_estado([justi])
     messages.info(request, "Justificación rechazada y notificación enviada.")
     return redirect("coordinador_dashboard")
 
 
+@presupuesto_consultas(9)
+@login_required
+@require_role("COORDINADOR")
+@require_http_methods(["POST"])
+def coordinador_revisar_lote(request: HttpRequest) -> HttpResponse:
+    """
+    Aprueba o rechaza varias justificaciones pendientes en un solo request.
+    POST: ids (repetido), accion=aprobar|rechazar, comentarios_coordinador
+    (común) y opcionalmente comentario_<id> por justificación.
+    Responde JSON {"resultados": {id: estado|error}} si el cliente lo pide.
+    """
+    estados = {"aprobar": Justificacion.Estado.APROBADA, "rechazar": Justificacion.Estado.RECHAZADA}
+    estado = estados.get(request.POST.get("accion", ""))
+    ids = sorted({int(i) for i in request.POST.getlist("ids") if i.isdigit()})
+    if estado is None or not ids:
+        if _quiere_json(request):
+            return JsonResponse({"ok": False, "error": "Indica la acción y al menos una justificación."}, status=400)
+        messages.error(request, "Selecciona al menos una justificación y una acción.")
+        return redirect("coordinador_dashboard")
+
+    comun = request.POST.get("comentarios_coordinador", "")
+    comentarios = {pk: request.POST.get(f"comentario_{pk}", comun) for pk in ids}
+    revisadas = _revisar_lote(ids, estado, comentarios)
+
+    # "no_pendiente": inexistente o ya revisada (p. ej. por otro coordinador)
+    resultados = {pk: estado.value if pk in revisadas else "no_pendiente" for pk in ids}
+    if _quiere_json(request):
+        return JsonResponse({"ok": True, "resultados": resultados})
+    if revisadas:
+        messages.success(request, f"{len(revisadas)} justificaciones {estado.label.lower()}s y notificaciones encoladas.")
+    if len(revisadas) < len(ids):
+        messages.warning(request, f"{len(ids) - len(revisadas)} justificaciones ya no estaban pendientes.")
+    return redirect("coordinador_dashboard")
+
+
+def _revisar_lote(ids: list[int], estado: str, comentarios: dict[int, str]) -> set[int]:
+    """Un único UPDATE ... WHERE id IN (...) AND estado='PENDIENTE'. Devuelve los ids cambiados."""
+    with transaction.atomic():
+        pendientes = list(
+            Justificacion.objects.select_for_update(of=("self",))
+            .select_related("estudiante")
+            .filter(pk__in=ids, estado=Justificacion.Estado.PENDIENTE)
+        )
+        if not pendientes:
+            return set()
+        ahora = timezone.now()
+        Justificacion.objects.filter(
+            pk__in=[j.pk for j in pendientes], estado=Justificacion.Estado.PENDIENTE
+        ).update(
+            estado=estado,
+            comentarios_coordinador=Case(
+                *[When(pk=j.pk, then=Value(comentarios[j.pk])) for j in pendientes],
+                output_field=TextField(),
+            ),
+            updated_at=ahora,  # update() no aplica auto_now
+            estado_actualizado_en=ahora,
+        )
+        for j in pendientes:
+            j.estado, j.comentarios_coordinador, j.updated_at = estado, comentarios[j.pk], ahora
+            j.estado_actualizado_en = ahora
+        # update() no dispara signals: las estadísticas se ajustan aquí, en la misma transacción
+        estadisticas.mover(pendientes)
+        fragmentos.invalidar(j.estudiante_id for j in pendientes)
+        notificar_cambio_estado(pendientes)
+    return {j.pk for j in pendientes}
+
+
+def _quiere_json(request: HttpRequest) -> bool:
+    return "application/json" in request.headers.get("Accept", "")
+
+
+@presupuesto_consultas(4)
 @login_required
 @require_role("PROFESOR")
+@pagina_condicional(_estado_global)
 def profesor_dashboard(request: HttpRequest) -> HttpResponse:
     # Simplificado: listado general; se puede filtrar por alumno.
     q = request.GET.get("q", "").strip()
-    qs = Justificacion.objects.all().select_related("estudiante").order_by("-created_at")
+    qs = _consulta_global()
     if q:
-        qs = qs.filter(estudiante__username__icontains=q)
-    return render(request, "justificaciones/profesor_dashboard.html", {"justificaciones": qs, "q": q})
+        # Usuario, nombre, motivo o descripción, sin tildes y ordenado por relevancia
+        motor = get_motor()
+        justificaciones = paginar(request, motor.buscar(qs, q), motor.orden)
+    else:
+        justificaciones = paginar(request, qs)
+    return render(
+        request,
+        "justificaciones/profesor_dashboard.html",
+        {"justificaciones": justificaciones, "q": q, "contadores": SimpleLazyObject(estadisticas.contadores)},
+    )
 
 
-@require_http_methods(["POST"]) 
-def whatsapp_recepcion(request: HttpRequest) -> HttpResponse:
-    # Stub: recibe JSON simple con {username, motivo, descripcion, fecha}
+@presupuesto_consultas(0)
+@csrf_exempt  # lo llama el proveedor de WhatsApp, no un formulario del sitio
+@require_http_methods(["POST"])
+async def whatsapp_recepcion(request: HttpRequest) -> HttpResponse:
+    """
+    Recibe un mensaje {id, username, motivo, descripcion, fecha} o un lote
+    (lista o {"mensajes": [...]}) y lo guarda en la bandeja durable sin tocar
+    la base; ``consumir_whatsapp`` crea las justificaciones. Responde 202 en
+    cuanto el payload queda en disco y 403 si no trae la firma del proveedor
+    ni el token configurado (ver whatsapp.autorizado).
+    """
+    if not whatsapp.autorizado(request.body, request.headers):
+        return JsonResponse({"ok": False, "error": "firma inválida"}, status=403)
     try:
-        import json
-        payload = json.loads(request.body.decode("utf-8"))
-        username = payload.get("username")
-        motivo = payload.get("motivo") or "Inasistencia reportada por WhatsApp"
-        descripcion = payload.get("descripcion", "")
-        fecha = payload.get("fecha")  # "YYYY-MM-DD"
-        user = Usuario.objects.get(username=username)
-        justi = Justificacion.objects.create(
-            estudiante=user,
-            fecha_inicio=fecha,
-            motivo=motivo,
-            descripcion=descripcion,
-            fuente="whatsapp",
-        )
-        return JsonResponse({"ok": True, "id": justi.id})
-    except Exception as e:
-        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+        json.loads(request.body.decode("utf-8"))
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "el cuerpo no es JSON válido"}, status=400)
+    # El fsync bloquea: va a un hilo para no frenar el event loop
+    recibido = await sync_to_async(bandeja.depositar, thread_sensitive=False)(request.body)
+    return JsonResponse({"ok": True, "recibido": recibido}, status=202)
 
 
-def _notificar_cambio_estado(justi: Justificacion) -> None:
-    asunto = f"Tu justificación #{justi.pk} fue {justi.estado.lower()}"
-    cuerpo = (
-        f"Hola {justi.estudiante.get_full_name() or justi.estudiante.username},\n\n"
-        f"Estado: {justi.get_estado_display()}\n"
-        f"Comentario: {justi.comentarios_coordinador or 'Sin comentarios'}\n\n"
-        f"Saludos,\nEquipo JustiFácil"
-    )
-    send_mail(asunto, cuerpo, None, [justi.estudiante.email or "devnull@example.com"], fail_silently=True)
-    Notificacion.objects.create(destinatario=justi.estudiante, mensaje=cuerpo, canal="email")
+@presupuesto_consultas(3)
+@require_role()
+async def documento_descargar(request: HttpRequest, pk: int) -> HttpResponse:
+    """
+    Entrega el archivo de un documento con los permisos del detalle. Ver
+    descargas.py para Range, If-None-Match y la entrega delegada.
+    """
+    documento = await Documento.objects.select_related("justificacion").filter(pk=pk).afirst()
+    if documento is None or not documento.archivo:
+        raise Http404("Documento no encontrado")
+    if not _puede_ver(request.user, documento.justificacion):
+        messages.error(request, "No tienes permisos para ver esta justificación.")
+        return redirect("home")
+    return await descargas.responder(request, documento)
+
+
+@presupuesto_consultas(3)
+@require_role()
+async def documento_vista_previa(request: HttpRequest, pk: int, variante: str) -> HttpResponse:
+    """Miniatura o vista previa de la primera página de un documento (ver miniaturas.py)."""
+    if variante not in miniaturas.VARIANTES:
+        raise Http404("Variante desconocida")
+    documento = await Documento.objects.select_related("justificacion").filter(pk=pk).afirst()
+    if documento is None or not documento.archivo:
+        raise Http404("Documento no encontrado")
+    if not _puede_ver(request.user, documento.justificacion):
+        raise Http404("Documento no encontrado")  # es una imagen embebida: no tiene sentido redirigir
+    return await descargas.responder_variante(request, documento, variante)
+
+
+@presupuesto_consultas(3)
+@require_role()
+async def justificacion_miniatura(request: HttpRequest, pk: int) -> HttpResponse:
+    """
+    Miniatura del primer documento de una justificación. La tabla del
+    coordinador la pide por id de justificación para no cargar los documentos
+    de cada fila al renderizarla.
+    """
+    documento = await (
+        Documento.objects.select_related("justificacion").filter(justificacion_id=pk).exclude(archivo="").order_by("pk")
+    ).afirst()
+    if documento is None or not _puede_ver(request.user, documento.justificacion):
+        raise Http404("Sin documentos")
+    return await descargas.responder_variante(request, documento, "miniatura")
@@ -0,0 +1,170 @@
+"""
+Ingesta de mensajes de WhatsApp en lote.
+
+Cada mensaje ({id, username, motivo, descripcion, fecha}) se convierte en
+una Justificacion con fuente "whatsapp". La clave de idempotencia es el id
+del mensaje del proveedor (o, si falta, un hash del contenido), de modo que
+los reintentos del proveedor no duplican justificaciones. Por lote se hace
+una consulta para los usuarios, una para las claves ya ingeridas y un
+bulk_create.
+"""
+from __future__ import annotations
+import hashlib
+import hmac
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+
+from . import estadisticas, fragmentos
+from .busqueda import texto_busqueda
+from .models import Justificacion
+
+MOTIVO_POR_DEFECTO = "Inasistencia reportada por WhatsApp"
+CAMPOS_TEXTO = ("username", "motivo", "descripcion", "fecha")
+
+
+class LoteInvalido(ValueError):
+    pass
+
+
+def autorizado(cuerpo: bytes, cabeceras) -> bool:
+    """
+    Autentica un POST al webhook. Acepta la firma del proveedor
+    (``X-Hub-Signature-256: sha256=<HMAC-SHA256 del cuerpo con
+    WHATSAPP_APP_SECRET>``) o, para integraciones sin firma, el token
+    compartido WHATSAPP_WEBHOOK_TOKEN en ``Authorization: Bearer``. Sin
+    ninguno de los dos configurado se rechaza todo.
+    """
+    secreto = getattr(settings, "WHATSAPP_APP_SECRET", "")
+    if secreto:
+        esperada = "sha256=" + hmac.new(secreto.encode(), cuerpo, hashlib.sha256).hexdigest()
+        if hmac.compare_digest(cabeceras.get("X-Hub-Signature-256", "").encode(), esperada.encode()):
+            return True
+    token = getattr(settings, "WHATSAPP_WEBHOOK_TOKEN", "")
+    if token:
+        return hmac.compare_digest(cabeceras.get("Authorization", "").encode(), f"Bearer {token}".encode())
+    return False
+
+
+@dataclass
+class Mensaje:
+    clave: str
+    username: str
+    fecha: date | None
+    motivo: str
+    descripcion: str
+    error: str = ""
+    payload: object = None  # el mensaje tal como llegó, para guardar los rechazados
+
+    @classmethod
+    def desde_payload(cls, datos) -> "Mensaje":
+        if not isinstance(datos, dict):
+            return cls(
+                clave="", username="", fecha=None, motivo="", descripcion="", error="mensaje inválido", payload=datos
+            )
+        id_proveedor = datos.get("id") or datos.get("message_id")
+        if id_proveedor:
+            clave = f"whatsapp:{id_proveedor}"
+        else:
+            # Sin id del proveedor: el mismo contenido reenviado cuenta como el mismo mensaje
+            contenido = json.dumps(datos, sort_keys=True, default=str)
+            clave = f"whatsapp:sha256:{hashlib.sha256(contenido.encode()).hexdigest()}"
+        textos = {campo: datos.get(campo) for campo in CAMPOS_TEXTO}
+        mensaje = cls(
+            clave=clave[:100],
+            username=textos["username"] if isinstance(textos["username"], str) else "",
+            fecha=None,
+            motivo=(textos["motivo"] if isinstance(textos["motivo"], str) else "")[:255] or MOTIVO_POR_DEFECTO,
+            descripcion=textos["descripcion"] if isinstance(textos["descripcion"], str) else "",
+            payload=datos,
+        )
+        # El JSON puede traer números u objetos donde se espera texto: se rechaza el mensaje, no el lote
+        invalidos = [campo for campo, valor in textos.items() if valor is not None and not isinstance(valor, str)]
+        if id_proveedor and (isinstance(id_proveedor, bool) or not isinstance(id_proveedor, (str, int))):
+            invalidos.insert(0, "id")
+        if invalidos:
+            mensaje.error = f"{invalidos[0]} no es texto"
+            return mensaje
+        try:
+            mensaje.fecha = date.fromisoformat(str(textos["fecha"]))
+        except ValueError:
+            mensaje.error = "fecha inválida (se espera AAAA-MM-DD)"
+        if not mensaje.username:
+            mensaje.error = "falta username"
+        return mensaje
+
+
+def leer_payload(datos) -> tuple[list[Mensaje], bool]:
+    """
+    Acepta un mensaje, una lista o {"mensajes": [...]}. Devuelve los mensajes
+    y si el payload era un lote.
+    """
+    if isinstance(datos, dict) and "mensajes" in datos:
+        datos = datos["mensajes"]
+    es_lote = isinstance(datos, list)
+    items = datos if es_lote else [datos]
+    maximo = getattr(settings, "WHATSAPP_MAX_LOTE", 500)
+    if len(items) > maximo:
+        raise LoteInvalido(f"el lote supera el máximo de {maximo} mensajes")
+    return [Mensaje.desde_payload(item) for item in items], es_lote
+
+
+def ingerir(mensajes: list[Mensaje]) -> list[dict]:
+    """Crea las justificaciones del lote y devuelve un resultado por mensaje, en orden."""
+    try:
+        return _ingerir(mensajes)
+    except IntegrityError:
+        # Otro request ingirió alguna de las claves a la vez: ahora figuran como existentes
+        return _ingerir(mensajes)
+
+
+def _ingerir(mensajes: list[Mensaje]) -> list[dict]:
+    Usuario = get_user_model()
+    validos = [m for m in mensajes if not m.error]
+    usuarios = Usuario.objects.in_bulk({m.username for m in validos}, field_name="username")
+    existentes = dict(
+        Justificacion.objects.filter(clave_idempotencia__in={m.clave for m in validos})
+        .values_list("clave_idempotencia", "id")
+    )
+
+    nuevas: dict[str, Justificacion] = {}
+    for m in validos:
+        if m.clave in existentes or m.clave in nuevas:
+            continue
+        estudiante = usuarios.get(m.username)
+        if estudiante is None:
+            m.error = f"usuario desconocido: {m.username}"
+            continue
+        justi = Justificacion(
+            estudiante=estudiante,
+            fecha_inicio=m.fecha,
+            motivo=m.motivo,
+            descripcion=m.descripcion,
+            fuente="whatsapp",
+            clave_idempotencia=m.clave,
+        )
+        # bulk_create no llama a save(): se completa a mano lo que save() y los signals mantienen
+        justi.texto_busqueda = texto_busqueda(justi)
+        nuevas[m.clave] = justi
+
+    if nuevas:
+        with transaction.atomic():
+            Justificacion.objects.bulk_create(nuevas.values(), batch_size=500)
+            estadisticas.registrar(Counter(j.clave_stats() for j in nuevas.values()))
+            fragmentos.invalidar(j.estudiante_id for j in nuevas.values())
+
+    resultados = []
+    for m in mensajes:
+        if m.error:
+            resultados.append({"ok": False, "error": m.error})
+        elif m.clave in existentes:
+            resultados.append({"ok": True, "id": existentes[m.clave], "duplicado": True})
+        else:
+            resultados.append({"ok": True, "id": nuevas[m.clave].pk, "duplicado": False})
+            # Un mismo mensaje repetido dentro del lote se informa como duplicado
+            existentes[m.clave] = nuevas[m.clave].pk
+    return resultados